@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import SiteData, Task, TaskType, Cluster  # add other models as needed
+from .models import SiteData, Task, TaskType, Cluster, RecurrenceRule  # add other models as needed
 
 admin.site.register(SiteData)
-
+admin.site.register(RecurrenceRule)
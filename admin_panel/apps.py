@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AdminPanelConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'admin_panel'
+
+    def ready(self):
+        # connect the signal receivers
+        from . import counters, dashboard_cache, events  # noqa: F401
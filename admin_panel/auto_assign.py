@@ -0,0 +1,189 @@
+"""
+Distance-based auto-assignment of site tasks to employees.
+
+Every employee starts from a known position: their home site
+(Employee.home_site) or else the site of the task they last reported on.
+Site-to-employee distances are great-circle (haversine) kilometres, computed
+as one NumPy matrix. The assignment minimises total distance with each
+employee taking at most `capacity` sites:
+
+1. regret greedy: sites with the most to lose from not getting their nearest
+   employee (second-best minus best distance) pick first, each taking the
+   nearest employee with capacity left;
+2. local search: single moves to employees with spare capacity and pairwise
+   swaps between employees, while either lowers the total.
+
+This is a heuristic, not an exact solver; it handles thousands of sites and
+hundreds of employees in well under a few seconds.
+"""
+import math
+
+import numpy as np
+from django.db.models import OuterRef, Subquery
+
+from reports.models import Report
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _coordinate(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    return number if math.isfinite(number) else math.nan
+
+
+def site_coordinates(sites):
+    """
+    (lat, lon) float arrays for SiteData rows; NaN where missing or unparsable.
+    """
+    lat = np.array([_coordinate(s.latitude) for s in sites], dtype=float)
+    lon = np.array([_coordinate(s.longitude) for s in sites], dtype=float)
+    lat[np.abs(lat) > 90] = np.nan
+    lon[np.abs(lon) > 180] = np.nan
+    return lat, lon
+
+
+def with_positions(employees):
+    """
+    Annotate a User queryset with the position each employee starts from:
+    home site, else the site of their latest report's task.
+    """
+    latest_site = Report.objects.filter(
+        submitted_by=OuterRef('pk'), task__site__isnull=False
+    ).order_by('-submitted_at', '-id')
+    return employees.select_related('employee_profile__home_site').annotate(
+        last_lat=Subquery(latest_site.values('task__site__latitude')[:1]),
+        last_lon=Subquery(latest_site.values('task__site__longitude')[:1]),
+    )
+
+
+def employee_coordinates(employees):
+    """
+    (lat, lon) float arrays for users annotated by with_positions().
+    """
+    lat, lon = [], []
+    for user in employees:
+        profile = getattr(user, 'employee_profile', None)
+        home = profile.home_site if profile else None
+        point = (_coordinate(home.latitude), _coordinate(home.longitude)) if home else (math.nan, math.nan)
+        if math.isnan(point[0]) or math.isnan(point[1]):
+            point = (_coordinate(user.last_lat), _coordinate(user.last_lon))
+        lat.append(point[0])
+        lon.append(point[1])
+    return np.array(lat, dtype=float), np.array(lon, dtype=float)
+
+
+def without_position(employees):
+    lat, lon = employee_coordinates(employees)
+    return [e for e, missing in zip(employees, np.isnan(lat) | np.isnan(lon)) if missing]
+
+
+def haversine_matrix(lat1, lon1, lat2, lon2):
+    """
+    Kilometres between every point 1 (rows) and every point 2 (columns).
+    """
+    lat1, lon1 = np.radians(lat1)[:, None], np.radians(lon1)[:, None]
+    lat2, lon2 = np.radians(lat2)[None, :], np.radians(lon2)[None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _greedy(distance, remaining):
+    n_sites, n_employees = distance.shape
+    assignment = np.full(n_sites, -1)
+    if n_employees > 1:
+        two_best = np.partition(distance, 1, axis=1)[:, :2]
+        regret = two_best[:, 1] - two_best[:, 0]
+    else:
+        regret = np.zeros(n_sites)
+    for s in np.argsort(-regret, kind='stable'):
+        if not remaining.any():
+            break
+        row = np.where(remaining > 0, distance[s], np.inf)
+        e = int(row.argmin())
+        assignment[s] = e
+        remaining[e] -= 1
+    return assignment
+
+
+def _improve(distance, assignment, remaining, max_passes):
+    sites = np.flatnonzero(assignment >= 0)
+    if not len(sites):
+        return assignment
+    distance = distance[sites]
+    by_employee = np.ascontiguousarray(distance.T)
+    current = assignment[sites]
+    cost = distance[np.arange(len(sites)), current]
+    for _ in range(max_passes):
+        improved = False
+        for i in range(len(sites)):
+            a = current[i]
+            # Move to an employee with spare capacity
+            spare = np.where(remaining > 0, distance[i], np.inf)
+            e = int(spare.argmin())
+            if spare[e] < cost[i] - 1e-9:
+                remaining[e] -= 1
+                remaining[a] += 1
+                current[i], cost[i] = e, spare[e]
+                improved = True
+                continue
+            # Swap with a site of another employee
+            gain = cost[i] + cost - distance[i, current] - by_employee[a]
+            j = int(gain.argmax())
+            if gain[j] > 1e-9:
+                b = current[j]
+                current[i], current[j] = b, a
+                cost[i], cost[j] = distance[i, b], distance[j, a]
+                improved = True
+        if not improved:
+            break
+    assignment[sites] = current
+    return assignment
+
+
+def solve(distance, capacity, max_passes=5):
+    """
+    Column index per row of `distance` (sites x employees), or -1 where no
+    employee had capacity left. `capacity` is an int or a per-employee array.
+    """
+    n_sites, n_employees = distance.shape
+    if not n_sites or not n_employees:
+        return np.full(n_sites, -1)
+    remaining = np.broadcast_to(np.asarray(capacity, dtype=int), (n_employees,)).copy()
+    assignment = _greedy(distance, remaining)
+    return _improve(distance, assignment, remaining, max_passes)
+
+
+def plan(sites, employees, capacity=None):
+    """
+    Assign `sites` (SiteData list) to `employees` (list of users annotated
+    by with_positions). Returns (assignments, unassigned): assignments are
+    (site, employee, km) tuples; unassigned are (site, reason) tuples.
+    Without `capacity`, work is spread evenly: ceil(sites / employees) each.
+    """
+    site_lat, site_lon = site_coordinates(sites)
+    emp_lat, emp_lon = employee_coordinates(employees)
+    located_sites = np.flatnonzero(~np.isnan(site_lat) & ~np.isnan(site_lon))
+    located_employees = np.flatnonzero(~np.isnan(emp_lat) & ~np.isnan(emp_lon))
+
+    unassigned = [(sites[i], 'Site has no coordinates')
+                  for i in np.flatnonzero(np.isnan(site_lat) | np.isnan(site_lon))]
+    if not len(located_employees):
+        return [], unassigned + [(sites[i], 'No employee with a known position') for i in located_sites]
+
+    if capacity is None:
+        capacity = math.ceil(len(located_sites) / len(located_employees)) if len(located_sites) else 0
+    distance = haversine_matrix(site_lat[located_sites], site_lon[located_sites],
+                                emp_lat[located_employees], emp_lon[located_employees])
+    assignment = solve(distance, capacity)
+
+    assignments = []
+    for row, column in enumerate(assignment):
+        site = sites[located_sites[row]]
+        if column < 0:
+            unassigned.append((site, 'No employee capacity left'))
+        else:
+            assignments.append((site, employees[located_employees[column]], float(distance[row, column])))
+    return assignments, unassigned
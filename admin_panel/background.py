@@ -0,0 +1,47 @@
+"""
+Background job handlers for the long-running admin imports (see jobs.runner).
+Each mirrors its synchronous view and stores that view's response body as
+the job result.
+"""
+from jobs.runner import JobFailed, handler, open_upload
+
+from . import employee_import, site_import, task_import
+
+
+@handler('admin_panel.bulk_assign_task_csv')
+def bulk_assign_task_csv(job, upload):
+    with open_upload(upload) as f:
+        text = f.read().decode('utf-8-sig')
+    try:
+        reader, delimiter = task_import.read_csv(text)
+    except ValueError as e:
+        raise JobFailed(str(e))
+
+    rows = task_import.clean_rows(reader)
+    job.set_progress(0, len(rows))
+    results = task_import.assign_tasks(rows, job.created_by)
+    job.set_progress(len(rows))
+    if not results or all('error' in r for r in results):
+        raise JobFailed('No tasks created', result={'results': results})
+    return {'results': results, 'delimiter_used': delimiter}
+
+
+@handler('admin_panel.bulk_create_employees_zip')
+def bulk_create_employees_zip(job, upload):
+    with open_upload(upload) as f:
+        try:
+            results = employee_import.import_employees(f, job.created_by, progress=job.set_progress)
+        except ValueError as e:
+            raise JobFailed(str(e))
+    return {'results': results}
+
+
+@handler('admin_panel.import_site_data')
+def import_site_data(job, upload):
+    with open_upload(upload) as f:
+        lines = site_import.decode(site_import.store(f.chunks()))
+    try:
+        site_import.replace_site_data(lines, progress=job.set_progress)
+    except ValueError as e:
+        raise JobFailed(str(e))
+    return {'message': 'Site data imported and stored (old data replaced)'}
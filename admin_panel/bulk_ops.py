@@ -0,0 +1,184 @@
+"""
+Bulk review of reports and bulk delete/reassign/status change of tasks.
+
+Each operation runs in one transaction with a fixed number of set-based
+UPDATE/DELETE statements, however many ids it is given. Those statements
+send no per-object signals, so what the receivers would have done is done
+here for the whole set: counters through counters.tracking(), sync
+tombstones with tombstones.bury(), dashboard invalidation and report
+events. `updated_at` is set explicitly (update() skips auto_now) so delta
+syncs and rollups see the change.
+
+Every function returns (results, summary): one {'id', 'outcome'} per
+distinct requested id, in request order, and the number of ids per outcome.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from reports.models import Report, ReportFileUpload
+from sync import tombstones
+from . import counters, dashboard_cache, events, rollups
+from .models import Task
+
+# Report review action -> (report status, status its task moves to)
+REVIEW_ACTIONS = {
+    'approve': ('approved', 'completed'),
+    'reject': ('rejected', 'in_progress'),
+}
+
+
+def _outcomes(ids, found, changed, outcome):
+    results = [
+        {'id': i, 'outcome': outcome if i in changed else 'unchanged' if i in found else 'not_found'}
+        for i in ids
+    ]
+    return results, dict(Counter(r['outcome'] for r in results))
+
+
+def _report_ids(ids):
+    parsed = []
+    for i in ids:
+        try:
+            parsed.append(int(i))
+        except (TypeError, ValueError):
+            parsed.append(i)
+    return list(dict.fromkeys(parsed))
+
+
+def review_reports(ids, action, reason=''):
+    """
+    Approve or reject the reports with these ids, moving their tasks to
+    completed / in_progress like review_report. Reports already in the
+    target status are left alone.
+    """
+    report_status, task_status = REVIEW_ACTIONS[action]
+    ids = _report_ids(ids)
+    numeric = [i for i in ids if isinstance(i, int)]
+    now = timezone.now()
+
+    with transaction.atomic():
+        rows = list(
+            Report.objects.select_for_update()
+            .filter(id__in=numeric)
+            .values_list('id', 'status', 'task_id', 'submitted_by_id')
+        )
+        pending = [row for row in rows if row[1] != report_status]
+        changed = [row[0] for row in pending]
+
+        fields = {'status': report_status, 'updated_at': now}
+        if action == 'approve':
+            fields['approved_at'] = now
+        else:
+            fields['rejection_reason'] = reason
+            fields['rejected_at'] = now
+        Report.objects.filter(id__in=changed).update(**fields)
+
+        tasks = Task.objects.filter(id__in={row[2] for row in pending}).exclude(status=task_status)
+        with counters.tracking(tasks):
+            tasks.update(status=task_status, updated_at=now)
+
+        if pending:
+            dashboard_cache.invalidate(*dashboard_cache.DEPENDENCIES[Report])
+            dashboard_cache.invalidate_users([row[3] for row in pending])
+        events.publish_all_on_commit(
+            ('report', {
+                'report_id': report_id,
+                'task_pk': task_pk,
+                'status': report_status,
+                'previous_status': previous,
+            })
+            for report_id, previous, task_pk, _ in pending
+        )
+
+    return _outcomes(ids, {row[0] for row in rows}, set(changed), report_status)
+
+
+def set_task_status(task_ids, status):
+    """
+    Move the tasks with these task_ids to `status`.
+    """
+    task_ids = list(dict.fromkeys(task_ids))
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(Task.objects.select_for_update().filter(task_id__in=task_ids).values_list('task_id', 'status'))
+        changed = {task_id for task_id, current in rows if current != status}
+        tasks = Task.objects.filter(task_id__in=changed)
+        with counters.tracking(tasks):
+            tasks.update(status=status, updated_at=now)
+    return _outcomes(task_ids, {row[0] for row in rows}, changed, 'updated')
+
+
+def reassign_tasks(task_ids, employee, assigned_by=None):
+    """
+    Give the tasks with these task_ids to `employee`. Their previous
+    assignees get tombstones so the tasks drop off their synced lists.
+    """
+    task_ids = list(dict.fromkeys(task_ids))
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            Task.objects.select_for_update()
+            .filter(task_id__in=task_ids)
+            .values_list('task_id', 'assigned_to_id')
+        )
+        moved = [(task_id, previous) for task_id, previous in rows if previous != employee.pk]
+        changed = {task_id for task_id, _ in moved}
+        tasks = Task.objects.filter(task_id__in=changed)
+        with counters.tracking(tasks):
+            tasks.update(
+                assigned_to=employee, state=employee.state or '', assigned_by=assigned_by,
+                assigned_date=now, updated_at=now,
+            )
+        tombstones.bury('task', [(task_id, previous, None) for task_id, previous in moved])
+    return _outcomes(task_ids, {row[0] for row in rows}, changed, 'reassigned')
+
+
+def delete_tasks(task_ids):
+    """
+    Delete the tasks with these task_ids, with their reports and report
+    file records (as the foreign keys' CASCADE would). Uploaded files are
+    left in storage, as with delete_task.
+    """
+    task_ids = list(dict.fromkeys(task_ids))
+    with transaction.atomic():
+        rows = list(
+            Task.objects.select_for_update()
+            .filter(task_id__in=task_ids)
+            .values_list('id', 'task_id', 'assigned_to_id')
+        )
+        pks = [row[0] for row in rows]
+        reports = Report.objects.filter(task_id__in=pks)
+        report_rows = list(reports.values_list('id', 'task_id', 'submitted_by_id', 'status',
+                                               *rollups.REPORT_DATE_FIELDS))
+
+        tasks = Task.objects.filter(id__in=pks)
+        with counters.tracking(tasks):
+            # Children first; _raw_delete issues a plain DELETE (no collector, no signals)
+            files = ReportFileUpload.objects.filter(report_id__in=[row[0] for row in report_rows])
+            files._raw_delete(files.db)
+            reports._raw_delete(reports.db)
+            tasks._raw_delete(tasks.db)
+
+        tombstones.bury('task', [(task_id, assignee, None) for _, task_id, assignee in rows])
+        tombstones.bury('report', [
+            (report_id, submitter, {'task': task_pk, 'days': rollups.report_days(*moments)})
+            for report_id, task_pk, submitter, _, *moments in report_rows
+        ])
+        if report_rows:
+            dashboard_cache.invalidate(*dashboard_cache.DEPENDENCIES[Report])
+            dashboard_cache.invalidate_users([row[2] for row in report_rows])
+        events.publish_all_on_commit(
+            ('report', {
+                'report_id': report_id,
+                'task_pk': task_pk,
+                'status': None,
+                'previous_status': previous,
+            })
+            for report_id, task_pk, _, previous, *_ in report_rows
+        )
+
+    results, summary = _outcomes(task_ids, set(), {row[1] for row in rows}, 'deleted')
+    summary['reports_deleted'] = len(report_rows)
+    return results, summary
@@ -0,0 +1,88 @@
+"""
+Conditional GET (ETag / Last-Modified) for list endpoints.
+
+The validators come from a watermark of the rows a response is built from:
+max(updated_at) and count of each queryset, fetched in one query without
+building the payload. Count catches deletes, max(updated_at) catches inserts
+and edits. A client sending back the ETag (If-None-Match) or Last-Modified
+(If-Modified-Since) gets 304 Not Modified while the watermark is unchanged.
+
+Rows a payload only joins in (a task's type and cluster) go in as querysets
+of their own. Users have no updated_at, so views that show user names also
+fold dashboard_cache generations (USERS_GENERATION) into the ETag; those
+views send no Last-Modified, which could not follow such a change.
+"""
+import datetime
+import hashlib
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, router
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import condition
+
+from . import dashboard_cache
+
+
+def _as_datetime(value):
+    if value is None or isinstance(value, datetime.datetime):
+        dt = value
+    else:
+        dt = parse_datetime(str(value))
+    if dt is not None and settings.USE_TZ and timezone.is_naive(dt):
+        dt = timezone.make_aware(dt, datetime.timezone.utc)
+    return dt
+
+
+def watermark(*querysets, field='updated_at'):
+    """
+    [(max(field), count), ...] for each queryset, in a single query.
+    """
+    parts, params = [], []
+    for i, qs in enumerate(querysets):
+        try:
+            sql, qs_params = qs.order_by().values_list(field).query.sql_with_params()
+        except EmptyResultSet:
+            parts.append(f'SELECT {i}, NULL, 0')
+            continue
+        parts.append(f'SELECT {i}, MAX(w{i}.{field}), COUNT(*) FROM ({sql}) w{i}')
+        params.extend(qs_params)
+
+    connection = connections[router.db_for_read(querysets[0].model)]
+    with connection.cursor() as cursor:
+        cursor.execute(' UNION ALL '.join(parts), params)
+        rows = sorted(cursor.fetchall())
+    return [(_as_datetime(latest), count) for _, latest, count in rows]
+
+
+def conditional_on(querysets_for, generations=()):
+    """
+    Answer GET/HEAD with 304 when the watermark of `querysets_for(request,
+    *args, **kwargs)`, and the tokens of the dashboard_cache `generations`,
+    match the client's validators. Goes directly above the view function,
+    below @api_view/@permission_classes, so request.user is already
+    authenticated:
+
+        @conditional_on(lambda request: [Task.objects.filter(assigned_to=request.user)])
+    """
+    def decorator(view):
+        def marks(request, *args, **kwargs):
+            if not hasattr(request, '_watermark'):
+                request._watermark = watermark(*querysets_for(request, *args, **kwargs))
+            return request._watermark
+
+        def etag(request, *args, **kwargs):
+            # The query string is part of it: the same rows can render differently
+            tokens = [dashboard_cache.generation(name) for name in generations]
+            raw = repr((request.get_full_path(), marks(request, *args, **kwargs), tokens))
+            return hashlib.md5(raw.encode()).hexdigest()
+
+        def last_modified(request, *args, **kwargs):
+            if generations:
+                return None
+            dates = [latest for latest, _ in marks(request, *args, **kwargs) if latest]
+            return max(dates) if dates else None
+
+        return condition(etag_func=etag, last_modified_func=last_modified)(view)
+    return decorator
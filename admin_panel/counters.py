@@ -0,0 +1,189 @@
+"""
+Maintenance of TaskStatusCounter.
+
+Every Task contributes 1 to the counter row matching its
+(title, type, cluster, state, assignee, status). Single saves and deletes are
+handled by the signal receivers below; bulk_create goes through
+TaskQuerySet.bulk_create, and set-based UPDATE/DELETE statements should be
+wrapped in `tracking(queryset)`.
+"""
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from .models import Task, TaskStatusCounter
+
+KEY_FIELDS = ('title', 'type_id', 'cluster_id', 'state', 'assigned_to_id', 'status')
+
+# Sent after counters change, with `deltas` mapping counter keys to +/- counts
+task_counters_changed = Signal()
+
+_local = threading.local()
+
+
+def _task_key(task):
+    """
+    Counter key of a loaded task, or None if any of its fields was deferred
+    (reading them would cost a query each).
+    """
+    values = task.__dict__
+    if any(f not in values for f in KEY_FIELDS):
+        return None
+    return tuple(values[f] for f in KEY_FIELDS)
+
+
+def grouped_counts(queryset):
+    """
+    Counter keys and their task counts for `queryset`, in one GROUP BY query.
+    """
+    rows = (
+        queryset.order_by()
+        .values_list(*KEY_FIELDS)
+        .annotate(n=Count('id'))
+    )
+    return Counter({tuple(row[:-1]): row[-1] for row in rows})
+
+
+def apply_deltas(deltas):
+    """
+    Add `deltas` ({counter key: +/-n}) to the counter table atomically.
+    Rows are only created for positive deltas and dropped once they reach zero.
+    """
+    deltas = {key: n for key, n in deltas.items() if n}
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        for key, n in deltas.items():
+            lookup = dict(zip(KEY_FIELDS, key))
+            rows = TaskStatusCounter.objects.filter(**lookup)
+            if rows.update(count=F('count') + n) or n < 0:
+                continue
+            try:
+                with transaction.atomic():
+                    TaskStatusCounter.objects.create(count=n, **lookup)
+            except IntegrityError:
+                # Created concurrently since our UPDATE
+                rows.update(count=F('count') + n)
+        if any(n < 0 for n in deltas.values()):
+            TaskStatusCounter.objects.filter(count__lte=0).delete()
+
+    task_counters_changed.send(sender=TaskStatusCounter, deltas=deltas)
+
+
+def record_created(tasks):
+    """
+    Count freshly inserted tasks (used by the bulk_create path).
+    """
+    deltas = Counter()
+    for task in tasks:
+        task._counter_key = _task_key(task)
+        if task._counter_key:
+            deltas[task._counter_key] += 1
+    apply_deltas(deltas)
+
+
+def rebuild():
+    """
+    Recompute every counter from the Task table.
+    Returns the number of counter keys that had drifted.
+    """
+    with transaction.atomic():
+        expected = grouped_counts(Task.objects.all())
+        current = Counter({
+            tuple(row[:-1]): row[-1]
+            for row in TaskStatusCounter.objects.values_list(*KEY_FIELDS, 'count')
+        })
+        drifted = sum(1 for key in expected.keys() | current.keys() if expected[key] != current[key])
+
+        TaskStatusCounter.objects.all().delete()
+        TaskStatusCounter.objects.bulk_create([
+            TaskStatusCounter(count=n, **dict(zip(KEY_FIELDS, key)))
+            for key, n in expected.items()
+        ])
+    return drifted
+
+
+@contextmanager
+def suspended():
+    """
+    Ignore per-instance save/delete signals (the caller accounts for them).
+    """
+    _local.suspended = getattr(_local, 'suspended', 0) + 1
+    try:
+        yield
+    finally:
+        _local.suspended -= 1
+
+
+@contextmanager
+def tracking(queryset):
+    """
+    Keep counters in step with a set-based UPDATE or DELETE on `queryset`:
+
+        with counters.tracking(tasks):
+            tasks.update(status='completed')
+
+    The affected rows are grouped before and after, and the difference is
+    applied in the same transaction.
+    """
+    with transaction.atomic():
+        pks = list(queryset.values_list('pk', flat=True))
+        before = grouped_counts(Task.objects.filter(pk__in=pks))
+        with suspended():
+            yield
+        after = grouped_counts(Task.objects.filter(pk__in=pks))
+        deltas = Counter(after)
+        deltas.subtract(before)
+        apply_deltas(deltas)
+
+
+def _is_suspended():
+    return getattr(_local, 'suspended', 0) > 0
+
+
+@receiver(post_init, sender=Task)
+def remember_counter_key(sender, instance, **kwargs):
+    instance._counter_key = _task_key(instance)
+
+
+@receiver(pre_save, sender=Task)
+def load_counter_key(sender, instance, **kwargs):
+    if instance._state.adding:
+        # What is about to be inserted is what any save from another
+        # post_save receiver will compare against
+        instance._counter_key = _task_key(instance)
+    elif instance._counter_key is None:
+        # Instances loaded with deferred fields don't know their stored values yet
+        instance._counter_key = (
+            Task.objects.filter(pk=instance.pk).values_list(*KEY_FIELDS).first()
+        )
+
+
+@receiver(post_save, sender=Task)
+def count_saved_task(sender, instance, created, **kwargs):
+    old = None if created else instance._counter_key
+    new = _task_key(instance)
+    instance._counter_key = new
+    if old == new or _is_suspended():
+        return
+
+    deltas = Counter()
+    if old:
+        deltas[old] -= 1
+    if new:
+        deltas[new] += 1
+    apply_deltas(deltas)
+
+
+@receiver(post_delete, sender=Task)
+def count_deleted_task(sender, instance, **kwargs):
+    key = instance._counter_key or _task_key(instance)
+    if not key or _is_suspended():
+        return
+    apply_deltas(Counter({key: -1}))
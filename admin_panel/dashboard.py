@@ -0,0 +1,131 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Task, Cluster, TaskStatusCounter
+
+User = get_user_model()
+
+# Task names shown as cards on the admin dashboard
+TASK_TITLES = [
+    "DG PM",
+    "DG CM",
+    "AC PM",
+    "AC CM",
+    "Site Visit",
+]
+
+DEFAULT_COLOR = "#1976D2"
+
+STATUSES = ('completed', 'pending', 'in_progress')
+
+
+def _count_sums(prefix=''):
+    """
+    Total and per-status sums over TaskStatusCounter rows.
+    `prefix` lets the same expressions be used across a relation (e.g. 'status_counters__').
+    """
+    def total(**filters):
+        q = Q(**{f'{prefix}{k}': v for k, v in filters.items()})
+        return Coalesce(Sum(f'{prefix}count', filter=q if filters else None), Value(0))
+
+    sums = {'total': total()}
+    for status in STATUSES:
+        sums[status] = total(status=status)
+    return sums
+
+
+def global_totals():
+    """
+    Total tasks and per-status totals in one query over the counter table.
+    """
+    return TaskStatusCounter.objects.aggregate(**_count_sums())
+
+
+def task_type_stats(titles=TASK_TITLES):
+    """
+    Per-title status breakdown in one GROUP BY query.
+    Titles with no tasks are still returned with zero counts.
+    """
+    rows = (
+        TaskStatusCounter.objects.filter(title__in=titles)
+        .values('title')
+        .annotate(**_count_sums())
+        .order_by()
+    )
+    by_title = {row['title']: row for row in rows}
+
+    stats = []
+    for name in titles:
+        row = by_title.get(name, {})
+        stats.append({
+            'task_name': name,
+            'total': row.get('total', 0),
+            'completed': row.get('completed', 0),
+            'pending': row.get('pending', 0),
+            'in_progress': row.get('in_progress', 0),
+            'color': DEFAULT_COLOR,
+        })
+    return stats
+
+
+def cluster_stats():
+    """
+    Total and completed tasks for every cluster in one query.
+    """
+    sums = _count_sums('status_counters__')
+    clusters = Cluster.objects.annotate(
+        total=sums['total'],
+        completed=sums['completed'],
+    ).order_by('id')
+    return [
+        {'name': c.name, 'total': c.total, 'completed': c.completed}
+        for c in clusters
+    ]
+
+
+def build_dashboard_stats():
+    """
+    Everything `DashboardStatsSerializer` needs, in a fixed number of queries
+    regardless of how many clusters or task titles exist.
+    """
+    employees = User.objects.filter(role='employee')
+    totals = global_totals()
+
+    return {
+        'total_employees': employees.count(),
+        'total_tasks': totals['total'],
+        'completed_tasks': totals['completed'],
+        'pending_tasks': totals['pending'],
+        'in_progress_tasks': totals['in_progress'],
+
+        'task_type_stats': task_type_stats(),
+
+        'clusters': cluster_stats(),
+
+        'recent_assigned_tasks': [
+            {
+                'employee_id': t.assigned_to.id,
+                'employee_name': t.assigned_to.first_name,
+                'task_id': t.task_id,
+                'task_type': t.type.name if t.type else '',
+                'global_id': t.global_id
+            }
+            for t in Task.objects.select_related('assigned_to', 'type').order_by('-created_at')[:5]
+        ],
+
+        'recent_employees': [
+            {
+                'id': e.id,
+                'name': e.first_name,
+                'email': e.email,
+                'designation': getattr(e, 'designation', ''),
+                'global_id': getattr(e, 'global_id', ''),
+                'state_user_id': getattr(e, 'state_user_id', ''),
+                'state': getattr(e, 'state', ''),
+                'active': e.is_active,
+                'date_joined': e.date_joined,
+            }
+            for e in employees.order_by('-date_joined')[:5]
+        ]
+    }
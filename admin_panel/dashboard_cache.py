@@ -0,0 +1,222 @@
+"""
+Response cache for the dashboard endpoints.
+
+Entries are keyed by view, role and state: saves and deletes of Task, Report
+and User replace a per-view generation token once their transaction commits,
+which orphans only the entries of the views that depend on that model.
+Bumping before the commit would let a concurrent request cache the old data
+under the new generation. Tokens are replaced rather than incremented, since
+incr is not atomic on every backend (FileBasedCache reads and rewrites), and
+entries still expire after DASHBOARD_CACHE_TIMEOUT as a backstop.
+
+Per-user dashboards (`cached_user_dashboard`) are keyed by user instead, with
+a per-user generation replaced (also on commit) when one of that user's
+tasks or reports changes.
+"""
+import hashlib
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.response import Response
+
+from reports.models import Report
+from .counters import KEY_FIELDS, task_counters_changed
+from .models import Task
+
+User = get_user_model()
+
+# Which cached views each model feeds into
+DEPENDENCIES = {
+    Task: ('admin_dashboard', 'superadmin_dashboard', 'statewise_summary', 'sla_analytics'),
+    Report: ('superadmin_dashboard', 'statewise_summary', 'sla_analytics'),
+    User: ('admin_dashboard', 'superadmin_dashboard', 'statewise_summary'),
+}
+
+USER_VIEWS = ('employee_dashboard',)
+
+# Replaced on the same User changes; conditional GETs of payloads that show
+# user names (not dashboards themselves) fold it into their ETag
+USERS_GENERATION = 'users'
+
+VIEWS = sorted({view for views in DEPENDENCIES.values() for view in views} | set(USER_VIEWS))
+
+# User columns that no dashboard shows (login bookkeeping, password resets)
+IGNORED_USER_FIELDS = {'last_login', 'password', 'reset_otp', 'reset_otp_created_at'}
+
+
+def _timeout():
+    return getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', None)
+
+
+def _token():
+    return uuid.uuid4().hex[:16]
+
+
+def generation(view):
+    """
+    The current token of a generation, e.g. a view's or USERS_GENERATION.
+    """
+    key = f'dashboard:gen:{view}'
+    token = cache.get(key)
+    if token is None:
+        cache.add(key, _token(), None)
+        token = cache.get(key)
+    return token
+
+
+def _digest(value):
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def cache_key(view, user, params=''):
+    role = getattr(user, 'role', '') or ''
+    state = getattr(user, 'state', '') or ''
+    # State names have spaces (and could be anything), which memcached keys can't
+    key = f'dashboard:{view}:{generation(view)}:{_digest(f"{role}:{state}")}'
+    if params:
+        key += ':' + _digest(params)
+    return key
+
+
+def invalidate(*views):
+    """
+    Orphan the entries of `views` once the current transaction commits
+    (straight away outside one).
+    """
+    keys = [f'dashboard:gen:{view}' for view in views]
+    transaction.on_commit(lambda: cache.set_many({key: _token() for key in keys}, None))
+
+
+def user_cache_key(view, user_id):
+    return f'dashboard:{view}:user:{user_id}:{generation(f"{view}:user:{user_id}")}'
+
+
+def invalidate_users(user_ids, views=USER_VIEWS):
+    """
+    Orphan the per-user entries of these users once the current transaction
+    commits. A generation rather than a delete, so a request that read the
+    old data before the commit cannot store it afterwards under a live key.
+    """
+    keys = [f'dashboard:gen:{view}:user:{uid}' for view in views for uid in set(user_ids) if uid]
+    if keys:
+        transaction.on_commit(lambda: cache.set_many({key: _token() for key in keys}, None))
+
+
+def _count(view, outcome):
+    key = f'dashboard:{outcome}:{view}'
+    if cache.add(key, 1, None):
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def stats():
+    """
+    Hit/miss counters per cached view.
+    """
+    result = {}
+    for view in VIEWS:
+        hits = cache.get(f'dashboard:hits:{view}', 0)
+        misses = cache.get(f'dashboard:misses:{view}', 0)
+        total = hits + misses
+        result[view] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else None,
+        }
+    return result
+
+
+def cached_dashboard(view_name, timeout=None, vary_on_params=False):
+    """
+    Cache the data of successful responses per (role, state), and per query
+    string with `vary_on_params`. `timeout` (seconds) bounds how long an entry
+    lives for views whose data also changes with time.
+    Goes directly above the view function, below @api_view/@permission_classes.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            params = request.GET.urlencode() if vary_on_params else ''
+            key = cache_key(view_name, request.user, params)
+            data = cache.get(key)
+            if data is not None:
+                _count(view_name, 'hits')
+                return Response(data)
+
+            _count(view_name, 'misses')
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, timeout if timeout is not None else _timeout())
+            return response
+        return wrapper
+    return decorator
+
+
+def cached_user_dashboard(view_name, expires=None):
+    """
+    Like `cached_dashboard`, but one entry per user. Entries also lapse at
+    midnight, since "due today" and "overdue" depend on the date, and at
+    `expires(request)` (a datetime, or None) for data that changes at other
+    moments, e.g. when a deadline passes.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key = user_cache_key(view_name, request.user.pk)
+            today = timezone.localdate().isoformat()
+            entry = cache.get(key)
+            if (entry is not None and entry['date'] == today
+                    and (entry.get('until') is None or timezone.now() < entry['until'])):
+                _count(view_name, 'hits')
+                return Response(entry['data'])
+
+            _count(view_name, 'misses')
+            # Before the view runs, so nothing that changes meanwhile is missed
+            until = expires(request) if expires else None
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, {'date': today, 'until': until, 'data': response.data}, _timeout())
+            return response
+        return wrapper
+    return decorator
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_on_task_change(sender, instance, **kwargs):
+    invalidate(*DEPENDENCIES[Task])
+    invalidate_users([instance.assigned_to_id])
+
+
+@receiver(post_save, sender=Report)
+@receiver(post_delete, sender=Report)
+def invalidate_on_report_change(sender, instance, **kwargs):
+    invalidate(*DEPENDENCIES[Report])
+    invalidate_users([instance.submitted_by_id])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_on_user_change(sender, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= IGNORED_USER_FIELDS:
+        return
+    invalidate(*DEPENDENCIES[User], USERS_GENERATION)
+
+
+@receiver(task_counters_changed)
+def invalidate_on_counter_change(sender, deltas, **kwargs):
+    # Also covers bulk_create and set-based updates, which send no post_save,
+    # and the previous assignee of a reassigned task
+    invalidate(*DEPENDENCIES[Task])
+    assignee = KEY_FIELDS.index('assigned_to_id')
+    invalidate_users([key[assignee] for key in deltas])
@@ -0,0 +1,215 @@
+"""
+Employee import from a ZIP of employees.csv + photos (bulk_create_employees_zip).
+
+Photos must be named <email>_passport and <email>_signature, optionally
+with a .jpg/.jpeg/.png extension, anywhere in the archive.
+"""
+import csv
+import os
+import shutil
+import tempfile
+import zipfile
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from employees.models import Employee
+
+User = get_user_model()
+
+
+def find_photo_anywhere(temp_dir, email, kind):
+    """
+    Search recursively for photo files by email and type (passport/signature).
+    Works with or without extensions (.jpg/.jpeg/.png) and case-insensitive.
+    """
+    base_name = f"{email.lower()}_{kind}"
+    for root, dirs, files in os.walk(temp_dir):
+        for f in files:
+            name, ext = os.path.splitext(f.lower())
+            if name == base_name:  # ✅ match even without extension
+                return os.path.join(root, f)
+            if f.lower().startswith(base_name):  # ✅ catch base + extension
+                if ext in ["", ".jpg", ".jpeg", ".png"]:
+                    return os.path.join(root, f)
+    return None
+
+
+def find_employees_csv(temp_dir):
+    for root, dirs, files in os.walk(temp_dir):
+        for f in files:
+            # normalize case-insensitive
+            if f.lower() == "employees.csv":
+                return os.path.join(root, f)
+    return None
+
+
+def _photo(path):
+    with open(path, "rb") as f:
+        return SimpleUploadedFile(name=os.path.basename(path), content=f.read(), content_type="image/jpeg")
+
+
+def import_employees(zip_file, admin, progress=None, dry_run=False):
+    """
+    Create an employee (user + profile) for every valid row of employees.csv in
+    `zip_file` (a path or file object). Returns the per-row results; raises
+    ValueError when the archive is unreadable or has no employees.csv.
+    With `dry_run`, returns (results, summary) as predicted by dry_run_rows()
+    and creates nothing.
+    """
+    temp_dir = tempfile.mkdtemp()
+    try:
+        try:
+            with zipfile.ZipFile(zip_file, 'r') as z:
+                z.extractall(temp_dir)
+        except zipfile.BadZipFile:
+            raise ValueError('Invalid ZIP file')
+
+        csv_path = find_employees_csv(temp_dir)
+        if not csv_path:
+            raise ValueError('employees.csv not found in ZIP')
+
+        with open(csv_path, newline='', encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            reader.fieldnames = [h.strip().lower() for h in reader.fieldnames if h]
+            rows = list(reader)
+
+        if dry_run:
+            return dry_run_rows(rows, temp_dir)
+
+        results = []
+        for idx, row in enumerate(rows, start=1):
+            results.append(_import_row(idx, row, admin, temp_dir))
+            if progress:
+                progress(idx, len(rows))
+        return results
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def _import_row(idx, row, admin, temp_dir):
+    name = row.get('name')
+    email = row.get('email')
+    password = row.get('password')
+    confirm_password = row.get('confirm_password')
+
+    # --- Validation ---
+    if not all([name, email, password, confirm_password]):
+        return {'row': idx, 'error': 'Missing required fields'}
+    if password != confirm_password:
+        return {'row': idx, 'error': 'Passwords do not match'}
+    if User.objects.filter(email=email).exists():
+        return {'row': idx, 'error': 'Email already exists'}
+    try:
+        User.validate_password_strength(password)
+    except ValidationError as e:
+        return {'row': idx, 'error': str(e)}
+
+    # --- Create User ---
+    user = User.objects.create_user(
+        username=name,
+        email=email,
+        password=password,
+        first_name=name,
+        state=admin.state,
+        role='employee',
+        is_active=True
+    )
+
+    # --- Find photos ---
+    passport_path = find_photo_anywhere(temp_dir, email, "passport")
+    signature_path = find_photo_anywhere(temp_dir, email, "signature")
+    passport_file = _photo(passport_path) if passport_path else None
+    signature_file = _photo(signature_path) if signature_path else None
+    warnings = []
+    if not passport_file:
+        warnings.append("Passport photo missing")
+    if not signature_file:
+        warnings.append("Signature photo missing")
+
+    # --- Create Employee profile ---
+    employee = Employee.objects.create(
+        user=user,
+        company_name=row.get('company_name'),
+        employee_id=row.get('employee_id'),
+        mobile_number=row.get('mobile_number'),
+        passport_photo=passport_file,
+        signature_photo=signature_file,
+    )
+
+    return {
+        'row': idx,
+        'message': 'Employee created',
+        'email': email,
+        'user_id': user.id,
+        'employee_id': employee.employee_id,
+        'passport_photo_saved': bool(passport_file),
+        'signature_photo_saved': bool(signature_file),
+        'warnings': warnings,
+    }
+
+
+def dry_run_rows(rows, temp_dir):
+    """
+    The results import_employees would give for `rows`, without writing:
+    existing emails and usernames are looked up with one query each, and
+    rows repeating an earlier row's email or name are reported the way the
+    real import would see them. Returns (results, summary).
+    """
+    emails = {row.get('email') for row in rows if row.get('email')}
+    names = {row.get('name') for row in rows if row.get('name')}
+    taken_emails = set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+    taken_names = set(User.objects.filter(username__in=names).values_list('username', flat=True))
+
+    results, summary = [], {'rows': len(rows), 'valid': 0, 'invalid': 0, 'duplicates': 0}
+    created_by_email, created_by_name = {}, {}
+    for idx, row in enumerate(rows, start=1):
+        name, email = row.get('name'), row.get('email')
+        password, confirm_password = row.get('password'), row.get('confirm_password')
+
+        # Same checks, in the same order, as the real import
+        error, first = None, None
+        if not all([name, email, password, confirm_password]):
+            error = 'Missing required fields'
+        elif password != confirm_password:
+            error = 'Passwords do not match'
+        elif email in taken_emails:
+            error = 'Email already exists'
+        elif email in created_by_email:
+            error, first = 'Email already exists', created_by_email[email]
+        else:
+            try:
+                User.validate_password_strength(password)
+            except ValidationError as e:
+                error = str(e)
+        # Would fail on the unique username when the user is saved
+        if not error and name in taken_names:
+            error = 'Username already exists'
+        elif not error and name in created_by_name:
+            error, first = 'Username already exists', created_by_name[name]
+
+        if error:
+            summary['invalid'] += 1
+            if first:
+                summary['duplicates'] += 1
+                error = f'{error} (row {first})'
+            results.append({'row': idx, 'error': error})
+            continue
+
+        created_by_email[email] = idx
+        created_by_name[name] = idx
+        summary['valid'] += 1
+        warnings = []
+        if not find_photo_anywhere(temp_dir, email, "passport"):
+            warnings.append("Passport photo missing")
+        if not find_photo_anywhere(temp_dir, email, "signature"):
+            warnings.append("Signature photo missing")
+        results.append({
+            'row': idx,
+            'message': 'Employee would be created',
+            'email': email,
+            'employee_id': row.get('employee_id'),
+            'warnings': warnings,
+        })
+    return results, summary
@@ -0,0 +1,304 @@
+"""
+Dashboard change events, consumed by the SSE endpoint (`views.dashboard_stream`).
+
+Events are stored as DashboardEvent rows once the writer's transaction
+commits, by whichever process made the change: request handlers, run_workers
+job processes, management commands. Every process that serves the stream
+runs one poller thread that tails the table by id and fans new rows out to
+its subscribers' asyncio queues.
+
+The event id is the row id, so a reconnecting client resumes from its
+Last-Event-ID in any process, also after a restart. An id that can't be
+resumed (newer than the newest row, older than what is still kept, or not a
+row id at all) makes the client resync. Rows are read with an overlap of
+SSE_POLL_OVERLAP_SECONDS, as with several writers a lower id can commit
+after a higher one; rows already delivered are skipped.
+"""
+import asyncio
+import datetime
+import json
+import logging
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import Max, Min, Q
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from reports.models import Report
+from .counters import KEY_FIELDS, task_counters_changed
+from .models import DashboardEvent
+
+logger = logging.getLogger(__name__)
+
+
+def poll_seconds():
+    return getattr(settings, 'SSE_POLL_SECONDS', 1.0)
+
+
+def overlap():
+    return datetime.timedelta(seconds=getattr(settings, 'SSE_POLL_OVERLAP_SECONDS', 10))
+
+
+def retention():
+    return datetime.timedelta(minutes=getattr(settings, 'SSE_EVENT_RETENTION_MINUTES', 60))
+
+
+def replay_limit():
+    return getattr(settings, 'SSE_REPLAY_BUFFER', 1000)
+
+
+def _event(row):
+    return {'id': row.id, 'event': row.event, 'data': row.data}
+
+
+def publish(event_type, data):
+    """
+    Record an event for every stream, in any process.
+    """
+    return _event(DashboardEvent.objects.create(event=event_type, data=data))
+
+
+def publish_on_commit(event_type, data):
+    transaction.on_commit(lambda: publish(event_type, data))
+
+
+def publish_all_on_commit(events):
+    """
+    Record (event type, data) pairs in one INSERT once the transaction commits.
+    """
+    events = list(events)
+    if events:
+        transaction.on_commit(lambda: DashboardEvent.objects.bulk_create(
+            [DashboardEvent(event=event_type, data=data) for event_type, data in events], batch_size=1000
+        ))
+
+
+def purge(before=None):
+    """
+    Drop events older than the retention period; clients that were away
+    longer resync.
+    """
+    deleted, _ = DashboardEvent.objects.filter(created_at__lt=before or timezone.now() - retention()).delete()
+    return deleted
+
+
+class Subscription:
+    def __init__(self, feed, loop, maxsize):
+        self.feed = feed
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        # Ids of events the client has (replayed, or from before it subscribed)
+        self.seen = set()
+        # Set when the subscriber fell too far behind and must resync
+        self.overflowed = False
+
+    def push(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.feed.unsubscribe(self)
+
+
+class ChangeFeed:
+    def __init__(self, queue_size=1000):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._queue_size = queue_size
+        self._cursor = None
+        self._delivered = {}   # id -> created_at of rows delivered within the overlap
+        self._thread = None
+
+    def start(self):
+        """
+        Start the poller thread, once per process.
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='dashboard-events', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        next_purge = 0
+        while True:
+            try:
+                self.poll()
+                if time.monotonic() >= next_purge:
+                    purge()
+                    next_purge = time.monotonic() + 60
+            except DatabaseError:
+                logger.warning('Polling dashboard events failed', exc_info=True)
+            finally:
+                close_old_connections()
+            time.sleep(poll_seconds())
+
+    def poll(self):
+        """
+        Hand the events committed since the last poll to every subscriber.
+        The first poll only finds where the table ends. Returns the events.
+        """
+        window = timezone.now() - overlap()
+        if self._cursor is None:
+            recent = DashboardEvent.objects.filter(created_at__gte=window).values_list('id', 'created_at')
+            self._delivered = dict(recent)
+            self._cursor = DashboardEvent.objects.aggregate(newest=Max('id'))['newest'] or 0
+            return []
+
+        rows = DashboardEvent.objects.filter(Q(id__gt=self._cursor) | Q(created_at__gte=window)).order_by('id')
+        events = []
+        for row in rows:
+            if row.id not in self._delivered:
+                self._delivered[row.id] = row.created_at
+                events.append(_event(row))
+        self._delivered = {i: at for i, at in self._delivered.items() if at >= window or i > self._cursor}
+        if events:
+            self._cursor = max(self._cursor, events[-1]['id'])
+            self._fan_out(events)
+        return events
+
+    def _fan_out(self, events):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            for event in events:
+                try:
+                    sub.loop.call_soon_threadsafe(sub.push, event)
+                except RuntimeError:
+                    # Event loop already closed; the subscriber is going away
+                    break
+
+    def subscribe(self):
+        """
+        Register the running event loop's consumer; see catch_up.
+        """
+        sub = Subscription(self, asyncio.get_running_loop(), self._queue_size)
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def catch_up(self, sub, last_event_id=None):
+        """
+        The stored events `sub` missed since `last_event_id` (all of them
+        committed after it subscribed follow live), or None if those can't
+        be told and the client must resync. Runs after subscribe, so nothing
+        falls in between; what the poller delivers again is in `sub.seen`.
+        """
+        bounds = DashboardEvent.objects.aggregate(oldest=Min('id'), newest=Max('id'))
+        newest = bounds['newest'] or 0
+        sub.seen = set(
+            DashboardEvent.objects.filter(created_at__gte=timezone.now() - overlap(), id__lte=newest)
+            .values_list('id', flat=True)
+        )
+        if last_event_id is None:
+            return []
+        try:
+            last = int(last_event_id)
+        except (TypeError, ValueError):
+            return None
+        if not 0 <= last <= newest or (bounds['oldest'] or 1) > last + 1:
+            return None
+        rows = list(DashboardEvent.objects.filter(id__gt=last, id__lte=newest).order_by('id')[:replay_limit() + 1])
+        if len(rows) > replay_limit():
+            return None
+        sub.seen.update(row.id for row in rows)
+        return [_event(row) for row in rows]
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+
+feed = ChangeFeed()
+
+
+def format_event(event):
+    lines = []
+    if 'id' in event:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['event']}")
+    lines.append(f"data: {json.dumps(event['data'], cls=DjangoJSONEncoder)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+# Tells the client its view may be stale and it should refetch the dashboard
+RESYNC = {'event': 'resync', 'data': {}}
+
+
+async def stream(last_event_id=None):
+    """
+    Async iterator of SSE-formatted text for one subscriber: missed events
+    first, then live ones, with a comment line as heartbeat while idle.
+    """
+    heartbeat = getattr(settings, 'SSE_HEARTBEAT_SECONDS', 15)
+    feed.start()
+    sub = feed.subscribe()
+    try:
+        missed = await sync_to_async(feed.catch_up)(sub, last_event_id)
+        yield f"retry: {getattr(settings, 'SSE_RETRY_MS', 5000)}\n\n"
+        if missed is None:
+            yield format_event(RESYNC)
+        else:
+            for event in missed:
+                yield format_event(event)
+
+        while not sub.overflowed:
+            try:
+                event = await sub.get(heartbeat)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            if event['id'] not in sub.seen:
+                yield format_event(event)
+
+        # Fell behind: the client reconnects and starts over from a refetch
+        yield format_event(RESYNC)
+    finally:
+        sub.close()
+
+
+@receiver(task_counters_changed)
+def publish_counter_deltas(sender, deltas, **kwargs):
+    publish_on_commit('counters', [
+        {**dict(zip(KEY_FIELDS, key)), 'delta': n}
+        for key, n in deltas.items()
+    ])
+
+
+@receiver(post_init, sender=Report)
+def remember_report_status(sender, instance, **kwargs):
+    instance._published_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Report)
+def publish_report_status(sender, instance, created, **kwargs):
+    previous = None if created else instance._published_status
+    if not created and instance.status == previous:
+        return
+    instance._published_status = instance.status
+    publish_on_commit('report', {
+        'report_id': instance.id,
+        'task_pk': instance.task_id,
+        'status': instance.status,
+        'previous_status': previous,
+    })
+
+
+@receiver(post_delete, sender=Report)
+def publish_report_deleted(sender, instance, **kwargs):
+    publish_on_commit('report', {
+        'report_id': instance.id,
+        'task_pk': instance.task_id,
+        'status': None,
+        'previous_status': instance.status,
+    })
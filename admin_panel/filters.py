@@ -0,0 +1,161 @@
+"""
+Declarative query-parameter filtering and sorting for list endpoints.
+
+A FilterSet maps whitelisted query parameters to ORM predicates on indexed
+columns, and `?sort=` to a whitelisted ordering:
+
+    filtered, ordering = TASK_FILTERS.apply(Task.objects.all(), request.GET)
+
+List parameters take comma-separated values (`?status=pending,in_progress`);
+date parameters take YYYY-MM-DD, and `_to` bounds are inclusive.
+"""
+import datetime
+
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from reports.models import Report
+
+
+class FilterError(ValueError):
+    pass
+
+
+def _strings(value):
+    return [v.strip() for v in value.split(',') if v.strip()]
+
+
+def _ints(value):
+    try:
+        return [int(v) for v in _strings(value)]
+    except ValueError:
+        raise FilterError('expected comma-separated ids')
+
+
+def _date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise FilterError('expected YYYY-MM-DD')
+
+
+def _day_start(value):
+    return timezone.make_aware(datetime.datetime.combine(_date(value), datetime.time()))
+
+
+def _next_day_start(value):
+    return _day_start(value) + datetime.timedelta(days=1)
+
+
+class Filter:
+    """
+    One query parameter: `parse` turns its raw value into the operand of
+    `lookup`, which is a field lookup or a callable returning a Q/expression.
+    """
+
+    def __init__(self, lookup, parse=_strings, choices=None):
+        self.lookup = lookup
+        self.parse = parse
+        self.choices = choices
+
+    def predicate(self, raw):
+        value = self.parse(raw)
+        if self.choices is not None:
+            invalid = [v for v in value if v not in self.choices]
+            if invalid:
+                raise FilterError(f'must be one of {", ".join(self.choices)}')
+        if callable(self.lookup):
+            return self.lookup(value)
+        return Q(**{self.lookup: value})
+
+
+class FilterSet:
+    def __init__(self, filters, sorts, default_sort):
+        self.filters = filters
+        self.sorts = sorts
+        self.default_sort = default_sort
+
+    def ordering(self, sort):
+        """
+        Keyset ordering for `?sort=`, e.g. "-deadline"; ties broken by id.
+        """
+        sort = sort or self.default_sort
+        name = sort.lstrip('-')
+        if name not in self.sorts:
+            raise FilterError(f'sort: must be one of {", ".join(sorted(self.sorts))}')
+        desc = '-' if sort.startswith('-') else ''
+        return (f'{desc}{self.sorts[name]}', f'{desc}id')
+
+    def apply(self, queryset, params):
+        """
+        `queryset` narrowed by every recognised parameter in `params`, and the
+        ordering requested by `sort`. Raises FilterError on bad values.
+        """
+        for name, flt in self.filters.items():
+            raw = params.get(name)
+            if raw in (None, ''):
+                continue
+            try:
+                queryset = queryset.filter(flt.predicate(raw))
+            except FilterError as e:
+                raise FilterError(f'{name}: {e}')
+        return queryset, self.ordering(params.get('sort'))
+
+
+def _task_has_report(statuses):
+    return Exists(Report.objects.filter(task=OuterRef('pk'), status__in=statuses))
+
+
+TASK_STATUSES = ('pending', 'in_progress', 'completed')
+REPORT_STATUSES = ('in_progress', 'pending', 'approved', 'rejected')
+
+TASK_FILTERS = FilterSet(
+    filters={
+        'status': Filter('status__in', choices=TASK_STATUSES),
+        'cluster': Filter('cluster_id__in', _ints),
+        'type': Filter('type_id__in', _ints),
+        'assignee': Filter('assigned_to_id__in', _ints),
+        'assigned_by': Filter('assigned_by_id__in', _ints),
+        'state': Filter('state__in'),
+        'planned_from': Filter('planned_date__gte', _date),
+        'planned_to': Filter('planned_date__lte', _date),
+        'deadline_from': Filter('deadline__gte', _day_start),
+        'deadline_to': Filter('deadline__lt', _next_day_start),
+        'report_status': Filter(_task_has_report, choices=REPORT_STATUSES),
+    },
+    sorts={
+        'created_at': 'created_at',
+        'assigned_date': 'assigned_date',
+        'planned_date': 'planned_date',
+        'deadline': 'deadline',
+        'status': 'status',
+        'task_id': 'task_id',
+    },
+    default_sort='-created_at',
+)
+
+REPORT_FILTERS = FilterSet(
+    filters={
+        'status': Filter('status__in', choices=REPORT_STATUSES),
+        'report_status': Filter('status__in', choices=REPORT_STATUSES),
+        'cluster': Filter('task__cluster_id__in', _ints),
+        'type': Filter('task__type_id__in', _ints),
+        'assignee': Filter('submitted_by_id__in', _ints),
+        'assigned_by': Filter('task__assigned_by_id__in', _ints),
+        'state': Filter('task__state__in'),
+        'planned_from': Filter('task__planned_date__gte', _date),
+        'planned_to': Filter('task__planned_date__lte', _date),
+        'deadline_from': Filter('task__deadline__gte', _day_start),
+        'deadline_to': Filter('task__deadline__lt', _next_day_start),
+        'submitted_from': Filter('submitted_at__gte', _day_start),
+        'submitted_to': Filter('submitted_at__lt', _next_day_start),
+    },
+    sorts={
+        'submitted_at': 'submitted_at',
+        'approved_at': 'approved_at',
+        'status': 'status',
+        'planned_date': 'task__planned_date',
+        'deadline': 'task__deadline',
+    },
+    default_sort='-submitted_at',
+)
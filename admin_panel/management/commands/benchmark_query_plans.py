@@ -0,0 +1,150 @@
+import datetime
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from admin_panel.models import Task, TaskType, Cluster
+from reports.models import Report
+
+User = get_user_model()
+
+STATES = [choice for choice, _ in User.STATE_CHOICES]
+TITLES = ["DG PM", "DG CM", "AC PM", "AC CM", "Site Visit"]
+STATUSES = ['pending', 'in_progress', 'completed']
+
+# Models whose Meta.indexes are compared; the schema had none of them before
+INDEXED_MODELS = (Task, Report, User)
+
+
+def hot_queries(employee, task, since):
+    """
+    The query shapes the indexes were chosen for, as (name, queryset).
+    """
+    return [
+        ('list_tasks ?status=', Task.objects.filter(status='pending').order_by('-created_at', '-id')[:50]),
+        ('get_my_tasks', Task.objects.filter(assigned_to=employee).order_by('-assigned_date')),
+        ('latest report of a task', Report.objects.filter(task=task).order_by('-submitted_at')[:1]),
+        ('my_reports', Report.objects.filter(submitted_by=employee).order_by('-submitted_at')),
+        ('reports by status', Report.objects.filter(status='approved').order_by('-submitted_at')[:50]),
+        ('all reports, newest first', Report.objects.order_by('-submitted_at')[:50]),
+        ('employees of a state', User.objects.filter(role='employee', state=employee.state)),
+        ('employees per state', User.objects.filter(role='employee').values('state').annotate(n=Count('id')).order_by()),
+        ('user by email', User.objects.filter(email=employee.email)),
+        ('rollup: tasks changed since',
+         Task.objects.filter(updated_at__gt=since).order_by().values_list('assigned_date', flat=True)),
+        ('sla: tasks due in window',
+         Task.objects.filter(deadline__gte=since, deadline__lt=timezone.now()).order_by().values_list('id', flat=True)),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a large dataset inside a transaction, print EXPLAIN plans and timings of the hot '
+        'queries without and with the Task/Report/User indexes, then roll everything back'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=50000, help='Number of tasks to seed')
+        parser.add_argument('--employees', type=int, default=200, help='Number of employees to seed')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query (best is reported)')
+
+    def handle(self, *args, **options):
+        if options['tasks'] < 1 or options['employees'] < 1:
+            raise CommandError('--tasks and --employees must be at least 1')
+
+        with transaction.atomic():
+            employee, task, since = self.seed(options['tasks'], options['employees'])
+            queries = hot_queries(employee, task, since)
+
+            self.drop_indexes()
+            before = [self.measure(qs, options['repeat']) for _, qs in queries]
+            self.create_indexes()
+            after = [self.measure(qs, options['repeat']) for _, qs in queries]
+
+            for (name, _), (plan_before, ms_before), (plan_after, ms_after) in zip(queries, before, after):
+                self.stdout.write(self.style.MIGRATE_HEADING(f'\n{name}: {ms_before:.2f} ms -> {ms_after:.2f} ms'))
+                self.stdout.write('  before:')
+                self.stdout.write(self.indent(plan_before))
+                self.stdout.write('  after:')
+                self.stdout.write(self.indent(plan_after))
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('\nSeed data rolled back.'))
+
+    def seed(self, n_tasks, n_employees):
+        self.stdout.write(f'Seeding {n_employees} employees and {n_tasks} tasks...')
+        rng = random.Random(42)
+        now = timezone.now()
+
+        User.objects.bulk_create([
+            User(username=f'bench-{i}', email=f'bench-{i}@example.com', role='employee',
+                 state=STATES[i % len(STATES)], first_name=f'Bench {i}')
+            for i in range(n_employees)
+        ], batch_size=1000)
+        employees = list(User.objects.filter(username__startswith='bench-'))
+        types = [TaskType.objects.create(name=title, color_code='#888888') for title in TITLES]
+        clusters = [Cluster.objects.create(name=f'Bench cluster {i}') for i in range(20)]
+
+        tasks = []
+        for i in range(n_tasks):
+            emp = employees[i % len(employees)]
+            t = i % len(TITLES)
+            assigned = now - datetime.timedelta(minutes=rng.randint(0, 365 * 24 * 60))
+            tasks.append(Task(
+                task_id=f'BENCH-{i}', global_id=f'G{i % 5000}', title=TITLES[t], type=types[t],
+                cluster=clusters[emp.id % len(clusters)], assigned_to=emp, state=emp.state,
+                status=rng.choice(STATUSES), assigned_date=assigned,
+                planned_date=(assigned + datetime.timedelta(days=2)).date(),
+                deadline=assigned + datetime.timedelta(days=7),
+            ))
+        Task.objects.bulk_create(tasks, batch_size=1000)
+
+        tasks = Task.objects.filter(task_id__startswith='BENCH-').values_list('id', 'assigned_to_id', 'assigned_date')
+        Report.objects.bulk_create([
+            Report(task_id=task_pk, submitted_by_id=emp_id,
+                   status=rng.choice(['in_progress', 'approved', 'rejected']),
+                   submitted_at=assigned + datetime.timedelta(days=1))
+            for n, (task_pk, emp_id, assigned) in enumerate(tasks) if n % 2 == 0
+        ], batch_size=1000)
+
+        task = Task.objects.filter(task_id='BENCH-0').first()
+        return employees[0], task, now - datetime.timedelta(days=30)
+
+    def _index_sql(self, action):
+        # Only used to render SQL: entering it would start its own transaction
+        # (and SQLite refuses to, inside ours)
+        editor = connection.schema_editor(atomic=False)
+        editor.deferred_sql = []
+        for model in INDEXED_MODELS:
+            for index in model._meta.indexes:
+                sql = index.remove_sql(model, editor) if action == 'remove' else index.create_sql(model, editor)
+                yield str(sql)
+
+    def drop_indexes(self):
+        with connection.cursor() as cursor:
+            for sql in self._index_sql('remove'):
+                cursor.execute(sql)
+
+    def create_indexes(self):
+        with connection.cursor() as cursor:
+            for sql in self._index_sql('create'):
+                cursor.execute(sql)
+
+    def measure(self, queryset, repeat):
+        plan = queryset.explain()
+        best = None
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            list(queryset.all())
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return plan, best
+
+    def indent(self, text):
+        return '\n'.join(f'    {line}' for line in text.splitlines())
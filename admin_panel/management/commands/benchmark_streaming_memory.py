@@ -0,0 +1,89 @@
+import os
+import resource
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from admin_panel.models import SiteData
+from admin_panel.streaming import stream_rows
+from admin_panel.views import _site_row
+
+PREFIX = 'BENCH-'
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the peak RSS of a process serving a listing as one rendered list (the old way) '
+        'and as a streamed response, at growing row counts. Each measurement runs in a fresh '
+        'process, so the figures include the database driver and the response buffers. Seed '
+        'rows are committed for those processes to read and deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 50000],
+                            help='Row counts to measure')
+        # Used by the measuring subprocesses
+        parser.add_argument('--measure', nargs=2, metavar=('MODE', 'ROWS'), help='(internal)')
+
+    def handle(self, *args, **options):
+        if options['measure']:
+            mode, rows = options['measure']
+            self.stdout.write(str(self.measure(mode, int(rows))))
+            return
+
+        sizes = sorted(options['rows'])
+        if sizes[0] < 1:
+            raise CommandError('--rows must be positive')
+        if SiteData.objects.filter(global_id__startswith=PREFIX).exists():
+            raise CommandError(f'Site data with global ids starting {PREFIX} exists already')
+
+        self.stdout.write(f'{"rows":>8}  {"buffered RSS":>14}  {"streamed RSS":>14}')
+        try:
+            seeded = 0
+            for size in sizes:
+                SiteData.objects.bulk_create([
+                    SiteData(global_id=f'{PREFIX}{i}', cluster_name=f'Bench cluster {i % 50}',
+                             site_name=f'Bench site {i}', latitude='17.6868', longitude='83.2185')
+                    for i in range(seeded, size)
+                ], batch_size=1000)
+                seeded = size
+                buffered, streamed = (self.run_measure(mode, size) for mode in ('buffered', 'streamed'))
+                self.stdout.write(f'{size:>8}  {self.mb(buffered):>14}  {self.mb(streamed):>14}')
+        finally:
+            SiteData.objects.filter(global_id__startswith=PREFIX).delete()
+
+    def run_measure(self, mode, rows):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+        result = subprocess.run(
+            [sys.executable, '-m', 'django', 'benchmark_streaming_memory', '--measure', mode, str(rows)],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        return int(result.stdout.split()[-1])
+
+    def measure(self, mode, rows):
+        """
+        Growth of this process's peak RSS (bytes) while producing the response
+        body for `rows` seeded sites.
+        """
+        sites = SiteData.objects.filter(global_id__startswith=PREFIX).order_by('id')[:rows]
+        _site_row(sites[0])   # Connection and imports are not part of the figure
+        before = self.max_rss()
+        if mode == 'buffered':
+            JSONRenderer().render([_site_row(s) for s in sites])
+        else:
+            response = stream_rows(RequestFactory().get('/'), sites, _site_row)
+            for _ in response.streaming_content:
+                pass
+        return self.max_rss() - before
+
+    def max_rss(self):
+        # ru_maxrss is in KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+    def mb(self, n):
+        return f'{n / 2 ** 20:.1f} MB'
@@ -0,0 +1,41 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from admin_panel import recurrence
+
+
+class Command(BaseCommand):
+    help = 'Create the tasks of active recurrence rules for the next window (safe to rerun)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help='Window length in days (default: RECURRENCE_WINDOW_DAYS)')
+        parser.add_argument('--start', help='First day of the window, YYYY-MM-DD (default: today)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would be created without writing anything')
+
+    def handle(self, *args, **options):
+        days = getattr(settings, 'RECURRENCE_WINDOW_DAYS', 31)
+        if options['days'] is not None:
+            if options['days'] < 1:
+                raise CommandError('--days must be at least 1')
+            days = options['days']
+        start = timezone.localdate()
+        if options['start']:
+            try:
+                start = datetime.date.fromisoformat(options['start'])
+            except ValueError:
+                raise CommandError('--start must be a date in YYYY-MM-DD format')
+        end = start + datetime.timedelta(days=days)
+
+        summary = recurrence.generate(start, end, dry_run=options['dry_run'])
+
+        verb = 'Would create' if options['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {summary['created']} task(s) from {summary['rules']} rule(s) "
+            f"for {start} to {end - datetime.timedelta(days=1)}; skipped {summary['existing']} already "
+            f"planned and {summary['open']} covered by an open task."
+        ))
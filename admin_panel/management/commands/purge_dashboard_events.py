@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from admin_panel import events
+
+
+class Command(BaseCommand):
+    help = 'Delete dashboard stream events older than SSE_EVENT_RETENTION_MINUTES'
+
+    def handle(self, *args, **kwargs):
+        deleted = events.purge()
+        self.stdout.write(self.style.SUCCESS(f'{deleted} dashboard event(s) purged.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from admin_panel import search
+
+
+class Command(BaseCommand):
+    help = 'Repopulate the full-text search index from tasks, sites and users'
+
+    def handle(self, *args, **kwargs):
+        if not search.available():
+            raise CommandError('The search index needs SQLite (FTS5)')
+        rows = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Search index rebuilt ({rows} rows).'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from admin_panel import counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute TaskStatusCounter rows from the Task table'
+
+    def handle(self, *args, **kwargs):
+        drifted = counters.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Task counters rebuilt ({drifted} drifted groups corrected).'))
@@ -0,0 +1,29 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from admin_panel import rollups
+
+
+class Command(BaseCommand):
+    help = 'Update the daily task rollups (incrementally, or a full backfill)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backfill', action='store_true',
+                            help='Recompute a whole date range instead of only changed days')
+        parser.add_argument('--days', type=int,
+                            help='With --backfill: only the last N days (default: since the first task)')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            start = None
+            if options['days'] is not None:
+                if options['days'] < 1:
+                    raise CommandError('--days must be at least 1')
+                start = timezone.localdate() - datetime.timedelta(days=options['days'] - 1)
+            days, rows = rollups.backfill(start=start)
+        else:
+            days, rows = rollups.roll_forward()
+
+        self.stdout.write(self.style.SUCCESS(f'Recomputed {days} day(s), {rows} rollup row(s) written.'))
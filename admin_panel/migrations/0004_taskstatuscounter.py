@@ -0,0 +1,56 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_counters(apps, schema_editor):
+    Task = apps.get_model('admin_panel', 'Task')
+    TaskStatusCounter = apps.get_model('admin_panel', 'TaskStatusCounter')
+    rows = (
+        Task.objects.order_by()
+        .values('title', 'type', 'cluster', 'assigned_to__state', 'assigned_to', 'status')
+        .annotate(n=Count('id'))
+    )
+    TaskStatusCounter.objects.bulk_create([
+        TaskStatusCounter(
+            title=r['title'],
+            type_id=r['type'],
+            cluster_id=r['cluster'],
+            state=r['assigned_to__state'] or '',
+            assigned_to_id=r['assigned_to'],
+            status=r['status'],
+            count=r['n'],
+        )
+        for r in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0003_task_planned_date'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStatusCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('state', models.CharField(blank=True, default='', max_length=100)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('in_progress', 'In Progress'), ('completed', 'Completed')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('assigned_to', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_status_counters', to=settings.AUTH_USER_MODEL)),
+                ('cluster', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_counters', to='admin_panel.cluster')),
+                ('type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_counters', to='admin_panel.tasktype')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('title', 'type', 'cluster', 'state', 'assigned_to', 'status'), name='unique_task_status_counter')],
+            },
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
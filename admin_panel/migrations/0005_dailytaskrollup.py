@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0004_taskstatuscounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyTaskRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('state', models.CharField(blank=True, default='', max_length=100)),
+                ('assigned', models.PositiveIntegerField(default=0)),
+                ('submitted', models.PositiveIntegerField(default=0)),
+                ('approved', models.PositiveIntegerField(default=0)),
+                ('rejected', models.PositiveIntegerField(default=0)),
+                ('cluster', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='admin_panel.cluster')),
+                ('type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='admin_panel.tasktype')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'cluster', 'type', 'state'), name='unique_daily_task_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:09
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_state(apps, schema_editor):
+    Task = apps.get_model('admin_panel', 'Task')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Task.objects.update(
+        state=Subquery(User.objects.filter(pk=OuterRef('assigned_to')).values('state')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0005_dailytaskrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='state',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.RunPython(backfill_state, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['state', 'status'], name='task_state_status_idx'),
+        ),
+    ]
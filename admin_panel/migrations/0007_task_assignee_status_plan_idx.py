@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0006_task_state'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', 'status', 'planned_date'], name='task_assignee_status_plan_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0007_task_assignee_status_plan_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['deadline'], name='task_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['planned_date'], name='task_planned_date_idx'),
+        ),
+    ]
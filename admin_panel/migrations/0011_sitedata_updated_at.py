@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0010_query_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sitedata',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
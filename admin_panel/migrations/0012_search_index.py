@@ -0,0 +1,131 @@
+from django.db import migrations
+
+# Row expressions per source table; {r} is NEW inside triggers.
+# admin_panel.search.ROWS_SQL holds the same expressions for rebuilds.
+TASK_ROW = """
+    SELECT {r}.id * 4 + 1,
+           {r}.task_id || ' ' || {r}.global_id,
+           coalesce({r}.title, '') || ' ' || coalesce({r}.site_name, '') || ' ' || coalesce({r}.cluster_name, '')
+           || ' ' || coalesce((SELECT u.first_name || ' ' || u.last_name || ' ' || u.email
+                               FROM authentication_user u WHERE u.id = {r}.assigned_to_id), '')
+"""
+SITE_ROW = """
+    SELECT {r}.id * 4 + 2, {r}.global_id || ' ' || {r}.site_name, coalesce({r}.cluster_name, '')
+"""
+USER_ROW = """
+    SELECT {r}.id * 4 + 3,
+           {r}.first_name || ' ' || {r}.last_name || ' ' || {r}.username,
+           {r}.email || ' ' || coalesce({r}.global_id, '') || ' ' || coalesce({r}.state_user_id, '')
+           || ' ' || {r}.role || ' ' || {r}.state
+"""
+
+INSERT = 'INSERT INTO search_index(rowid, name, detail)'
+
+CREATE = [
+    """
+    CREATE VIRTUAL TABLE search_index USING fts5(
+        name, detail, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+
+    f"""
+    CREATE TRIGGER search_task_insert AFTER INSERT ON admin_panel_task BEGIN
+        {INSERT} {TASK_ROW.format(r='NEW')};
+    END
+    """,
+    f"""
+    CREATE TRIGGER search_task_update
+    AFTER UPDATE OF task_id, global_id, title, site_name, cluster_name, assigned_to_id ON admin_panel_task BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 4 + 1;
+        {INSERT} {TASK_ROW.format(r='NEW')};
+    END
+    """,
+    """
+    CREATE TRIGGER search_task_delete AFTER DELETE ON admin_panel_task BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 4 + 1;
+    END
+    """,
+
+    f"""
+    CREATE TRIGGER search_site_insert AFTER INSERT ON admin_panel_sitedata BEGIN
+        {INSERT} {SITE_ROW.format(r='NEW')};
+    END
+    """,
+    f"""
+    CREATE TRIGGER search_site_update
+    AFTER UPDATE OF global_id, site_name, cluster_name ON admin_panel_sitedata BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 4 + 2;
+        {INSERT} {SITE_ROW.format(r='NEW')};
+    END
+    """,
+    """
+    CREATE TRIGGER search_site_delete AFTER DELETE ON admin_panel_sitedata BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 4 + 2;
+    END
+    """,
+
+    f"""
+    CREATE TRIGGER search_user_insert AFTER INSERT ON authentication_user BEGIN
+        {INSERT} {USER_ROW.format(r='NEW')};
+    END
+    """,
+    f"""
+    CREATE TRIGGER search_user_update
+    AFTER UPDATE OF first_name, last_name, username, email, global_id, state_user_id, role, state
+    ON authentication_user BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 4 + 3;
+        {INSERT} {USER_ROW.format(r='NEW')};
+    END
+    """,
+    # Task rows carry the assignee's name and email
+    f"""
+    CREATE TRIGGER search_user_tasks_update
+    AFTER UPDATE OF first_name, last_name, email ON authentication_user
+    WHEN OLD.first_name IS NOT NEW.first_name OR OLD.last_name IS NOT NEW.last_name
+         OR OLD.email IS NOT NEW.email
+    BEGIN
+        DELETE FROM search_index
+        WHERE rowid IN (SELECT id * 4 + 1 FROM admin_panel_task WHERE assigned_to_id = NEW.id);
+        {INSERT} {TASK_ROW.format(r='t')} FROM admin_panel_task t WHERE t.assigned_to_id = NEW.id;
+    END
+    """,
+    """
+    CREATE TRIGGER search_user_delete AFTER DELETE ON authentication_user BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 4 + 3;
+    END
+    """,
+
+    f"{INSERT} {TASK_ROW.format(r='t')} FROM admin_panel_task t",
+    f"{INSERT} {SITE_ROW.format(r='s')} FROM admin_panel_sitedata s",
+    f"{INSERT} {USER_ROW.format(r='u')} FROM authentication_user u",
+]
+
+DROP = [
+    f'DROP TRIGGER IF EXISTS {name}' for name in (
+        'search_task_insert', 'search_task_update', 'search_task_delete',
+        'search_site_insert', 'search_site_update', 'search_site_delete',
+        'search_user_insert', 'search_user_update', 'search_user_tasks_update', 'search_user_delete',
+    )
+] + ['DROP TABLE IF EXISTS search_index']
+
+
+def run(statements):
+    def apply(apps, schema_editor):
+        # FTS5 and these triggers are SQLite-only
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0011_sitedata_updated_at'),
+        ('authentication', '0004_query_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(CREATE), run(DROP)),
+    ]
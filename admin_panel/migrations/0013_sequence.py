@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:33
+
+from django.db import migrations, models
+
+
+def seed_task_id_sequence(apps, schema_editor):
+    # Continue after the highest T<number> task_id issued so far
+    Task = apps.get_model('admin_panel', 'Task')
+    Sequence = apps.get_model('admin_panel', 'Sequence')
+    numbers = [
+        int(task_id[1:])
+        for task_id in Task.objects.filter(task_id__regex=r'^T[0-9]+$').values_list('task_id', flat=True)
+    ]
+    Sequence.objects.create(name='task_id', value=max(numbers, default=100000))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0012_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_task_id_sequence, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:39
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0014_recurrencerule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('event', models.CharField(max_length=50)),
+                ('data', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
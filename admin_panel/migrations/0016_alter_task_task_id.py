@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0015_dashboardevent'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='task',
+            name='task_id',
+            field=models.CharField(editable=False, max_length=100, unique=True),
+        ),
+    ]
@@ -1,9 +1,7 @@
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
-from django.dispatch import receiver
-from django.db.models.signals import post_save
-import uuid
 
 class TaskType(models.Model):
     """
@@ -39,10 +37,42 @@ class SiteData(models.Model):
     site_name = models.CharField(max_length=100)
     latitude = models.CharField(max_length=30, blank=True, null=True)
     longitude = models.CharField(max_length=30, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.global_id} - {self.site_name}"
 
+class TaskQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Same as QuerySet.bulk_create, but fills in `task_id` and `state` like
+        Task.save() and keeps TaskStatusCounter in step (bulk_create does not
+        send post_save).
+        """
+        objs = list(objs)
+        unnumbered = [t for t in objs if not t.task_id]
+        if unnumbered:
+            from .sequences import task_ids
+            for task, task_id in zip(unnumbered, task_ids(len(unnumbered))):
+                task.task_id = task_id
+        missing = [t for t in objs if not t.state]
+        if missing:
+            from django.contrib.auth import get_user_model
+            states = dict(
+                get_user_model().objects
+                .filter(id__in={t.assigned_to_id for t in missing})
+                .values_list('id', 'state')
+            )
+            for task in missing:
+                task.state = states.get(task.assigned_to_id) or ''
+
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if not kwargs.get('ignore_conflicts') and not kwargs.get('update_conflicts'):
+            from .counters import record_created
+            record_created(objs)
+        return objs
+
+
 class Task(models.Model):
     """
     Task assigned to an employee for a specific site and cluster.
@@ -53,7 +83,7 @@ class Task(models.Model):
         ('completed', 'Completed'),
     )
 
-    # 🔹 task_id auto-generated after creation
+    # 🔹 task_id allocated on creation from the task_id sequence (T100001, ...)
     task_id = models.CharField(max_length=100, unique=True, editable=False)
     global_id = models.CharField(max_length=100)
     title = models.CharField(max_length=200)  # e.g. "DG PM", "DG CM", etc.
@@ -93,11 +123,54 @@ class Task(models.Model):
         related_name="assigned_tasks"
     )
 
+    # 🔹 copied from the assignee (on create and reassignment), so state-wise queries need no join
+    state = models.CharField(max_length=100, blank=True, default='')
+
+    objects = TaskQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.task_id} - {self.title} ({self.status})"
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=['state', 'status'], name='task_state_status_idx'),
+            models.Index(fields=['assigned_to', 'status', 'planned_date'], name='task_assignee_status_plan_idx'),
+            # list_tasks keyset pagination, unfiltered and ?status=
+            models.Index(fields=['created_at', 'id'], name='task_created_id_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='task_status_created_idx'),
+            # employees get_my_tasks: a user's tasks by assigned_date
+            models.Index(fields=['assigned_to', 'assigned_date'], name='task_assignee_assigned_idx'),
+            # rollups.touched_days: rows changed since the watermark
+            models.Index(fields=['updated_at'], name='task_updated_idx'),
+            # SLA windows (admin_panel.sla)
+            models.Index(fields=['deadline'], name='task_deadline_idx'),
+            models.Index(fields=['planned_date'], name='task_planned_date_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_assignee_id = instance.__dict__.get('assigned_to_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.task_id:
+            from .sequences import task_ids
+            self.task_id, = task_ids(1)
+        if self.assigned_to_id:
+            if self._state.adding:
+                reassigned = not self.state
+            else:
+                reassigned = self.assigned_to_id != getattr(self, '_saved_assignee_id', self.assigned_to_id)
+            if reassigned:
+                # 🔹 state follows the assignee, also when a task is reassigned
+                self.state = self.assigned_to.state or ''
+                update_fields = kwargs.get('update_fields')
+                if update_fields is not None and 'state' not in update_fields:
+                    kwargs['update_fields'] = [*update_fields, 'state']
+        super().save(*args, **kwargs)
+        self._saved_assignee_id = self.assigned_to_id
 
     @property
     def task_name(self):
@@ -113,30 +186,164 @@ class Task(models.Model):
         Example usage for dashboard aggregation.
         Returns a dict mapping display names to counts by status.
         """
-        mapping = [
-            ("DG PM", "DG PM"),
-            ("DG CM", "DG CM"),
-            ("AC PM", "AC PM"),
-            ("AC CM", "AC CM"),
-            ("Site Visit", "Site Visit"),
+        from .dashboard import task_type_stats
+        return [
+            {k: v for k, v in row.items() if k != 'color'}
+            for row in task_type_stats()
+        ]
+
+
+class TaskStatusCounter(models.Model):
+    """
+    Denormalized number of tasks per (title, type, cluster, state, assignee, status).
+    Kept up to date by admin_panel.counters; `rebuild_task_counters` reconciles drift.
+    """
+    title = models.CharField(max_length=200)
+    type = models.ForeignKey("TaskType", on_delete=models.CASCADE, related_name="status_counters")
+    cluster = models.ForeignKey("Cluster", on_delete=models.CASCADE, related_name="status_counters")
+    state = models.CharField(max_length=100, blank=True, default='')
+    assigned_to = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="task_status_counters"
+    )
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title', 'type', 'cluster', 'state', 'assigned_to', 'status'],
+                name='unique_task_status_counter',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.title} / {self.status}: {self.count}"
+
+
+class DailyTaskRollup(models.Model):
+    """
+    Per-day task activity by cluster, task type and state.
+    Filled by the `rollup_task_stats` command (see admin_panel.rollups).
+    """
+    date = models.DateField()
+    cluster = models.ForeignKey("Cluster", on_delete=models.CASCADE, related_name="daily_rollups")
+    type = models.ForeignKey("TaskType", on_delete=models.CASCADE, related_name="daily_rollups")
+    state = models.CharField(max_length=100, blank=True, default='')
+
+    assigned = models.PositiveIntegerField(default=0)
+    submitted = models.PositiveIntegerField(default=0)
+    approved = models.PositiveIntegerField(default=0)
+    rejected = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'cluster', 'type', 'state'],
+                name='unique_daily_task_rollup',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.cluster_id}/{self.type_id}/{self.state}"
+
+
+class RollupWatermark(models.Model):
+    """
+    Point in time up to which a rollup has processed changed rows.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+
+class Sequence(models.Model):
+    """
+    Named counter that hands out contiguous blocks of numbers.
+    `value` is the last number issued; see admin_panel.sequences.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class RecurrenceRule(models.Model):
+    """
+    Recurring task (e.g. a monthly DG PM) for one site, or for every site of a
+    cluster, assigned to a default engineer. Tasks are created ahead of time
+    by the `generate_recurring_tasks` command (see admin_panel.recurrence);
+    `generated_until` is the end of the last window materialized, so tasks
+    deleted by hand are not brought back on the next run.
+    """
+    UNIT_CHOICES = (
+        ('day', 'Day'),
+        ('week', 'Week'),
+        ('month', 'Month'),
+    )
+
+    title = models.CharField(max_length=200)  # becomes Task.title, e.g. "DG PM"
+    type = models.ForeignKey("TaskType", on_delete=models.CASCADE, related_name="recurrence_rules")
+    site = models.ForeignKey(
+        "SiteData", on_delete=models.CASCADE, null=True, blank=True, related_name="recurrence_rules"
+    )
+    cluster = models.ForeignKey(
+        "Cluster", on_delete=models.CASCADE, null=True, blank=True, related_name="recurrence_rules"
+    )
+
+    # 🔹 Every `every` days/weeks/months from start_date (until end_date, if set)
+    every = models.PositiveIntegerField(default=1)
+    unit = models.CharField(max_length=10, choices=UNIT_CHOICES, default='month')
+    start_date = models.DateField()
+    end_date = models.DateField(null=True, blank=True)
+
+    assigned_to = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="recurrence_rules"
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="created_recurrence_rules"
+    )
+    is_active = models.BooleanField(default=True)
+    generated_until = models.DateField(null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(site__isnull=False, cluster__isnull=True)
+                    | models.Q(site__isnull=True, cluster__isnull=False)
+                ),
+                name='recurrence_rule_site_or_cluster',
+            ),
+            models.CheckConstraint(condition=models.Q(every__gte=1), name='recurrence_rule_every_positive'),
         ]
-        stats = []
-        for dash_name, db_title in mapping:
-            qs = Task.objects.filter(title=db_title)
-            stats.append({
-                "task_name": dash_name,
-                "total": qs.count(),
-                "completed": qs.filter(status="completed").count(),
-                "pending": qs.filter(status="pending").count(),
-                "in_progress": qs.filter(status="in_progress").count(),
-            })
-        return stats
-
-
-# 🔹 Signal to auto-generate unique task_id after creation
-@receiver(post_save, sender=Task)
-def set_task_id(sender, instance, created, **kwargs):
-    if created and not instance.task_id:
-        # Sequential style (T100001, T100002, ...)
-        instance.task_id = f"T{instance.id + 100000}"
-        instance.save(update_fields=["task_id"])
\ No newline at end of file
+
+    def __str__(self):
+        return f"{self.title} every {self.every} {self.unit}(s) @ {self.site or self.cluster}"
+
+
+class DashboardEvent(models.Model):
+    """
+    A dashboard change event for the SSE stream, recorded by whichever
+    process made the change and tailed by id; see admin_panel.events.
+    """
+    id = models.BigAutoField(primary_key=True)
+    event = models.CharField(max_length=50)
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.event} #{self.id}"
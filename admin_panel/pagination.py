@@ -0,0 +1,183 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are selected with a WHERE on the sort key of the previous page's last
+row instead of OFFSET, so every page costs the same however deep the client
+scrolls. The ordering must end with a unique field (normally `id`); nullable
+sort fields are ordered with NULLs last in both directions.
+"""
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import BooleanField, Expression, F, Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder rounds datetimes to milliseconds; cursors must be exact
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _resolve_field(model, path):
+    field = None
+    for name in path.split('__'):
+        field = model._meta.get_field(name)
+        model = field.related_model
+    return field
+
+
+def _value(obj, path):
+    for name in path.split('__'):
+        if obj is None:
+            return None
+        obj = getattr(obj, name)
+    return obj
+
+
+class RowValueCompare(Expression):
+    """
+    (a, b, ...) < (x, y, ...) (or >) as one SQL row-value comparison, which
+    SQLite and PostgreSQL turn into a range scan of an index on (a, b, ...).
+    """
+    output_field = BooleanField()
+    conditional = True
+
+    def __init__(self, names, op, values):
+        super().__init__()
+        self.columns = [F(name) for name in names]
+        self.op = op
+        self.values = list(values)
+
+    def get_source_expressions(self):
+        return self.columns
+
+    def set_source_expressions(self, exprs):
+        self.columns = exprs
+
+    def as_sql(self, compiler, connection):
+        columns, params = [], []
+        for column in self.columns:
+            sql, column_params = compiler.compile(column)
+            columns.append(sql)
+            params.extend(column_params)
+        params.extend(
+            column.output_field.get_db_prep_value(value, connection)
+            for column, value in zip(self.columns, self.values)
+        )
+        placeholders = ', '.join(['%s'] * len(self.values))
+        return f"({', '.join(columns)}) {self.op} ({placeholders})", params
+
+
+class KeysetPaginator:
+    """
+    paginator = KeysetPaginator(('-created_at', '-id'))
+    page, next_cursor = paginator.paginate(queryset, request)
+    """
+
+    def __init__(self, ordering, page_size=None, max_page_size=None):
+        self.ordering = [
+            (name.lstrip('-'), name.startswith('-')) for name in ordering
+        ]
+        self.page_size = page_size or getattr(settings, 'API_PAGE_SIZE', 50)
+        self.max_page_size = max_page_size or getattr(settings, 'API_MAX_PAGE_SIZE', 500)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.GET.get('page_size', self.page_size))
+        except ValueError:
+            size = self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def order(self, queryset):
+        # NULLS LAST only where NULLs can occur, so plain columns keep
+        # orderings an index can serve as is
+        return queryset.order_by(*[
+            (F(name).desc(nulls_last=True) if desc else F(name).asc(nulls_last=True))
+            if _resolve_field(queryset.model, name).null
+            else (F(name).desc() if desc else F(name).asc())
+            for name, desc in self.ordering
+        ])
+
+    def encode_cursor(self, obj):
+        values = [_value(obj, name) for name, _ in self.ordering]
+        raw = json.dumps(values, cls=_CursorEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, model, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            values = json.loads(raw)
+        except (ValueError, TypeError):
+            raise InvalidCursor('Invalid cursor')
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise InvalidCursor('Invalid cursor')
+        try:
+            return [
+                None if value is None else _resolve_field(model, name).to_python(value)
+                for (name, _), value in zip(self.ordering, values)
+            ]
+        except ValidationError:
+            raise InvalidCursor('Invalid cursor')
+
+    def _after(self, model, values):
+        """
+        Rows strictly after `values` in the ordering. When every field sorts
+        the same way and none is nullable this is a row-value comparison,
+        (a, b) > (x, y), which the database answers with a range scan of the
+        matching index. Otherwise it is (a > x) OR (a = x AND b > y) OR ...,
+        with NULLs sorting last, ANDed with a bound on the first field so the
+        OR chain still starts from an index range instead of sorting every
+        remaining row.
+        """
+        nullable = [_resolve_field(model, name).null for name, _ in self.ordering]
+        directions = {desc for _, desc in self.ordering}
+        if len(directions) == 1 and not any(nullable) and None not in values:
+            op = '<' if directions.pop() else '>'
+            return RowValueCompare([name for name, _ in self.ordering], op, values)
+
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (name, desc), value in zip(self.ordering, values):
+            if value is None:
+                # Nothing sorts after NULL on this field
+                equal &= Q(**{f'{name}__isnull': True})
+                continue
+            beyond = Q(**{f'{name}__{"lt" if desc else "gt"}': value})
+            if _resolve_field(model, name).null:
+                beyond |= Q(**{f'{name}__isnull': True})
+            condition |= equal & beyond
+            equal &= Q(**{name: value})
+
+        (first, desc), value = self.ordering[0], values[0]
+        if value is not None:
+            bound = Q(**{f'{first}__{"lte" if desc else "gte"}': value})
+            if nullable[0]:
+                bound |= Q(**{f'{first}__isnull': True})
+            condition &= bound
+        return condition
+
+    def paginate(self, queryset, request):
+        """
+        The page of `queryset` after the `cursor` query param, and the cursor
+        of the page after it (None on the last page).
+        """
+        size = self.get_page_size(request)
+        queryset = self.order(queryset)
+        cursor = request.GET.get('cursor')
+        if cursor:
+            queryset = queryset.filter(self._after(queryset.model, self.decode_cursor(queryset.model, cursor)))
+
+        rows = list(queryset[:size + 1])
+        page = rows[:size]
+        next_cursor = self.encode_cursor(page[-1]) if len(rows) > size else None
+        return page, next_cursor
@@ -0,0 +1,167 @@
+"""
+Materializing recurring tasks (RecurrenceRule) ahead of time.
+
+generate(start, end) creates every task the active rules call for in
+[start, end) with a fixed number of queries, however many rules and sites:
+
+1. the rules, and the sites of every cluster rule, are read up front;
+2. tasks already planned in the window (plus each rule's next period) are
+   read in one query, and an occurrence is skipped when
+   - a task with the same site, title and planned date exists (any status), or
+   - an open task with the same site and title is planned within the
+     occurrence's period (e.g. one added by CSV a few days later);
+3. the rest is inserted with bulk_create, in the same transaction that
+   moves the rules' `generated_until` forward.
+
+Occurrences before a rule's `generated_until` are never materialized again,
+so rerunning for the same or an overlapping window creates nothing twice.
+"""
+import bisect
+import datetime
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Cluster, RecurrenceRule, SiteData, Task
+from .task_import import get_or_create_all
+
+OPEN_STATUSES = ('pending', 'in_progress')
+BATCH_SIZE = 1000
+
+
+def _nth(rule, k):
+    if rule.unit == 'month':
+        # From start_date each time, so the 31st stays the last day of short months
+        return rule.start_date + relativedelta(months=k * rule.every)
+    days = rule.every * (7 if rule.unit == 'week' else 1)
+    return rule.start_date + datetime.timedelta(days=k * days)
+
+
+def occurrences(rule, start, end):
+    """
+    (date, next date) for each occurrence of `rule` in [start, end).
+    """
+    longest_period = rule.every * {'day': 1, 'week': 7, 'month': 31}[rule.unit]
+    k = max(0, (start - rule.start_date).days // longest_period)
+    date = _nth(rule, k)
+    while date < start:
+        k += 1
+        date = _nth(rule, k)
+    while date < end and (rule.end_date is None or date <= rule.end_date):
+        following = _nth(rule, k + 1)
+        yield date, following
+        k, date = k + 1, following
+
+
+def due_rules(start, end):
+    return (
+        RecurrenceRule.objects
+        .filter(is_active=True, start_date__lt=end)
+        .filter(Q(end_date__isnull=True) | Q(end_date__gte=start))
+        .filter(Q(generated_until__isnull=True) | Q(generated_until__lt=end))
+    )
+
+
+def _sites_by_cluster(rules):
+    names = {rule.cluster.name for rule in rules if rule.cluster_id}
+    sites = {}
+    for site in SiteData.objects.filter(cluster_name__in=names).order_by('global_id'):
+        sites.setdefault(site.cluster_name, []).append(site)
+    return sites
+
+
+def _planned(rules, start, until):
+    """
+    Existing (global_id, title, planned_date) keys, and open tasks' planned
+    dates by (global_id, title), for the rules' titles in [start, until).
+    """
+    existing, open_dates = set(), {}
+    tasks = Task.objects.filter(
+        title__in={rule.title for rule in rules},
+        planned_date__gte=start, planned_date__lt=until,
+    ).values_list('global_id', 'title', 'planned_date', 'status')
+    for global_id, title, planned_date, status in tasks.iterator(chunk_size=5000):
+        existing.add((global_id, title, planned_date))
+        if status in OPEN_STATUSES:
+            open_dates.setdefault((global_id, title), []).append(planned_date)
+    for dates in open_dates.values():
+        dates.sort()
+    return existing, open_dates
+
+
+def _has_open(open_dates, key, date, following):
+    dates = open_dates.get(key)
+    if not dates:
+        return False
+    i = bisect.bisect_left(dates, date)
+    return i < len(dates) and dates[i] < following
+
+
+def generate(start, end, dry_run=False):
+    """
+    Create the tasks of all active rules due in [start, end). Returns a
+    summary: rules considered, occurrences due, tasks created, and
+    occurrences skipped because the task exists or an open one covers it.
+    """
+    summary = {'rules': 0, 'due': 0, 'created': 0, 'existing': 0, 'open': 0}
+    with transaction.atomic():
+        # Concurrent runs queue up here instead of both inserting
+        rules = list(
+            due_rules(start, end).select_for_update(of=('self',))
+            .select_related('type', 'site', 'cluster', 'assigned_to', 'created_by')
+            .order_by('id')
+        )
+        summary['rules'] = len(rules)
+        if not rules:
+            return summary
+
+        windows = {
+            rule.pk: list(occurrences(rule, max(start, rule.generated_until or start), end))
+            for rule in rules
+        }
+        until = max([following for dates in windows.values() for _, following in dates], default=end)
+        existing, open_dates = _planned(rules, start, until)
+        cluster_sites = _sites_by_cluster(rules)
+
+        planned = []
+        for rule in rules:
+            sites = [rule.site] if rule.site_id else cluster_sites.get(rule.cluster.name, [])
+            for date, following in windows[rule.pk]:
+                for site in sites:
+                    summary['due'] += 1
+                    if (site.global_id, rule.title, date) in existing:
+                        summary['existing'] += 1
+                    elif _has_open(open_dates, (site.global_id, rule.title), date, following):
+                        summary['open'] += 1
+                    else:
+                        # Two rules for the same site and title only create one task
+                        existing.add((site.global_id, rule.title, date))
+                        planned.append((rule, site, date))
+
+        summary['created'] = len(planned)
+        if dry_run:
+            return summary
+
+        site_clusters = get_or_create_all(
+            Cluster,
+            list(dict.fromkeys(site.cluster_name for rule, site, _ in planned if rule.site_id)),
+        )
+        Task.objects.bulk_create([
+            Task(
+                global_id=site.global_id,
+                title=rule.title,
+                status='pending',
+                type=rule.type,
+                cluster=rule.cluster or site_clusters[site.cluster_name],
+                assigned_to=rule.assigned_to,
+                planned_date=date,
+                site=site,
+                site_name=site.site_name,
+                cluster_name=site.cluster_name,
+                assigned_by=rule.created_by,
+            )
+            for rule, site, date in planned
+        ], batch_size=BATCH_SIZE)
+        RecurrenceRule.objects.filter(pk__in=[rule.pk for rule in rules]).update(generated_until=end)
+    return summary
@@ -0,0 +1,204 @@
+"""
+Daily task activity rollups (DailyTaskRollup).
+
+A day's rows are always recomputed as a whole from Task and Report, so
+rerunning is idempotent. The incremental run only recomputes the days touched
+by rows changed since the last watermark: every day a changed row has a
+timestamp on, including ones it no longer counts towards (a report approved
+after being rejected keeps its rejected_at). Deleted reports are found
+through their sync tombstones, which carry the days they counted on; deleted
+tasks leave no trace, so they are only picked up by a backfill.
+"""
+import datetime
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from reports.models import Report
+from sync.models import Tombstone
+from .models import Task, DailyTaskRollup, RollupWatermark
+
+WATERMARK = 'daily_task_rollup'
+
+# Changed rows are looked up with this much overlap, so rows committed by
+# transactions that were still open at the previous run are not missed
+OVERLAP = datetime.timedelta(minutes=5)
+
+METRICS = ('assigned', 'submitted', 'approved', 'rejected')
+
+# Report timestamps the metrics are dated by
+REPORT_DATE_FIELDS = ('submitted_at', 'approved_at', 'rejected_at')
+
+
+def _sources():
+    """
+    (metric, queryset, event timestamp field, path from the row to its task)
+    """
+    return [
+        ('assigned', Task.objects.all(), 'assigned_date', ''),
+        ('submitted', Report.objects.all(), 'submitted_at', 'task__'),
+        ('approved', Report.objects.filter(status='approved'), 'approved_at', 'task__'),
+        ('rejected', Report.objects.filter(status='rejected'), 'rejected_at', 'task__'),
+    ]
+
+
+def _compute(day_filter):
+    """
+    Rollup values per (date, cluster, type, state) for the days selected by
+    `day_filter(field)`, one GROUP BY query per metric.
+    """
+    rows = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+    for metric, queryset, field, task in _sources():
+        grouped = (
+            queryset.filter(day_filter(field))
+            .annotate(day=TruncDate(field))
+            .values('day', f'{task}cluster', f'{task}type', f'{task}state')
+            .annotate(n=Count('id'))
+            .order_by()
+        )
+        for r in grouped:
+            key = (r['day'], r[f'{task}cluster'], r[f'{task}type'], r[f'{task}state'] or '')
+            rows[key][metric] = r['n']
+    return rows
+
+
+def _replace(day_filter, days_q):
+    rows = _compute(day_filter)
+    DailyTaskRollup.objects.filter(days_q).delete()
+    DailyTaskRollup.objects.bulk_create([
+        DailyTaskRollup(date=day, cluster_id=cluster, type_id=type_id, state=state, **values)
+        for (day, cluster, type_id, state), values in rows.items()
+    ])
+    return len(rows)
+
+
+def recompute_days(days):
+    """
+    Rebuild the rollup rows of the given dates.
+    """
+    days = sorted(set(days))
+    if not days:
+        return 0
+    return _replace(lambda field: Q(**{f'{field}__date__in': days}), Q(date__in=days))
+
+
+def recompute_range(start, end):
+    """
+    Rebuild the rollup rows of every date in [start, end].
+    """
+    return _replace(lambda field: Q(**{f'{field}__date__range': (start, end)}), Q(date__range=(start, end)))
+
+
+def _dates(queryset, *fields):
+    days = set()
+    for field in fields:
+        days.update(
+            queryset.filter(**{f'{field}__isnull': False})
+            .annotate(day=TruncDate(field))
+            .values_list('day', flat=True)
+            .distinct()
+            .order_by()
+        )
+    return days
+
+
+def report_days(*moments):
+    """
+    ISO dates of a report's REPORT_DATE_FIELDS values (None skipped), for its
+    tombstone.
+    """
+    return sorted({timezone.localdate(moment).isoformat() for moment in moments if moment})
+
+
+def touched_days(since, until):
+    """
+    Dates whose rollups may have changed through rows updated, or reports
+    deleted, in (since, until].
+    """
+    changed_tasks = Task.objects.filter(updated_at__gt=since, updated_at__lte=until)
+    changed_reports = Report.objects.filter(
+        Q(updated_at__gt=since, updated_at__lte=until)
+        | Q(task__updated_at__gt=since, task__updated_at__lte=until)
+    )
+    deleted_reports = Tombstone.objects.filter(
+        model_name='report', deleted_at__gt=since, deleted_at__lte=until
+    ).values_list('data', flat=True)
+    return (
+        _dates(changed_tasks, 'assigned_date')
+        | _dates(changed_reports, *REPORT_DATE_FIELDS)
+        | {datetime.date.fromisoformat(day) for data in deleted_reports for day in data.get('days', ())}
+    )
+
+
+def roll_forward():
+    """
+    Recompute the days touched since the last run and advance the watermark.
+    The first run (no watermark yet) is a full backfill.
+    Returns (number of days recomputed, number of rollup rows written).
+    """
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+        now = timezone.now()
+        if watermark.value is None:
+            days, rows = backfill()
+        else:
+            days = touched_days(watermark.value - OVERLAP, now)
+            rows = recompute_days(days)
+            days = len(days)
+        watermark.value = now
+        watermark.save()
+    return days, rows
+
+
+def backfill(start=None, end=None):
+    """
+    Recompute every day in [start, end] (default: first task to today).
+    Returns (number of days, number of rollup rows written).
+    """
+    with transaction.atomic():
+        if start is None:
+            first = Task.objects.order_by('assigned_date').values_list('assigned_date', flat=True).first()
+            start = timezone.localdate(first) if first else timezone.localdate()
+        end = end or timezone.localdate()
+        rows = recompute_range(start, end)
+        RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={'value': timezone.now()})
+    return (end - start).days + 1, rows
+
+
+GROUP_FIELDS = {
+    'cluster': 'cluster__name',
+    'type': 'type__name',
+    'state': 'state',
+}
+
+
+def trends(start, end, group_by=(), cluster=None, task_type=None, state=None):
+    """
+    Daily metric totals between `start` and `end`, optionally split by
+    cluster, type and/or state, served entirely from the rollup table.
+    """
+    rows = DailyTaskRollup.objects.filter(date__range=(start, end))
+    if cluster:
+        rows = rows.filter(cluster__name=cluster)
+    if task_type:
+        rows = rows.filter(type__name=task_type)
+    if state:
+        rows = rows.filter(state=state)
+
+    fields = [GROUP_FIELDS[g] for g in group_by]
+    series = (
+        rows.values('date', *fields)
+        .annotate(**{metric: Sum(metric) for metric in METRICS})
+        .order_by('date', *fields)
+    )
+    return [
+        {
+            'date': r['date'],
+            **{g: r[GROUP_FIELDS[g]] for g in group_by},
+            **{metric: r[metric] for metric in METRICS},
+        }
+        for r in series
+    ]
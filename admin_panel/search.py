@@ -0,0 +1,145 @@
+"""
+Full-text search over tasks, sites and users (SQLite FTS5).
+
+`search_index` is an FTS5 table kept current by triggers on the task, site and
+user tables (see migration 0012), so bulk_create and queryset.update() are
+covered too. Each row's rowid encodes what it points to: id * 4 + kind.
+Columns: `name` (ids and names, weighted higher) and `detail`.
+"""
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+
+from .models import Task, SiteData
+
+User = get_user_model()
+
+KINDS = {'task': 1, 'site': 2, 'user': 3}
+KIND_NAMES = {code: kind for kind, code in KINDS.items()}
+
+# bm25 column weights: name, detail
+WEIGHTS = (10.0, 1.0)
+
+# Keep in step with the triggers in migration 0012
+ROWS_SQL = {
+    'task': """
+        SELECT t.id * 4 + 1,
+               t.task_id || ' ' || t.global_id,
+               coalesce(t.title, '') || ' ' || coalesce(t.site_name, '') || ' ' || coalesce(t.cluster_name, '')
+               || ' ' || coalesce((SELECT u.first_name || ' ' || u.last_name || ' ' || u.email
+                                   FROM authentication_user u WHERE u.id = t.assigned_to_id), '')
+        FROM admin_panel_task t
+    """,
+    'site': """
+        SELECT s.id * 4 + 2, s.global_id || ' ' || s.site_name, coalesce(s.cluster_name, '')
+        FROM admin_panel_sitedata s
+    """,
+    'user': """
+        SELECT u.id * 4 + 3,
+               u.first_name || ' ' || u.last_name || ' ' || u.username,
+               u.email || ' ' || coalesce(u.global_id, '') || ' ' || coalesce(u.state_user_id, '')
+               || ' ' || u.role || ' ' || u.state
+        FROM authentication_user u
+    """,
+}
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def rebuild():
+    """
+    Repopulate the whole index from the source tables. Returns the row count.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('DELETE FROM search_index')
+        for sql in ROWS_SQL.values():
+            cursor.execute(f'INSERT INTO search_index(rowid, name, detail) {sql}')
+        cursor.execute("INSERT INTO search_index(search_index) VALUES ('optimize')")
+        cursor.execute('SELECT count(*) FROM search_index')
+        return cursor.fetchone()[0]
+
+
+def match_expression(q):
+    """
+    FTS5 query for free text: every word must match, as a prefix.
+    Quoting each word keeps FTS5 syntax in user input from being interpreted.
+    """
+    words = re.findall(r'\w+', q)
+    return ' '.join(f'"{w}"*' for w in words)
+
+
+def search(q, kinds=None, limit=20, offset=0):
+    """
+    Ranked (kind, id) hits for `q`, best first.
+    """
+    expression = match_expression(q)
+    if not expression:
+        return []
+    codes = [KINDS[k] for k in (kinds or KINDS)]
+    sql = f"""
+        SELECT rowid FROM search_index
+        WHERE search_index MATCH %s AND rowid %% 4 IN ({', '.join(['%s'] * len(codes))})
+        ORDER BY bm25(search_index, {WEIGHTS[0]}, {WEIGHTS[1]}), rowid
+        LIMIT %s OFFSET %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [expression, *codes, limit, offset])
+        return [(KIND_NAMES[rowid % 4], rowid // 4) for rowid, in cursor.fetchall()]
+
+
+def _task_result(t):
+    return {
+        'kind': 'task',
+        'id': t.id,
+        'task_id': t.task_id,
+        'global_id': t.global_id,
+        'task_name': t.title,
+        'status': t.status,
+        'site_name': t.site_name or '',
+        'cluster_name': t.cluster_name or '',
+        'employee_name': t.assigned_to.first_name if t.assigned_to else '',
+        'employee_email': t.assigned_to.email if t.assigned_to else '',
+    }
+
+
+def _site_result(s):
+    return {
+        'kind': 'site',
+        'id': s.id,
+        'global_id': s.global_id,
+        'site_name': s.site_name,
+        'cluster_name': s.cluster_name,
+    }
+
+
+def _user_result(u):
+    return {
+        'kind': 'user',
+        'id': u.id,
+        'name': f'{u.first_name} {u.last_name}'.strip(),
+        'email': u.email,
+        'role': u.role,
+        'state': u.state,
+        'global_id': u.global_id,
+    }
+
+
+def results(hits):
+    """
+    Hits turned into response rows, in hit order, with one query per kind.
+    """
+    loaders = {
+        'task': (Task.objects.select_related('assigned_to'), _task_result),
+        'site': (SiteData.objects.all(), _site_result),
+        'user': (User.objects.all(), _user_result),
+    }
+    rows = {}
+    for kind, (queryset, to_row) in loaders.items():
+        ids = [pk for k, pk in hits if k == kind]
+        if ids:
+            rows.update({(kind, obj.pk): to_row(obj) for obj in queryset.filter(pk__in=ids)})
+    # A hit whose row was deleted since it was indexed is skipped
+    return [rows[hit] for hit in hits if hit in rows]
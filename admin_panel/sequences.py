@@ -0,0 +1,66 @@
+"""
+Block allocation of sequential numbers (task_ids).
+
+A Sequence row holds the last number issued. `allocate(name, n)` reserves
+the next n numbers with a single UPDATE ... RETURNING, which holds the row
+lock until the surrounding transaction ends, so concurrent callers always
+get disjoint blocks. Numbers reserved by a transaction that rolls back are
+not reused; sequences may have gaps.
+"""
+from django.db import IntegrityError, connections, router, transaction
+
+from .models import Sequence
+
+TASK_ID = 'task_id'
+TASK_ID_PREFIX = 'T'
+# T100001, T100002, ...
+TASK_ID_START = 100000
+
+
+def _initial_value(name):
+    if name == TASK_ID:
+        from .models import Task
+        return max_task_number(Task.objects.all())
+    return 0
+
+
+def max_task_number(tasks):
+    """
+    Highest number among `T<digits>` task_ids in `tasks`, or TASK_ID_START.
+    """
+    numbers = [
+        int(task_id[len(TASK_ID_PREFIX):])
+        for task_id in tasks.filter(task_id__regex=rf'^{TASK_ID_PREFIX}[0-9]+$').values_list('task_id', flat=True)
+    ]
+    return max(numbers, default=TASK_ID_START)
+
+
+def allocate(name, n=1):
+    """
+    Reserve the next `n` numbers of sequence `name`; returns a range.
+    """
+    if n < 1:
+        return range(0)
+    connection = connections[router.db_for_write(Sequence)]
+    table = connection.ops.quote_name(Sequence._meta.db_table)
+    sql = f'UPDATE {table} SET value = value + %s WHERE name = %s RETURNING value'
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [n, name])
+        row = cursor.fetchone()
+    if row is None:
+        # First use of this sequence (normally seeded by a migration)
+        try:
+            with transaction.atomic(using=connection.alias):
+                Sequence.objects.using(connection.alias).create(name=name, value=_initial_value(name))
+        except IntegrityError:
+            pass  # Created concurrently
+        return allocate(name, n)
+    last = row[0]
+    return range(last - n + 1, last + 1)
+
+
+def task_ids(n=1):
+    """
+    The next `n` task_ids, e.g. ['T100041', 'T100042'].
+    """
+    return [f'{TASK_ID_PREFIX}{number}' for number in allocate(TASK_ID, n)]
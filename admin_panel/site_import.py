@@ -0,0 +1,100 @@
+"""
+Site data import (import_site_data): makes SiteData match the rows of an
+uploaded CSV, in one transaction.
+
+Rows are matched by global_id and updated in place rather than deleted and
+recreated, so what points at a site (tasks, recurrence rules, employees'
+home sites) keeps pointing at it. Only sites missing from the file are
+deleted.
+"""
+import csv
+import os
+import tempfile
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import SiteData
+
+REQUIRED_HEADERS = {"global_id", "cluster_name", "site_name"}
+
+
+def store(chunks):
+    """
+    Keep the uploaded file as media/site_data.csv (served by export_site_data)
+    and return its raw contents.
+    """
+    raw = b''.join(chunks)
+    media_root = getattr(settings, 'MEDIA_ROOT', 'media')
+    os.makedirs(media_root, exist_ok=True)
+    # Written aside and renamed, so concurrent imports never see a partial file
+    fd, temp_path = tempfile.mkstemp(dir=media_root, suffix='.csv.tmp')
+    with os.fdopen(fd, 'wb') as destination:
+        destination.write(raw)
+    os.replace(temp_path, os.path.join(media_root, 'site_data.csv'))
+    return raw
+
+
+def decode(raw):
+    try:
+        return raw.decode('utf-8-sig').splitlines()
+    except UnicodeDecodeError:
+        return raw.decode('latin1').splitlines()
+
+
+FIELDS = ('cluster_name', 'site_name', 'latitude', 'longitude')
+
+
+def replace_site_data(lines, progress=None, batch_size=1000):
+    """
+    Replace all site data with the rows of CSV `lines`. Returns the row count.
+    Raises ValueError when required headers are missing.
+    """
+    reader = csv.DictReader(lines)
+    missing = REQUIRED_HEADERS - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f'Missing required headers: {", ".join(sorted(missing))}')
+
+    # A global_id listed twice keeps its last row
+    rows = {
+        row['global_id']: {
+            'cluster_name': row['cluster_name'],
+            'site_name': row['site_name'],
+            'latitude': row.get('latitude') or '',
+            'longitude': row.get('longitude') or '',
+        }
+        for row in reader
+    }
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {site.global_id: site for site in SiteData.objects.iterator(chunk_size=5000)}
+        gone = [site.pk for global_id, site in existing.items() if global_id not in rows]
+        for start in range(0, len(gone), batch_size):
+            SiteData.objects.filter(pk__in=gone[start:start + batch_size]).delete()
+
+        changed, created = [], []
+        for global_id, values in rows.items():
+            site = existing.get(global_id)
+            if site is None:
+                created.append(SiteData(global_id=global_id, **values))
+            elif any((getattr(site, field) or '') != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(site, field, value)
+                site.updated_at = now   # bulk_update skips auto_now
+                changed.append(site)
+
+        done = len(rows) - len(changed) - len(created)
+        for start in range(0, len(changed), batch_size):
+            batch = changed[start:start + batch_size]
+            SiteData.objects.bulk_update(batch, (*FIELDS, 'updated_at'))
+            done += len(batch)
+            if progress:
+                progress(done, len(rows))
+        for start in range(0, len(created), batch_size):
+            batch = created[start:start + batch_size]
+            SiteData.objects.bulk_create(batch)
+            done += len(batch)
+            if progress:
+                progress(done, len(rows))
+    return len(rows)
@@ -0,0 +1,123 @@
+"""
+Overdue / SLA analytics over Task, computed in the database.
+
+A task is due at its `deadline`, or, when it has none, at the end of its
+`planned_date`. It counts as completed at its latest approved report (falling
+back to `updated_at` for tasks marked completed without one).
+"""
+import datetime
+
+from django.db.models import (
+    Avg, Case, Count, DateTimeField, DurationField, ExpressionWrapper, F,
+    OuterRef, Q, Subquery, Value, When,
+)
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from reports.models import Report
+from .models import Task
+
+GROUP_FIELDS = {
+    'cluster': ('cluster_id', 'cluster__name'),
+    'type': ('type_id', 'type__name'),
+    'assignee': ('assigned_to_id', 'assigned_to__email'),
+}
+
+
+def _due():
+    end_of_planned_day = ExpressionWrapper(
+        Cast('planned_date', DateTimeField()) + Value(datetime.timedelta(days=1)),
+        output_field=DateTimeField(),
+    )
+    return Coalesce('deadline', end_of_planned_day)
+
+
+def _first_planned_date_due(moment):
+    """
+    Earliest planned_date that is due at or after `moment`. Planned dates are
+    due at the following midnight, UTC, as the database computes it.
+    """
+    moment = moment.astimezone(datetime.timezone.utc)
+    day = moment.date()
+    if moment.time() != datetime.time(0):
+        day += datetime.timedelta(days=1)
+    return day - datetime.timedelta(days=1)
+
+
+def _completed_at():
+    approved_at = (
+        Report.objects.filter(task=OuterRef('pk'), status='approved')
+        .order_by('-approved_at')
+        .values('approved_at')[:1]
+    )
+    return Case(
+        When(status='completed', then=Coalesce(Subquery(approved_at), 'updated_at')),
+        output_field=DateTimeField(),
+    )
+
+
+def tasks_due(start, end, cluster=None, task_type=None, state=None):
+    """
+    Tasks falling due in [start, end), annotated with `due` and `completed_at`.
+    The window is applied to the raw (indexed) deadline / planned_date columns.
+    """
+    tasks = Task.objects.filter(
+        Q(deadline__gte=start, deadline__lt=end)
+        | Q(deadline__isnull=True,
+            planned_date__gte=_first_planned_date_due(start),
+            planned_date__lt=_first_planned_date_due(end))
+    )
+    if cluster:
+        tasks = tasks.filter(cluster__name=cluster)
+    if task_type:
+        tasks = tasks.filter(type__name=task_type)
+    if state:
+        tasks = tasks.filter(state=state)
+    return tasks.annotate(due=_due(), completed_at=_completed_at())
+
+
+def _metrics(now):
+    completed = Q(status='completed')
+    on_time = completed & Q(completed_at__lte=F('due'))
+    late = completed & Q(completed_at__gt=F('due'))
+    overdue = ~completed & Q(due__lt=now)
+    return {
+        'total': Count('id'),
+        'completed': Count('id', filter=completed),
+        'completed_on_time': Count('id', filter=on_time),
+        'completed_late': Count('id', filter=late),
+        'overdue': Count('id', filter=overdue),
+        # Late completions by how late they were, open overdue tasks by how late they are now
+        'avg_lateness': Avg(Case(
+            When(late, then=F('completed_at') - F('due')),
+            When(overdue, then=Value(now) - F('due')),
+            output_field=DurationField(),
+        )),
+    }
+
+
+def _row(values):
+    lateness = values.pop('avg_lateness')
+    completed = values['completed']
+    values['on_time_rate'] = round(values['completed_on_time'] / completed, 4) if completed else None
+    values['avg_lateness_hours'] = round(lateness.total_seconds() / 3600, 2) if lateness is not None else None
+    return values
+
+
+def sla_stats(start, end, **filters):
+    """
+    Overall and per cluster / type / assignee SLA figures for tasks due in
+    [start, end): one aggregate query for the totals and one GROUP BY each.
+    """
+    now = timezone.now()
+    tasks = tasks_due(start, end, **filters)
+    metrics = _metrics(now)
+
+    result = {'overall': _row(tasks.aggregate(**metrics))}
+    for group, (key, label) in GROUP_FIELDS.items():
+        rows = tasks.values(key, label).annotate(**metrics).order_by(label)
+        result[f'by_{group}'] = [
+            {'id': r.pop(key), 'name': r.pop(label), **_row(r)}
+            for r in rows
+        ]
+    return result
@@ -0,0 +1,55 @@
+"""
+Streaming JSON array responses for large listings.
+
+Rows are pulled from `queryset.iterator(chunk_size=...)` and encoded as they
+go, so memory stays flat however many rows there are. The output is the same
+JSON DRF's renderer would produce for the equivalent list.
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def chunk_size():
+    return getattr(settings, 'STREAMING_CHUNK_SIZE', 2000)
+
+
+def iter_json_array(rows, batch=100):
+    """
+    Encode an iterable of dicts as a JSON array, `batch` rows per yielded chunk.
+    """
+    encode = JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    yield '['
+    buffer, first = [], True
+    for row in rows:
+        buffer.append(encode(row))
+        if len(buffer) >= batch:
+            yield ('' if first else ',') + ','.join(buffer)
+            buffer, first = [], False
+    if buffer:
+        yield ('' if first else ',') + ','.join(buffer)
+    yield ']'
+
+
+async def _async_chunks(chunks):
+    # Under ASGI a sync iterator would be read into memory in one go; pull it
+    # piecewise instead, on the thread that owns the database cursor
+    pull = sync_to_async(next, thread_sensitive=True)
+    done = object()
+    while (chunk := await pull(chunks, done)) is not done:
+        yield chunk
+
+
+def stream_rows(request, queryset, to_row):
+    """
+    StreamingHttpResponse of `[to_row(obj) for obj in queryset]`, fetched in
+    chunks (prefetch_related lookups are applied per chunk).
+    """
+    rows = (to_row(obj) for obj in queryset.iterator(chunk_size=chunk_size()))
+    content = iter_json_array(rows)
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        content = _async_chunks(content)
+    return StreamingHttpResponse(content, content_type='application/json')
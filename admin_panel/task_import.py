@@ -0,0 +1,290 @@
+"""
+Bulk task assignment from CSV rows (bulk_assign_task_csv).
+
+The work is done in three stages, so the number of queries does not grow
+with the file:
+
+1. resolve: every site, employee, task type and cluster the rows refer to is
+   fetched with one IN query per table;
+2. validate: each row is checked in memory against those lookups;
+3. write: valid rows are inserted with bulk_create in one transaction, so a
+   failure part way leaves nothing half-applied.
+
+Per-row results have the same shape as the old row-at-a-time loop.
+
+dry_run() predicts those results without writing anything, with vectorized
+(pandas) checks, and also flags duplicate rows and rows that clash with
+open tasks.
+"""
+import csv
+import datetime
+import io
+
+import numpy as np
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .models import Task, TaskType, Cluster, SiteData
+
+User = get_user_model()
+
+FIELDS = ["employee_email", "task_name", "task_type", "global_id", "planned_date"]
+REQUIRED_HEADERS = set(FIELDS)
+
+# Accepted planned_date formats: DD-MM-YY and YYYY-MM-DD
+DATE_FORMATS = ("%d-%m-%y", "%Y-%m-%d")
+
+
+def read_csv(text):
+    """
+    DictReader over CSV/TSV `text` with cleaned headers, and the delimiter
+    used. Raises ValueError when headers are missing.
+    """
+    # 🔹 Detect delimiter (comma vs tab)
+    if "\t" in text and "," not in text:
+        delimiter = "\t"
+    else:
+        delimiter = ","
+
+    reader = csv.DictReader(io.StringIO(text), delimiter=delimiter)
+    if not reader.fieldnames:
+        raise ValueError('CSV file has no headers')
+
+    # 🔹 Clean headers (strip + lowercase)
+    reader.fieldnames = [h.strip().lower() for h in reader.fieldnames if h]
+    missing = REQUIRED_HEADERS - set(reader.fieldnames)
+    if missing:
+        raise ValueError(f'Missing required headers: {", ".join(missing)}')
+    return reader, delimiter
+
+
+def clean_rows(reader):
+    """
+    (row number, row) pairs with stripped, lower-cased keys and stripped values.
+    """
+    return [
+        (idx, {k.strip().lower(): (v.strip() if v else "") for k, v in row.items() if k})
+        for idx, row in enumerate(reader, start=1)
+    ]
+
+
+def parse_planned_date(value):
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _first_by_name(queryset, names):
+    # get_or_create(name=...) semantics: reuse the oldest row with that name
+    found = {}
+    for obj in queryset.filter(name__in=names).order_by('id'):
+        found.setdefault(obj.name, obj)
+    return found
+
+
+def resolve(rows):
+    """
+    Sites by global_id and employees by email for everything `rows` mention.
+    """
+    global_ids = {row.get('global_id') for _, row in rows if row.get('global_id')}
+    emails = {row.get('employee_email') for _, row in rows if row.get('employee_email')}
+    sites = {s.global_id: s for s in SiteData.objects.filter(global_id__in=global_ids)}
+    employees = {}
+    for user in User.objects.filter(email__in=emails, role='employee').order_by('id'):
+        employees.setdefault(user.email, user)
+    return sites, employees
+
+
+def validate(rows, sites, employees):
+    """
+    Check every row in memory. Returns (results, valid): `results` has one
+    entry per row, in order, with errors filled in; `valid` is a list of
+    (result index, row, planned_date, site, employee) for rows to create.
+    """
+    results, valid = [], []
+    for idx, row in rows:
+        if not all(row.get(name) for name in FIELDS):
+            results.append({'row': idx, 'error': 'Missing required fields', 'data': row})
+            continue
+
+        planned_date = parse_planned_date(row['planned_date'])
+        if not planned_date:
+            results.append({'row': idx, 'error': f'Invalid planned_date format: {row["planned_date"]}', 'data': row})
+            continue
+
+        site = sites.get(row['global_id'])
+        if site is None:
+            results.append({'row': idx, 'error': 'Invalid Global ID', 'data': row})
+            continue
+
+        employee = employees.get(row['employee_email'])
+        if employee is None:
+            results.append({'row': idx, 'error': 'Invalid employee_email', 'data': row})
+            continue
+
+        valid.append((len(results), row, planned_date, site, employee))
+        results.append(None)
+    return results, valid
+
+
+def get_or_create_all(model, names, defaults=None):
+    """
+    {name: instance} of `model` (TaskType or Cluster) for every one of
+    `names`, creating the missing ones in one INSERT.
+    """
+    found = _first_by_name(model.objects.all(), names)
+    missing = [name for name in names if name not in found]
+    if missing:
+        created = model.objects.bulk_create([model(name=name, **(defaults or {})) for name in missing])
+        found.update({obj.name: obj for obj in created})
+    return found
+
+
+def write(valid, admin_user):
+    """
+    Create the validated tasks (and any task types/clusters they need) in one
+    transaction. Returns the created tasks, in the order of `valid`.
+    """
+    if not valid:
+        return []
+    with transaction.atomic():
+        types = get_or_create_all(
+            TaskType, list(dict.fromkeys(row['task_type'] for _, row, *_ in valid)),
+            defaults={'color_code': '#888888'},
+        )
+        clusters = get_or_create_all(
+            Cluster, list(dict.fromkeys(site.cluster_name for *_, site, _ in valid)),
+        )
+        # task_ids come from one block of the task_id sequence
+        tasks = Task.objects.bulk_create([
+            Task(
+                global_id=row['global_id'],
+                title=row['task_name'],
+                status='pending',
+                type=types[row['task_type']],
+                cluster=clusters[site.cluster_name],
+                assigned_to=employee,
+                state=employee.state or '',
+                planned_date=planned_date,
+                site=site,
+                site_name=site.site_name,
+                cluster_name=site.cluster_name,
+                assigned_by=admin_user,
+            )
+            for _, row, planned_date, site, employee in valid
+        ])
+    return tasks
+
+
+def assign_tasks(rows, admin_user):
+    """
+    Create a task for every valid row of `rows` (see clean_rows). Returns the
+    per-row results.
+    """
+    sites, employees = resolve(rows)
+    results, valid = validate(rows, sites, employees)
+    tasks = write(valid, admin_user)
+    for (position, row, planned_date, site, employee), task in zip(valid, tasks):
+        results[position] = {
+            'row': rows[position][0],
+            'message': 'Task assigned',
+            'task_id': task.task_id,
+            'employee_email': employee.email,
+            'planned_date': str(planned_date),
+        }
+    return results
+
+
+def parse_planned_dates(values):
+    """
+    parse_planned_date over a Series at once; NaT where no format matches.
+    """
+    parsed = [pd.to_datetime(values, format=fmt, errors='coerce') for fmt in DATE_FORMATS]
+    dates = parsed[0]
+    for more in parsed[1:]:
+        dates = dates.fillna(more)
+    return dates.dt.date.where(dates.notna(), None)
+
+
+def dry_run(rows):
+    """
+    The results assign_tasks(rows) would give, without writing anything:
+    a few set-based reads and vectorized checks. Rows that would be created
+    carry `warnings` for duplicates within the file and for open tasks
+    already planned for the same site, task and date. Returns
+    (results, summary).
+    """
+    frame = pd.DataFrame([row for _, row in rows], columns=FIELDS, dtype=object).fillna('')
+    frame['row'] = [idx for idx, _ in rows]
+    frame['planned'] = parse_planned_dates(frame['planned_date'])
+
+    site_ids = set(SiteData.objects.filter(global_id__in=set(frame['global_id']))
+                   .values_list('global_id', flat=True))
+    emails = set(User.objects.filter(email__in=set(frame['employee_email']), role='employee')
+                 .values_list('email', flat=True))
+
+    # Same checks, in the same order, as validate()
+    frame['error'] = np.select(
+        [
+            (frame[FIELDS] == '').any(axis=1),
+            frame['planned'].isna(),
+            ~frame['global_id'].isin(site_ids),
+            ~frame['employee_email'].isin(emails),
+        ],
+        [
+            'Missing required fields',
+            'Invalid planned_date format: ' + frame['planned_date'],
+            'Invalid Global ID',
+            'Invalid employee_email',
+        ],
+        default='',
+    )
+    ok = frame['error'] == ''
+
+    # Repeats of an earlier valid row (same employee, task, site and date)
+    keys = ['employee_email', 'task_name', 'task_type', 'global_id', 'planned']
+    valid = frame[ok]
+    first_row = valid.groupby(keys, sort=False)['row'].transform('first')
+    duplicate_of = first_row[valid.duplicated(keys, keep='first')].to_dict()
+
+    # Open tasks already planned for the same site, task and date
+    open_tasks = {}
+    if not valid.empty:
+        existing = Task.objects.filter(
+            status__in=('pending', 'in_progress'),
+            global_id__in=set(valid['global_id']),
+            title__in=set(valid['task_name']),
+            planned_date__range=(min(valid['planned']), max(valid['planned'])),
+        ).order_by('id').values_list('global_id', 'title', 'planned_date', 'task_id')
+        for global_id, title, planned_date, task_id in existing:
+            open_tasks.setdefault((global_id, title, planned_date), []).append(task_id)
+
+    results, summary = [], {'rows': len(frame), 'valid': 0, 'invalid': 0, 'duplicates': 0, 'conflicts': 0}
+    records = frame[['employee_email', 'task_name', 'global_id', 'planned', 'error']].to_dict('records')
+    for i, ((idx, row), record) in enumerate(zip(rows, records)):
+        if record['error']:
+            summary['invalid'] += 1
+            results.append({'row': idx, 'error': record['error'], 'data': row})
+            continue
+
+        summary['valid'] += 1
+        warnings = []
+        if i in duplicate_of:
+            summary['duplicates'] += 1
+            warnings.append(f'Duplicate of row {duplicate_of[i]}')
+        clashing = open_tasks.get((record['global_id'], record['task_name'], record['planned']))
+        if clashing:
+            summary['conflicts'] += 1
+            warnings.append(f'Open task already planned for this site and date: {", ".join(clashing)}')
+        results.append({
+            'row': idx,
+            'message': 'Task would be assigned',
+            'employee_email': record['employee_email'],
+            'planned_date': str(record['planned']),
+            'warnings': warnings,
+        })
+    return results, summary
@@ -0,0 +1,973 @@
+import asyncio
+import datetime
+import io
+import json
+import warnings
+from unittest import mock
+
+from rest_framework.test import APITestCase, APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from reports.models import Report
+from . import counters, dashboard_cache, events, rollups, search, sequences, site_import
+from .models import (
+    Task, TaskType, Cluster, SiteData, TaskStatusCounter, RollupWatermark, DailyTaskRollup, DashboardEvent,
+)
+
+User = get_user_model()
+
+# Tests must not touch the shared FileBasedCache in BASE_DIR/cache
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def streamed(response):
+    return json.loads(b''.join(response.streaming_content))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DashboardStatsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="admin123",
+            role="admin",
+            state="Andhra Pradesh"
+        )
+        self.employee = User.objects.create_user(
+            username="emp",
+            email="emp@example.com",
+            password="emp123",
+            role="employee",
+            state="Andhra Pradesh"
+        )
+        self.task_type = TaskType.objects.create(name="DG PM", color_code="#888888")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def create_tasks(self, clusters, titles, status='pending'):
+        # Dashboards are invalidated on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_tasks(clusters, titles, status)
+
+    def _create_tasks(self, clusters, titles, status):
+        for c in range(clusters):
+            cluster = Cluster.objects.create(name=f"Cluster {Cluster.objects.count()}")
+            for title in titles:
+                Task.objects.create(
+                    global_id=f"G{cluster.id}",
+                    title=title,
+                    status=status,
+                    type=self.task_type,
+                    cluster=cluster,
+                    assigned_to=self.employee,
+                )
+
+    def dashboard_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get('/panel/dashboard/')
+        self.assertEqual(res.status_code, 200)
+        return res, len(ctx.captured_queries)
+
+    def test_dashboard_counts(self):
+        self.create_tasks(2, ["DG PM", "AC CM"])
+        self.create_tasks(1, ["DG PM"], status='completed')
+
+        res, _ = self.dashboard_queries()
+        self.assertEqual(res.data['total_tasks'], 5)
+        self.assertEqual(res.data['completed_tasks'], 1)
+        self.assertEqual(res.data['pending_tasks'], 4)
+        self.assertEqual(res.data['in_progress_tasks'], 0)
+
+        stats = {s['task_name']: s for s in res.data['task_type_stats']}
+        self.assertEqual(stats['DG PM']['total'], 3)
+        self.assertEqual(stats['DG PM']['completed'], 1)
+        self.assertEqual(stats['AC CM']['pending'], 2)
+        self.assertEqual(stats['Site Visit']['total'], 0)
+
+        clusters = res.data['clusters']
+        self.assertEqual(len(clusters), 3)
+        self.assertEqual([c['total'] for c in clusters], [2, 2, 1])
+        self.assertEqual([c['completed'] for c in clusters], [0, 0, 1])
+
+    def test_query_count_constant(self):
+        self.create_tasks(1, ["DG PM"])
+        _, baseline = self.dashboard_queries()
+
+        self.create_tasks(25, ["DG PM", "DG CM", "AC PM", "AC CM", "Site Visit", "Other"])
+        _, grown = self.dashboard_queries()
+
+        self.assertEqual(baseline, grown)
+
+
+class TaskStatusCounterTests(APITestCase):
+    def setUp(self):
+        self.emp1 = User.objects.create_user(
+            username="emp1", email="emp1@example.com", password="emp123",
+            role="employee", state="Andhra Pradesh"
+        )
+        self.emp2 = User.objects.create_user(
+            username="emp2", email="emp2@example.com", password="emp123",
+            role="employee", state="Telangana"
+        )
+        self.task_type = TaskType.objects.create(name="DG PM", color_code="#888888")
+        self.cluster = Cluster.objects.create(name="Vizag")
+
+    def make_task(self, **kwargs):
+        fields = dict(global_id="G1", title="DG PM", type=self.task_type,
+                      cluster=self.cluster, assigned_to=self.emp1)
+        fields.update(kwargs)
+        return Task(**fields)
+
+    def counts(self):
+        return {
+            (c.state, c.assigned_to_id, c.status): c.count
+            for c in TaskStatusCounter.objects.all()
+        }
+
+    def test_single_task_lifecycle(self):
+        task = self.make_task()
+        task.save()
+        self.assertEqual(self.counts(), {("Andhra Pradesh", self.emp1.id, "pending"): 1})
+
+        task.status = 'completed'
+        task.save()
+        self.assertEqual(self.counts(), {("Andhra Pradesh", self.emp1.id, "completed"): 1})
+
+        task.assigned_to = self.emp2
+        task.save()
+        self.assertEqual(self.counts(), {("Telangana", self.emp2.id, "completed"): 1})
+
+        # Also for a freshly loaded task saving only the assignee
+        task = Task.objects.get(pk=task.pk)
+        task.assigned_to = self.emp1
+        task.save(update_fields=['assigned_to'])
+        self.assertEqual(Task.objects.get(pk=task.pk).state, "Andhra Pradesh")
+        self.assertEqual(self.counts(), {("Andhra Pradesh", self.emp1.id, "completed"): 1})
+
+        Task.objects.get(pk=task.pk).delete()
+        self.assertEqual(self.counts(), {})
+
+    def test_bulk_paths(self):
+        Task.objects.bulk_create([self.make_task(global_id=f"G{i}", task_id=f"X{i}") for i in range(3)])
+        self.assertEqual(self.counts(), {("Andhra Pradesh", self.emp1.id, "pending"): 3})
+
+        tasks = Task.objects.filter(global_id__in=["G0", "G1"])
+        with counters.tracking(tasks):
+            tasks.update(status='in_progress')
+        self.assertEqual(self.counts(), {
+            ("Andhra Pradesh", self.emp1.id, "pending"): 1,
+            ("Andhra Pradesh", self.emp1.id, "in_progress"): 2,
+        })
+
+        Task.objects.filter(global_id="G2").delete()
+        self.assertEqual(self.counts(), {("Andhra Pradesh", self.emp1.id, "in_progress"): 2})
+
+    def test_rebuild_fixes_drift(self):
+        self.make_task().save()
+        TaskStatusCounter.objects.update(count=7)
+        self.assertEqual(counters.rebuild(), 1)
+        self.assertEqual(self.counts(), {("Andhra Pradesh", self.emp1.id, "pending"): 1})
+
+
+class TaskIdSequenceTests(APITestCase):
+    def setUp(self):
+        self.emp = User.objects.create_user(
+            username="emp1", email="emp1@example.com", password="emp123",
+            role="employee", state="Andhra Pradesh"
+        )
+        self.fields = dict(global_id="G1", title="DG PM", assigned_to=self.emp, state="Andhra Pradesh",
+                           type=TaskType.objects.create(name="DG PM", color_code="#888888"),
+                           cluster=Cluster.objects.create(name="Vizag"))
+
+    def test_single_and_bulk_creates_share_the_sequence(self):
+        with CaptureQueriesContext(connection) as ctx:
+            first = Task.objects.create(**self.fields)
+        self.assertEqual(first.task_id, "T100001")
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "admin_panel_task"')])
+
+        bulk = Task.objects.bulk_create([Task(**self.fields) for _ in range(3)] + [Task(task_id="X1", **self.fields)])
+        self.assertEqual([t.task_id for t in bulk], ["T100002", "T100003", "T100004", "X1"])
+        self.assertEqual(Task.objects.create(**self.fields).task_id, "T100005")
+        self.assertEqual(sequences.allocate(sequences.TASK_ID, 10), range(100006, 100016))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DashboardCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(
+            username="admin", email="admin@example.com", password="admin123",
+            role="admin", state="Andhra Pradesh"
+        )
+        self.employee = User.objects.create_user(
+            username="emp", email="emp@example.com", password="emp123",
+            role="employee", state="Andhra Pradesh"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def test_hit_then_invalidated_by_task(self):
+        self.assertEqual(self.client.get('/panel/dashboard/').data['total_tasks'], 0)
+        with self.assertNumQueries(0):
+            self.client.get('/panel/dashboard/')
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Task.objects.create(
+                global_id="G1", title="DG PM", assigned_to=self.employee,
+                type=TaskType.objects.create(name="DG PM", color_code="#888888"),
+                cluster=Cluster.objects.create(name="Vizag"),
+            )
+            # Nothing is invalidated until the transaction commits
+            with self.assertNumQueries(0):
+                self.client.get('/panel/dashboard/')
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.client.get('/panel/dashboard/').data['total_tasks'], 1)
+
+        stats = self.client.get('/panel/dashboard/cache-stats/').data['admin_dashboard']
+        self.assertEqual((stats['hits'], stats['misses']), (2, 2))
+
+    def test_keys_are_memcached_safe(self):
+        other = User(role='admin', state='Telangana')
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            key = dashboard_cache.cache_key('admin_dashboard', self.admin, 'state=Andhra Pradesh')
+            cache.validate_key(key)
+        self.assertNotIn(' ', key)
+        self.assertNotEqual(key, dashboard_cache.cache_key('admin_dashboard', other, 'state=Andhra Pradesh'))
+
+    def test_report_change_keeps_admin_dashboard(self):
+        self.client.get('/panel/dashboard/')
+        dashboard_cache.invalidate(*dashboard_cache.DEPENDENCIES[Report])
+        with self.assertNumQueries(0):
+            self.client.get('/panel/dashboard/')
+
+
+class RollupTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username="admin", email="admin@example.com", password="admin123",
+            role="admin", state="Andhra Pradesh"
+        )
+        self.employee = User.objects.create_user(
+            username="emp", email="emp@example.com", password="emp123",
+            role="employee", state="Andhra Pradesh"
+        )
+        self.task_type = TaskType.objects.create(name="DG PM", color_code="#888888")
+        self.cluster = Cluster.objects.create(name="Vizag")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def make_task(self, day):
+        return Task.objects.create(
+            global_id="G1", title="DG PM", type=self.task_type, cluster=self.cluster,
+            assigned_to=self.employee,
+            assigned_date=timezone.make_aware(datetime.datetime.combine(day, datetime.time(10))),
+        )
+
+    def test_roll_forward_and_trends(self):
+        today = timezone.localdate()
+        yesterday = today - datetime.timedelta(days=1)
+        self.make_task(yesterday)
+        task = self.make_task(today)
+        Report.objects.create(task=task, submitted_by=self.employee, status='approved',
+                              approved_at=timezone.now())
+
+        self.assertEqual(rollups.roll_forward(), (2, 2))
+
+        # Age the processed rows past the watermark overlap; only the day
+        # touched by the new report is recomputed
+        an_hour_ago = timezone.now() - datetime.timedelta(hours=1)
+        Task.objects.update(updated_at=an_hour_ago)
+        Report.objects.update(updated_at=an_hour_ago)
+        RollupWatermark.objects.update(value=an_hour_ago + datetime.timedelta(minutes=30))
+        Report.objects.create(task=task, submitted_by=self.employee)
+        self.assertEqual(rollups.roll_forward(), (1, 1))
+
+        res = self.client.get('/panel/trends/', {'group_by': 'cluster,state'})
+        self.assertEqual(res.status_code, 200)
+        series = {row['date']: row for row in res.data['series']}
+        self.assertEqual(series[yesterday]['assigned'], 1)
+        self.assertEqual(series[today]['submitted'], 2)
+        self.assertEqual(series[today]['approved'], 1)
+        self.assertEqual(series[today]['cluster'], "Vizag")
+
+        self.assertEqual(self.client.get('/panel/trends/', {'group_by': 'site'}).status_code, 400)
+
+    def test_roll_forward_matches_backfill(self):
+        def at(day):
+            return timezone.make_aware(datetime.datetime.combine(day, datetime.time(12)))
+
+        def change(moment, func):
+            # Made at `moment`, then picked up by the next incremental run
+            with mock.patch('django.utils.timezone.now', return_value=moment):
+                func()
+            RollupWatermark.objects.update(value=moment - datetime.timedelta(minutes=1))
+            rollups.roll_forward()
+
+        def review(report, status):
+            report.status = status
+            report.approved_at = timezone.now() if status == 'approved' else None
+            report.save()
+
+        def table():
+            return sorted(DailyTaskRollup.objects.values_list('date', 'state', *rollups.METRICS))
+
+        submitted, rejected, approved = (timezone.localdate() - datetime.timedelta(days=d) for d in (3, 2, 1))
+        kept, resubmitted = (
+            Report.objects.create(task=self.make_task(submitted), submitted_by=self.employee,
+                                  submitted_at=at(submitted))
+            for _ in range(2)
+        )
+        Task.objects.update(updated_at=at(submitted))
+        rollups.backfill()
+
+        change(at(rejected), lambda: (review(kept, 'rejected'), review(resubmitted, 'rejected')))
+        self.assertEqual(DailyTaskRollup.objects.get(date=rejected).rejected, 2)
+        change(at(approved), lambda: review(kept, 'approved'))
+        # What submit_report does to the employee's rejected reports
+        change(timezone.now(), lambda: Report.objects.filter(status='rejected').delete())
+
+        incremental = table()
+        rollups.backfill()
+        self.assertEqual(incremental, table())
+        self.assertEqual(DailyTaskRollup.objects.filter(date=rejected).count(), 0)
+
+
+class DashboardStreamTests(APITestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def subscribe(self, feed):
+        async def subscribe():
+            return feed.subscribe()
+        return self.loop.run_until_complete(subscribe())
+
+    def test_feed_replays_and_fans_out(self):
+        feed = events.ChangeFeed()
+        first = events.publish('counters', [])
+        self.assertEqual(feed.poll(), [])   # Finds the end of the table
+
+        sub = self.subscribe(feed)
+        self.assertEqual(feed.catch_up(sub), [])
+        other = self.subscribe(feed)
+        self.assertEqual([e['id'] for e in feed.catch_up(other, str(first['id'] - 1))], [first['id']])
+
+        # Written by any process (a worker, a command): the poller picks it up, once
+        second = events.publish('report', {'status': 'approved'})
+        self.assertEqual([e['id'] for e in feed.poll()], [second['id']])
+        self.assertEqual(feed.poll(), [])
+        live = self.loop.run_until_complete(sub.get(1))
+        self.assertEqual((live['id'], live['event']), (second['id'], 'report'))
+        sub.close()
+
+    def test_resume_across_processes_and_restarts(self):
+        ids = [events.publish('counters', [])['id'] for _ in range(3)]
+        restarted = events.ChangeFeed()   # another process, or the same one after a restart
+        sub = self.subscribe(restarted)
+        self.assertEqual([e['id'] for e in restarted.catch_up(sub, str(ids[0]))], ids[1:])
+        self.assertEqual(sub.seen, set(ids))
+
+        # Ids that can't be resumed: newer than anything stored, not a row id, or purged
+        self.assertIsNone(restarted.catch_up(sub, str(ids[-1] + 1)))
+        self.assertIsNone(restarted.catch_up(sub, 'a1b2c3d4e5f6-5'))
+        DashboardEvent.objects.filter(id=ids[0]).update(created_at=timezone.now() - datetime.timedelta(days=1))
+        self.assertEqual(events.purge(), 1)
+        self.assertIsNone(restarted.catch_up(sub, str(ids[0] - 1)))
+        self.assertEqual(len(restarted.catch_up(sub, str(ids[0]))), 2)
+
+    def test_requires_admin_token(self):
+        self.assertEqual(self.client.get('/panel/dashboard/stream/').status_code, 401)
+
+        employee = User.objects.create_user(
+            username="emp", email="emp@example.com", password="emp123",
+            role="employee", state="Andhra Pradesh"
+        )
+        token = str(AccessToken.for_user(employee))
+        res = self.client.get('/panel/dashboard/stream/', {'token': token})
+        self.assertEqual(res.status_code, 403)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SlaAnalyticsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(
+            username="admin", email="admin@example.com", password="admin123",
+            role="admin", state="Andhra Pradesh"
+        )
+        self.employee = User.objects.create_user(
+            username="emp", email="emp@example.com", password="emp123",
+            role="employee", state="Andhra Pradesh"
+        )
+        self.task_type = TaskType.objects.create(name="DG PM", color_code="#888888")
+        self.cluster = Cluster.objects.create(name="Vizag")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def make_task(self, **kwargs):
+        return Task.objects.create(
+            global_id="G1", title="DG PM", type=self.task_type, cluster=self.cluster,
+            assigned_to=self.employee, **kwargs
+        )
+
+    def approve(self, task, at):
+        task.status = 'completed'
+        task.save()
+        Report.objects.create(task=task, submitted_by=self.employee, status='approved', approved_at=at)
+
+    def test_overdue_and_on_time_rate(self):
+        now = timezone.now()
+        day = datetime.timedelta(days=1)
+        self.make_task(deadline=now - 2 * day)                                # overdue by 48h
+        self.approve(self.make_task(deadline=now - 3 * day), now - 2 * day)   # 24h late
+        self.approve(self.make_task(deadline=now - 3 * day), now - 4 * day)   # on time
+        self.make_task(deadline=now + day)                                    # not due yet
+        self.make_task(deadline=now - 60 * day)                               # outside the window
+
+        res = self.client.get('/panel/sla/', {'days': 30})
+        self.assertEqual(res.status_code, 200)
+        overall = res.data['overall']
+        self.assertEqual(overall['total'], 3)
+        self.assertEqual(overall['overdue'], 1)
+        self.assertEqual(overall['completed_late'], 1)
+        self.assertEqual(overall['on_time_rate'], 0.5)
+        self.assertAlmostEqual(overall['avg_lateness_hours'], 36, places=0)
+        self.assertEqual(res.data['by_assignee'][0]['name'], "emp@example.com")
+
+        # Served from the cache until a task changes
+        with self.assertNumQueries(0):
+            self.client.get('/panel/sla/', {'days': 30})
+        self.assertEqual(self.client.get('/panel/sla/', {'days': 0}).status_code, 400)
+
+
+class ListTasksPaginationTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username="admin", email="admin@example.com", password="admin123",
+            role="admin", state="Andhra Pradesh"
+        )
+        employee = User.objects.create_user(
+            username="emp", email="emp@example.com", password="emp123",
+            role="employee", state="Andhra Pradesh"
+        )
+        task_type = TaskType.objects.create(name="DG PM", color_code="#888888")
+        cluster = Cluster.objects.create(name="Vizag")
+        for i in range(5):
+            task = Task.objects.create(
+                global_id=f"G{i}", title="DG PM", type=task_type, cluster=cluster, assigned_to=employee,
+            )
+            Report.objects.create(task=task, submitted_by=employee)
+        # Ties on created_at are broken by id
+        Task.objects.filter(global_id__in=["G1", "G2", "G3"]).update(created_at=timezone.now())
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def test_walks_every_task_once(self):
+        seen, cursor = [], None
+        while True:
+            params = {'page_size': 2, **({'cursor': cursor} if cursor else {})}
+            # The page itself plus one prefetch of its reports
+            with self.assertNumQueries(2):
+                res = self.client.get('/panel/tasks/', params)
+            self.assertEqual(res.status_code, 200)
+            seen += [t['task_id'] for t in res.data['results']]
+            self.assertTrue(all(len(t['reports']) == 1 for t in res.data['results']))
+            cursor = res.data['next']
+            if not cursor:
+                break
+
+        expected = list(Task.objects.order_by('-created_at', '-id').values_list('task_id', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(self.client.get('/panel/tasks/', {'cursor': 'garbage'}).status_code, 400)
+
+    def test_cursor_is_an_index_range(self):
+        from .pagination import KeysetPaginator
+        paginator = KeysetPaginator(('-created_at', '-id'))
+        last = paginator.order(Task.objects.all())[1]
+        after = paginator._after(Task, paginator.decode_cursor(Task, paginator.encode_cursor(last)))
+        page = paginator.order(Task.objects.all()).filter(after)[:3]
+        sql, params = page.query.sql_with_params()
+        self.assertIn('("admin_panel_task"."created_at", "admin_panel_task"."id") < (%s, %s)', sql)
+        self.assertEqual(list(page), list(paginator.order(Task.objects.all())[2:5]))
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                plan = ' '.join(row[-1] for row in cursor.fetchall())
+            self.assertIn('USING INDEX task_created_id_idx', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+
+class SearchTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username="admin", email="admin@example.com", password="admin123",
+            role="admin", state="Andhra Pradesh"
+        )
+        self.employee = User.objects.create_user(
+            username="ravi", email="ravi.kumar@example.com", password="emp123",
+            role="employee", state="Andhra Pradesh", first_name="Ravi", last_name="Kumar"
+        )
+        self.site = SiteData.objects.create(global_id="VZG-104", cluster_name="Vizag", site_name="Steel Plant")
+        self.task = Task.objects.create(
+            global_id="VZG-104", title="DG PM", site=self.site, site_name="Steel Plant", cluster_name="Vizag",
+            type=TaskType.objects.create(name="DG PM", color_code="#888888"),
+            cluster=Cluster.objects.create(name="Vizag"), assigned_to=self.employee,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def hits(self, q, **params):
+        res = self.client.get('/panel/search/', {'q': q, **params})
+        self.assertEqual(res.status_code, 200)
+        return [(r['kind'], r['id']) for r in res.data['results']]
+
+    def test_ranked_prefix_search(self):
+        # The site names it, the task only mentions it
+        self.assertEqual(self.hits("steel pla"), [('site', self.site.id), ('task', self.task.id)])
+        self.assertEqual(self.hits("vzg-104", kind='task'), [('task', self.task.id)])
+        self.assertEqual(self.hits(self.task.task_id), [('task', self.task.id)])
+
+    def test_index_follows_changes(self):
+        self.employee.first_name = "Srinivas"
+        self.employee.save()
+        self.assertEqual(self.hits("srini"), [('user', self.employee.id), ('task', self.task.id)])
+
+        SiteData.objects.filter(pk=self.site.pk).update(site_name="Harbour Gate")
+        self.assertEqual(self.hits("harbour"), [('site', self.site.id)])
+
+        self.task.delete()
+        self.assertEqual(self.hits("steel"), [])
+        # Two users and the site are left
+        self.assertEqual(search.rebuild(), 3)
+
+
+class ListFilterTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username="admin", email="admin@example.com", password="admin123",
+            role="admin", state="Andhra Pradesh"
+        )
+        self.emp1 = User.objects.create_user(
+            username="emp1", email="emp1@example.com", password="emp123",
+            role="employee", state="Andhra Pradesh"
+        )
+        self.emp2 = User.objects.create_user(
+            username="emp2", email="emp2@example.com", password="emp123",
+            role="employee", state="Telangana"
+        )
+        task_type = TaskType.objects.create(name="DG PM", color_code="#888888")
+        self.vizag = Cluster.objects.create(name="Vizag")
+        hyderabad = Cluster.objects.create(name="Hyderabad")
+        today = timezone.localdate()
+        self.tasks = [
+            Task.objects.create(global_id=f"G{i}", title="DG PM", type=task_type, cluster=cluster,
+                                assigned_to=emp, planned_date=planned)
+            for i, (cluster, emp, planned) in enumerate([
+                (self.vizag, self.emp1, today),
+                (self.vizag, self.emp2, today + datetime.timedelta(days=3)),
+                (hyderabad, self.emp2, None),
+            ])
+        ]
+        Report.objects.create(task=self.tasks[1], submitted_by=self.emp2, status='approved')
+        Report.objects.create(task=self.tasks[2], submitted_by=self.emp2, status='rejected')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def task_ids(self, **params):
+        res = self.client.get('/panel/tasks/', params)
+        self.assertEqual(res.status_code, 200)
+        return [t['task_id'] for t in res.data['results']]
+
+    def test_task_filters(self):
+        t0, t1, t2 = [t.task_id for t in self.tasks]
+        self.assertEqual(self.task_ids(cluster=self.vizag.id, sort='created_at'), [t0, t1])
+        self.assertEqual(self.task_ids(state='Telangana', sort='task_id'), sorted([t1, t2]))
+        self.assertEqual(self.task_ids(report_status='approved,rejected', assignee=self.emp2.id,
+                                       sort='created_at'), [t1, t2])
+        self.assertEqual(self.task_ids(planned_from=timezone.localdate().isoformat(), sort='-planned_date'),
+                         [t1, t0])
+        # NULL planned dates sort last either way
+        self.assertEqual(self.task_ids(sort='planned_date'), [t0, t1, t2])
+
+    def test_report_filters_and_errors(self):
+        res = self.client.get('/panel/reports/', {'status': 'rejected'})
+        self.assertEqual([r['task_id'] for r in res.data['results']], [self.tasks[2].task_id])
+        res = self.client.get('/panel/reports/stream/', {'cluster': self.vizag.id, 'sort': 'approved_at'})
+        self.assertEqual([r['task_id'] for r in streamed(res)], [self.tasks[1].task_id])
+
+        # One page at a time, however many reports there are
+        res = self.client.get('/panel/reports/', {'page_size': 1})
+        self.assertEqual([r['task_id'] for r in res.data['results']], [self.tasks[2].task_id])
+        rest = self.client.get('/panel/reports/', {'page_size': 1, 'cursor': res.data['next']}).data
+        self.assertEqual([r['task_id'] for r in rest['results']], [self.tasks[1].task_id])
+        self.assertIsNone(rest['next'])
+
+        self.assertEqual(self.client.get('/panel/tasks/', {'sort': 'password'}).status_code, 400)
+        self.assertEqual(self.client.get('/panel/tasks/', {'status': 'done'}).status_code, 400)
+        self.assertEqual(self.client.get('/panel/reports/', {'planned_from': 'soon'}).status_code, 400)
+
+
+class StreamingListTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username="admin", email="admin@example.com", password="admin123",
+            role="admin", state="Andhra Pradesh"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def test_streamed_json_matches_layout(self):
+        SiteData.objects.bulk_create([
+            SiteData(global_id=f"S{i:03}", cluster_name="Vizag", site_name=f"Site {i:03}", latitude="17.7")
+            for i in range(250)
+        ])
+        res = self.client.get('/panel/site-data-list/')
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.streaming)
+        sites = streamed(res)
+        self.assertEqual(len(sites), 250)
+        self.assertEqual(sites[0], {'global_id': "S000", 'cluster_name': "Vizag", 'site_name': "Site 000",
+                                    'latitude': "17.7", 'longitude': None})
+
+        self.assertEqual(streamed(self.client.get('/panel/reports/stream/')), [])
+        self.assertEqual(streamed(self.client.get('/panel/tasks/stream/')), [])
+
+
+class BulkAssignCsvTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username="admin", email="admin@example.com", password="admin123",
+            role="admin", state="Andhra Pradesh"
+        )
+        self.emp = User.objects.create_user(
+            username="emp1", email="emp1@example.com", password="emp123",
+            role="employee", state="Andhra Pradesh"
+        )
+        for i in range(20):
+            SiteData.objects.create(global_id=f"G{i}", cluster_name=f"Cluster {i % 2}", site_name=f"Site {i}")
+        TaskType.objects.create(name="DG PM", color_code="#ff0000")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def upload(self, lines):
+        body = "employee_email,task_name,task_type,global_id,planned_date\n" + "\n".join(lines)
+        return self.client.post('/panel/bulk-assign-csv/', {
+            'file': SimpleUploadedFile("plan.csv", body.encode(), content_type="text/csv"),
+        }, format='multipart')
+
+    def test_rows_created_in_bulk_with_per_row_errors(self):
+        lines = [f"emp1@example.com,DG PM,{'DG PM' if i % 2 else 'Full Services'},G{i},2025-07-{i + 1:02}"
+                 for i in range(20)]
+        lines += [
+            "emp1@example.com,DG PM,DG PM,NOPE,2025-07-01",
+            "ghost@example.com,DG PM,DG PM,G1,2025-07-01",
+            "emp1@example.com,DG PM,DG PM,G1,07/01/2025",
+            "emp1@example.com,,DG PM,G1,2025-07-01",
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.upload(lines)
+        self.assertEqual(res.status_code, 200)
+        # A few IN queries and bulk writes, not several queries per row
+        self.assertLess(len(ctx.captured_queries), len(lines))
+
+        results = res.data['results']
+        self.assertEqual([r['row'] for r in results], list(range(1, 25)))
+        self.assertEqual([r.get('error') for r in results[20:]], [
+            'Invalid Global ID', 'Invalid employee_email',
+            'Invalid planned_date format: 07/01/2025', 'Missing required fields',
+        ])
+        task = Task.objects.get(task_id=results[3]['task_id'])
+        self.assertEqual([r['task_id'] for r in results[:3]], ["T100001", "T100002", "T100003"])
+        self.assertEqual((task.global_id, task.type.name, task.cluster.name, task.state),
+                         ("G3", "DG PM", "Cluster 1", "Andhra Pradesh"))
+        self.assertEqual(results[3]['planned_date'], "2025-07-04")
+        self.assertEqual(Task.objects.count(), 20)
+        self.assertEqual(TaskType.objects.count(), 2)
+        self.assertEqual(Cluster.objects.count(), 2)
+        self.assertEqual(sum(TaskStatusCounter.objects.values_list('count', flat=True)), 20)
+
+    def test_all_rows_invalid(self):
+        res = self.upload(["emp1@example.com,DG PM,DG PM,NOPE,2025-07-01"])
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(res.data['message'], 'No tasks created')
+        self.assertFalse(Task.objects.exists())
+
+    def test_dry_run_reports_without_writing(self):
+        existing = Task.objects.create(
+            global_id="G2", title="DG PM", type=TaskType.objects.get(), cluster=Cluster.objects.create(name="Cluster 0"),
+            assigned_to=self.emp, planned_date=datetime.date(2025, 7, 2),
+        )
+        lines = [
+            "emp1@example.com,DG PM,DG PM,G1,01-07-25",
+            "emp1@example.com,DG PM,DG PM,G1,2025-07-01",
+            "emp1@example.com,DG PM,DG PM,G2,2025-07-02",
+            "emp1@example.com,DG PM,DG PM,NOPE,2025-07-01",
+            "emp1@example.com,DG PM,DG PM,G1,07/01/2025",
+        ]
+        res = self.client.post('/panel/bulk-assign-csv/?dry_run=true', {
+            'file': SimpleUploadedFile("plan.csv", ("employee_email,task_name,task_type,global_id,planned_date\n"
+                                                    + "\n".join(lines)).encode()),
+        }, format='multipart')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['summary'], {'rows': 5, 'valid': 3, 'invalid': 2, 'duplicates': 1, 'conflicts': 1})
+        results = res.data['results']
+        self.assertEqual([r.get('warnings') for r in results[:3]], [
+            [], ['Duplicate of row 1'], [f'Open task already planned for this site and date: {existing.task_id}'],
+        ])
+        self.assertEqual(results[0]['planned_date'], "2025-07-01")
+        self.assertEqual([r['error'] for r in results[3:]],
+                         ['Invalid Global ID', 'Invalid planned_date format: 07/01/2025'])
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_employee_zip_dry_run(self):
+        import zipfile
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as z:
+            z.writestr("employees.csv", "name,email,password,confirm_password\n"
+                                        "kiran,kiran@example.com,Secret#123,Secret#123\n"
+                                        "kiran2,kiran@example.com,Secret#123,Secret#123\n"
+                                        "emp1,new@example.com,Secret#123,Secret#123\n"
+                                        "ravi,ravi@example.com,weak,weak\n")
+            z.writestr("photos/kiran@example.com_passport.jpg", b"jpg")
+        res = self.client.post('/panel/bulk-create-employees-zip/', {
+            'file': SimpleUploadedFile("employees.zip", archive.getvalue()), 'dry_run': 'true',
+        }, format='multipart')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['summary'], {'rows': 4, 'valid': 1, 'invalid': 3, 'duplicates': 1})
+        self.assertEqual(res.data['results'][0]['warnings'], ["Signature photo missing"])
+        self.assertEqual([r.get('error') for r in res.data['results'][1:]], [
+            'Email already exists (row 1)', 'Username already exists',
+            "['Password must be at least 8 characters long.']",
+        ])
+        self.assertFalse(User.objects.filter(email="kiran@example.com").exists())
+
+
+class AutoAssignTests(APITestCase):
+    def setUp(self):
+        from employees.models import Employee
+        self.admin = User.objects.create_user(
+            username="admin", email="admin@example.com", password="admin123",
+            role="admin", state="Andhra Pradesh"
+        )
+        # Two engineers' bases ~500 km apart, three sites around each, one without coordinates
+        vizag = SiteData.objects.create(global_id="VZ0", cluster_name="Vizag", site_name="Vizag base",
+                                        latitude="17.6868", longitude="83.2185")
+        hyd = SiteData.objects.create(global_id="HY0", cluster_name="Hyderabad", site_name="Hyd base",
+                                      latitude="17.3850", longitude="78.4867")
+        for i in range(1, 4):
+            SiteData.objects.create(global_id=f"VZ{i}", cluster_name="Vizag", site_name=f"Vizag {i}",
+                                    latitude=str(17.6868 + i / 100), longitude="83.2185")
+            SiteData.objects.create(global_id=f"HY{i}", cluster_name="Hyderabad", site_name=f"Hyd {i}",
+                                    latitude=str(17.3850 + i / 100), longitude="78.4867")
+        SiteData.objects.create(global_id="NOPOS", cluster_name="Vizag", site_name="Unknown")
+
+        self.ravi = User.objects.create_user(username="ravi", email="ravi@example.com", password="x",
+                                             role="employee", state="Andhra Pradesh")
+        Employee.objects.create(user=self.ravi, home_site=vizag)
+        # No home site: last known position is the site of their latest report
+        self.kiran = User.objects.create_user(username="kiran", email="kiran@example.com", password="x",
+                                              role="employee", state="Andhra Pradesh")
+        task = Task.objects.create(global_id="HY0", title="DG PM", site=hyd, assigned_to=self.kiran,
+                                   type=TaskType.objects.create(name="DG PM", color_code="#888888"),
+                                   cluster=Cluster.objects.create(name="Hyderabad"))
+        Report.objects.create(task=task, submitted_by=self.kiran)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def test_nearest_engineer_within_capacity(self):
+        ids = ["HY1", "VZ1", "HY2", "VZ2", "HY3", "VZ3", "NOPOS", "MISSING"]
+        res = self.client.post('/panel/auto-assign/?dry_run=true', {'global_ids': ids}, format='json')
+        self.assertEqual(res.status_code, 200)
+        got = {a['global_id']: a['employee_email'] for a in res.data['assignments']}
+        self.assertEqual(got, {**{f"VZ{i}": "ravi@example.com" for i in range(1, 4)},
+                               **{f"HY{i}": "kiran@example.com" for i in range(1, 4)}})
+        self.assertLess(res.data['total_distance_km'], 15)
+        self.assertEqual(res.data['unassigned'], [
+            {'global_id': "MISSING", 'reason': 'Invalid Global ID'},
+            {'global_id': "NOPOS", 'reason': 'Site has no coordinates'},
+        ])
+        self.assertEqual(Task.objects.count(), 1)
+
+        # At most three sites each: one Vizag site is left over
+        res = self.client.post('/panel/auto-assign/', {
+            'global_ids': ids[:6] + ["VZ0"], 'capacity': 3, 'task_name': "DG PM", 'task_type': "DG PM",
+            'planned_date': "2025-07-01",
+        }, format='json')
+        self.assertEqual(res.status_code, 200)
+        counts = {}
+        for a in res.data['assignments']:
+            counts[a['employee_email']] = counts.get(a['employee_email'], 0) + 1
+        self.assertEqual(counts, {"ravi@example.com": 3, "kiran@example.com": 3})
+        self.assertEqual([u['reason'] for u in res.data['unassigned']], ['No employee capacity left'])
+        created = Task.objects.filter(task_id__in=[a['task_id'] for a in res.data['assignments']])
+        self.assertEqual(created.count(), 6)
+        self.assertEqual(set(created.values_list('planned_date', flat=True)), {datetime.date(2025, 7, 1)})
+
+    def test_home_sites_survive_site_import(self):
+        from employees.models import Employee
+        site_import.replace_site_data(["global_id,cluster_name,site_name,latitude,longitude"] + [
+            f"{s.global_id},{s.cluster_name},{s.site_name},{s.latitude},{s.longitude}"
+            for s in SiteData.objects.exclude(global_id="NOPOS")
+        ])
+        self.assertEqual(Employee.objects.get(user=self.ravi).home_site.global_id, "VZ0")
+        res = self.client.post('/panel/auto-assign/?dry_run=true', {'global_ids': ["VZ1"]}, format='json')
+        self.assertEqual(res.data['assignments'][0]['employee_email'], "ravi@example.com")
+
+
+class RecurringTaskTests(APITestCase):
+    def setUp(self):
+        self.emp = User.objects.create_user(
+            username="emp1", email="emp1@example.com", password="emp123",
+            role="employee", state="Andhra Pradesh"
+        )
+        self.pm = TaskType.objects.create(name="DG PM", color_code="#888888")
+        self.vizag = Cluster.objects.create(name="Vizag")
+        for i in range(1, 4):
+            SiteData.objects.create(global_id=f"VZ{i}", cluster_name="Vizag", site_name=f"Vizag {i}")
+        self.hyd = SiteData.objects.create(global_id="HY1", cluster_name="Hyderabad", site_name="Hyd 1")
+
+    def generate(self, *args):
+        out = io.StringIO()
+        call_command('generate_recurring_tasks', '--start', '2025-07-01', *args, stdout=out)
+        return out.getvalue()
+
+    def test_window_materialized_once(self):
+        from .models import RecurrenceRule
+        # Monthly PM on every Vizag site, weekly check on one Hyderabad site
+        RecurrenceRule.objects.create(title="DG PM", type=self.pm, cluster=self.vizag, unit='month',
+                                      start_date=datetime.date(2025, 1, 31), assigned_to=self.emp)
+        RecurrenceRule.objects.create(title="Site check", type=self.pm, site=self.hyd, unit='week', every=2,
+                                      start_date=datetime.date(2025, 7, 3), assigned_to=self.emp)
+        # Already planned by hand: the exact occurrence, and an open task later in VZ2's period
+        Task.objects.create(global_id="VZ1", title="DG PM", type=self.pm, cluster=self.vizag,
+                            assigned_to=self.emp, planned_date=datetime.date(2025, 7, 31), status='completed')
+        Task.objects.create(global_id="VZ2", title="DG PM", type=self.pm, cluster=self.vizag,
+                            assigned_to=self.emp, planned_date=datetime.date(2025, 8, 5))
+
+        with self.assertRaisesMessage(CommandError, '--days must be at least 1'):
+            self.generate('--days', '0')
+        self.assertIn("Would create 4 task(s)", self.generate('--days', '31', '--dry-run'))
+        self.assertEqual(Task.objects.count(), 2)
+
+        self.assertIn("Created 4 task(s) from 2 rule(s)", self.generate('--days', '31'))
+        self.assertEqual(
+            sorted(Task.objects.filter(planned_date__lt=datetime.date(2025, 8, 1))
+                   .values_list('global_id', 'title', 'planned_date')),
+            [("HY1", "Site check", datetime.date(2025, 7, 3)),
+             ("HY1", "Site check", datetime.date(2025, 7, 17)),
+             ("HY1", "Site check", datetime.date(2025, 7, 31)),
+             ("VZ1", "DG PM", datetime.date(2025, 7, 31)),
+             ("VZ3", "DG PM", datetime.date(2025, 7, 31))]
+        )
+        self.assertTrue(Task.objects.filter(global_id="VZ3", state="Andhra Pradesh", cluster=self.vizag,
+                                            site__site_name="Vizag 3").exists())
+
+        # Rerun: nothing new; a longer window only adds the later occurrences
+        self.assertIn("Created 0 task(s)", self.generate('--days', '31'))
+        self.assertEqual(Task.objects.count(), 6)
+        self.generate('--days', '62')
+        self.assertEqual(
+            sorted(Task.objects.filter(planned_date__gte=datetime.date(2025, 8, 1))
+                   .values_list('global_id', 'planned_date')),
+            [("HY1", datetime.date(2025, 8, 14)),
+             ("HY1", datetime.date(2025, 8, 28)), ("VZ1", datetime.date(2025, 8, 31)),
+             ("VZ2", datetime.date(2025, 8, 5)), ("VZ2", datetime.date(2025, 8, 31)),
+             ("VZ3", datetime.date(2025, 8, 31))]
+        )
+
+
+    def test_site_import_keeps_rules(self):
+        from .models import RecurrenceRule
+        RecurrenceRule.objects.create(title="Site check", type=self.pm, site=self.hyd, unit='week',
+                                             start_date=datetime.date(2025, 7, 3), assigned_to=self.emp)
+        site_import.replace_site_data([
+            "global_id,cluster_name,site_name",
+            "HY1,Hyderabad,Hyderabad One",
+            "VZ1,Vizag,Vizag 1",
+            "VZ9,Vizag,Vizag 9",
+        ])
+        self.assertEqual(RecurrenceRule.objects.get().site, self.hyd)
+        self.assertEqual(SiteData.objects.get(pk=self.hyd.pk).site_name, "Hyderabad One")
+        self.assertEqual(sorted(SiteData.objects.values_list('global_id', flat=True)), ["HY1", "VZ1", "VZ9"])
+
+class BulkOperationsTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username="admin", email="admin@example.com", password="admin123",
+            role="admin", state="Andhra Pradesh"
+        )
+        self.emp = User.objects.create_user(username="emp1", email="emp1@example.com", password="x",
+                                            role="employee", state="Andhra Pradesh")
+        self.other = User.objects.create_user(username="emp2", email="emp2@example.com", password="x",
+                                              role="employee", state="Telangana")
+        fields = dict(global_id="G1", title="DG PM", assigned_to=self.emp,
+                      type=TaskType.objects.create(name="DG PM", color_code="#888888"),
+                      cluster=Cluster.objects.create(name="Vizag"))
+        self.tasks = Task.objects.bulk_create([Task(**fields) for _ in range(6)])
+        self.reports = [Report.objects.create(task=t, submitted_by=self.emp) for t in self.tasks[:4]]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def test_review_many_reports(self):
+        ids = [r.id for r in self.reports[:3]]
+        Report.objects.filter(id=ids[0]).update(status='approved')
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post('/panel/reports/bulk-review/',
+                                   {'report_ids': ids + [999999, "x"], 'action': 'approve'}, format='json')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([r['outcome'] for r in res.data['results']],
+                         ['unchanged', 'approved', 'approved', 'not_found', 'not_found'])
+        self.assertEqual(res.data['summary'], {'unchanged': 1, 'approved': 2, 'not_found': 2})
+        self.assertEqual(Task.objects.filter(status='completed').count(), 2)
+        self.assertFalse(Report.objects.filter(id__in=ids[1:], approved_at__isnull=True).exists())
+        self.assertEqual(counters.rebuild(), 0)
+
+        # Queries grow with the counter keys touched, not with the number of reports
+        more = [r.id for r in self.reports]
+        with CaptureQueriesContext(connection) as ctx_more:
+            self.client.post('/panel/reports/bulk-review/',
+                             {'report_ids': more, 'action': 'reject', 'reason': "Blurry"}, format='json')
+        self.assertLessEqual(len(ctx_more.captured_queries), len(ctx.captured_queries) + 2)
+        self.assertEqual(Report.objects.filter(status='rejected', rejection_reason="Blurry").count(), 4)
+
+    def test_reassign_status_and_delete(self):
+        from sync.models import Tombstone
+        ids = [t.task_id for t in self.tasks]
+        res = self.client.post('/panel/tasks/bulk-reassign/',
+                               {'task_ids': ids[:3], 'employee_email': "emp2@example.com"}, format='json')
+        self.assertEqual(res.data['summary'], {'reassigned': 3})
+        self.assertEqual(set(Task.objects.filter(task_id__in=ids[:3]).values_list('state', flat=True)),
+                         {"Telangana"})
+        self.assertEqual(Tombstone.objects.filter(owner=self.emp, model_name='task').count(), 3)
+
+        res = self.client.post('/panel/tasks/bulk-status/', {'task_ids': ",".join(ids[2:4]) + ",NOPE",
+                                                             'status': 'in_progress'}, format='json')
+        self.assertEqual([r['outcome'] for r in res.data['results']], ['updated', 'updated', 'not_found'])
+        self.assertEqual(self.client.post('/panel/tasks/bulk-status/', {'task_ids': ids, 'status': 'done'},
+                                          format='json').status_code, 400)
+
+        before = Task.objects.get(task_id=ids[0]).updated_at
+        res = self.client.post('/panel/tasks/bulk-delete/', {'task_ids': ids[:2] + ["NOPE"]}, format='json')
+        self.assertEqual(res.data['summary'], {'deleted': 2, 'not_found': 1, 'reports_deleted': 2})
+        self.assertEqual(Report.objects.count(), 2)
+        self.assertEqual(Tombstone.objects.filter(owner=self.other, model_name='task').count(), 2)
+        self.assertEqual(Tombstone.objects.filter(owner=self.emp, model_name='report').count(), 2)
+        self.assertGreater(Task.objects.get(task_id=ids[2]).updated_at, before)
+        self.assertEqual(counters.rebuild(), 0)
+
+        self.client.force_authenticate(user=self.emp)
+        self.assertEqual(self.client.post('/panel/tasks/bulk-delete/', {'task_ids': ids},
+                                          format='json').status_code, 403)
@@ -3,6 +3,11 @@ from . import views
 
 urlpatterns = [
     path('dashboard/', views.dashboard_stats, name='dashboard-stats'),
+    path('dashboard/cache-stats/', views.dashboard_cache_stats, name='dashboard-cache-stats'),
+    path('trends/', views.trends, name='trends'),
+    path('sla/', views.sla_analytics, name='sla-analytics'),
+    path('search/', views.global_search, name='search'),
+    path('dashboard/stream/', views.dashboard_stream, name='dashboard-stream'),
 
     # Employee CRUD
     path('employees/', views.list_employees, name='list-employees'),
@@ -12,26 +17,36 @@ urlpatterns = [
     path('employee/<int:id>/toggle-status/', views.toggle_employee_status, name='toggle-employee-status'),
     path('create-employee/', views.create_employee, name='create-employee'),
     path('bulk-create-employees-zip/', views.bulk_create_employees_zip, name='bulk-create-employees-zip'),
+    path('bulk-create-employees-zip/async/', views.bulk_create_employees_zip_async, name='bulk-create-employees-zip-async'),
     path('employees/export/', views.export_employees_csv, name='export_employees_csv'),
 
     # Tasks
     path('assign-task/', views.assign_task, name='assign-task'),
     path('bulk-assign-csv/', views.bulk_assign_task_csv, name='bulk-assign-csv'),
+    path('bulk-assign-csv/async/', views.bulk_assign_task_csv_async, name='bulk-assign-csv-async'),
+    path('auto-assign/', views.auto_assign_tasks, name='auto-assign'),
     path('tasks/', views.list_tasks, name='list-tasks'),
+    path('tasks/stream/', views.stream_tasks, name='stream-tasks'),
     path('delete-task/<str:task_id>/', views.delete_task, name='delete-task'),
+    path('tasks/bulk-delete/', views.bulk_delete_tasks, name='bulk-delete-tasks'),
+    path('tasks/bulk-reassign/', views.bulk_reassign_tasks, name='bulk-reassign-tasks'),
+    path('tasks/bulk-status/', views.bulk_task_status, name='bulk-task-status'),
 
 
  
     # Reports
     path('reports/', views.list_reports, name='list-reports'),
+    path('reports/stream/', views.stream_reports, name='stream-reports'),
     path('report/<int:report_id>/', views.view_report, name='view-report'),
     path('report/<int:report_id>/export/pdf/', views.export_report_pdf, name='export-report-pdf'),
     path('report/<int:report_id>/export/csv/', views.export_report_csv, name='export-report-csv'),
     path('report-review/', views.review_report, name='review-report'),
+    path('reports/bulk-review/', views.bulk_review_reports, name='bulk-review-reports'),
 
 
     # Site Management Import/Export
     path('import-site-data/', views.import_site_data, name='import-site-data'),
+    path('import-site-data/async/', views.import_site_data_async, name='import-site-data-async'),
     path('export-site-data/', views.export_site_data, name='export-site-data'),
 
     path('import-dg-pm-cm-form/', views.import_dg_pm_cm_form, name='import-dg-pm-cm-form'),
@@ -1,106 +1,210 @@
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
 from django.utils import timezone
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.core.files.storage import default_storage
 from django.contrib.auth import get_user_model
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
 
 from .models import Task, TaskType, Cluster, SiteData
 from reports.models import Report
 from .serializers import DashboardStatsSerializer
+from .dashboard import build_dashboard_stats
+from . import dashboard_cache
+from .dashboard_cache import cached_dashboard
+from .pagination import InvalidCursor, KeysetPaginator
+from .conditional import conditional_on
+from .filters import FilterError, TASK_FILTERS, REPORT_FILTERS
+from .streaming import stream_rows
+from . import events, rollups, search, sla
+from . import auto_assign, bulk_ops, employee_import, site_import, task_import
+from jobs import runner
+from sync.idempotency import idempotent
 
 from django.template.loader import render_to_string
 from weasyprint import HTML
 import tempfile
 import csv
+import datetime
 
 User = get_user_model()
 
 # --- 1. Dashboard Endpoint ---
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_dashboard('admin_dashboard')
 def dashboard_stats(request):
-    employees = User.objects.filter(role='employee')
+    stats = build_dashboard_stats()
+    serializer = DashboardStatsSerializer(stats)
+    return Response(serializer.data)
 
-    # List of task names to track, as you want on the cards
-    TASK_TITLES = [
-        "DG PM",
-        "DG CM",
-        "AC PM",
-        "AC CM",
-        "Site Visit",
-    ]
 
-    task_type_stats = []
-    for name in TASK_TITLES:
-        # Count by title (case-sensitive by default, you can add __iexact if you want case-insensitive)
-        total = Task.objects.filter(title=name).count()
-        completed = Task.objects.filter(title=name, status='completed').count()
-        pending = Task.objects.filter(title=name, status='pending').count()
-        in_progress = Task.objects.filter(title=name, status='in_progress').count()
-        color = "#1976D2"  # you can map a color if you want, or just leave as default
-        task_type_stats.append({
-            'task_name': name,
-            'total': total,
-            'completed': completed,
-            'pending': pending,
-            'in_progress': in_progress,
-            'color': color
-        })
-
-    stats = {
-        'total_employees': employees.count(),
-        'total_tasks': Task.objects.count(),
-        'completed_tasks': Task.objects.filter(status='completed').count(),
-        'pending_tasks': Task.objects.filter(status='pending').count(),
-        'in_progress_tasks': Task.objects.filter(status='in_progress').count(),
-
-        'task_type_stats': task_type_stats,
-
-        'clusters': [
-            {
-                'name': cluster.name,
-                'total': Task.objects.filter(cluster=cluster).count(),
-                'completed': Task.objects.filter(cluster=cluster, status='completed').count(),
-            }
-            for cluster in Cluster.objects.all()
-        ],
+async def _stream_user(request):
+    """
+    Authenticate a stream request by JWT. EventSource can't send headers,
+    so the token may also come as ?token=.
+    """
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    raw_token = auth.get_raw_token(header) if header else request.GET.get('token')
+    if not raw_token:
+        return None
+    try:
+        validated = auth.get_validated_token(raw_token)
+        return await sync_to_async(auth.get_user)(validated)
+    except (InvalidToken, AuthenticationFailed):
+        return None
 
-        'recent_assigned_tasks': [
-            {
-                'employee_id': t.assigned_to.id,
-                'employee_name': t.assigned_to.first_name,
-                'task_id': t.task_id,
-                'task_type': t.type.name if t.type else '',
-                'global_id': t.global_id
-            }
-            for t in Task.objects.select_related('assigned_to', 'type').order_by('-created_at')[:5]
-        ],
 
-        'recent_employees': [
-            {
-                'id': e.id,
-                'name': e.first_name,
-                'email': e.email,
-                'designation': getattr(e, 'designation', ''),
-                'global_id': getattr(e, 'global_id', ''),
-                'state_user_id': getattr(e, 'state_user_id', ''),
-                'state': getattr(e, 'state', ''),
-                'active': e.is_active,
-                'date_joined': e.date_joined,
-            }
-            for e in employees.order_by('-date_joined')[:5]
-        ]
-    }
-    serializer = DashboardStatsSerializer(stats)
-    return Response(serializer.data)
+async def dashboard_stream(request):
+    """
+    Server-Sent Events stream of dashboard changes: task counter deltas and
+    report status changes. Reconnecting clients send Last-Event-ID (or
+    ?last_event_id=) to receive what they missed. Served by backend/asgi.py.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    user = await _stream_user(request)
+    if user is None:
+        return JsonResponse({'error': 'Invalid or missing token'}, status=401)
+    if user.role not in ('admin', 'superadmin'):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or None
+
+    return StreamingHttpResponse(
+        events.stream(last_event_id),
+        content_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def trends(request):
+    """
+    Daily assigned/submitted/approved/rejected counts from the rollup tables.
+    Query params: start, end (YYYY-MM-DD, default last 90 days),
+    group_by (comma-separated: cluster, type, state), cluster, type, state.
+    """
+    try:
+        end = datetime.date.fromisoformat(request.GET['end']) if request.GET.get('end') else timezone.localdate()
+        start = (
+            datetime.date.fromisoformat(request.GET['start']) if request.GET.get('start')
+            else end - datetime.timedelta(days=89)
+        )
+    except ValueError:
+        return Response({'error': 'Invalid date, expected YYYY-MM-DD'}, status=400)
+    if start > end:
+        return Response({'error': 'start must not be after end'}, status=400)
+
+    group_by = [g.strip() for g in request.GET.get('group_by', '').split(',') if g.strip()]
+    invalid = [g for g in group_by if g not in rollups.GROUP_FIELDS]
+    if invalid:
+        return Response({'error': f'Invalid group_by: {", ".join(invalid)}'}, status=400)
+
+    series = rollups.trends(
+        start, end, group_by,
+        cluster=request.GET.get('cluster'),
+        task_type=request.GET.get('type'),
+        state=request.GET.get('state'),
+    )
+    return Response({'start': start, 'end': end, 'group_by': group_by, 'series': series})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@cached_dashboard('sla_analytics', timeout=getattr(settings, 'SLA_CACHE_SECONDS', 300), vary_on_params=True)
+def sla_analytics(request):
+    """
+    Overdue counts, average lateness and on-time completion rate, overall and
+    per cluster, type and assignee, for tasks due in the window.
+    Query params: days (look-back from now, default SLA_WINDOW_DAYS), or
+    start/end (YYYY-MM-DD, end inclusive); cluster, type, state.
+    """
+    if request.user.role not in ('admin', 'superadmin'):
+        return Response({'error': 'Unauthorized'}, status=403)
+
+    now = timezone.now()
+    try:
+        if request.GET.get('start') or request.GET.get('end'):
+            end_day = datetime.date.fromisoformat(request.GET['end']) if request.GET.get('end') else timezone.localdate()
+            start_day = datetime.date.fromisoformat(request.GET['start']) if request.GET.get('start') else end_day
+            start = timezone.make_aware(datetime.datetime.combine(start_day, datetime.time()))
+            end = timezone.make_aware(datetime.datetime.combine(end_day + datetime.timedelta(days=1), datetime.time()))
+        else:
+            days = int(request.GET.get('days', getattr(settings, 'SLA_WINDOW_DAYS', 30)))
+            if days < 1:
+                raise ValueError
+            start, end = now - datetime.timedelta(days=days), now
+    except ValueError:
+        return Response({'error': 'Invalid window: days must be a positive integer, dates YYYY-MM-DD'}, status=400)
+    if start >= end:
+        return Response({'error': 'start must not be after end'}, status=400)
+
+    stats = sla.sla_stats(
+        start, end,
+        cluster=request.GET.get('cluster'),
+        task_type=request.GET.get('type'),
+        state=request.GET.get('state'),
+    )
+    return Response({'start': start, 'end': end, 'as_of': now, **stats})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def global_search(request):
+    """
+    Ranked full-text search over tasks, sites and users.
+    Query params: q, kind (comma-separated: task, site, user), page, page_size.
+    Every word of q matches as a prefix, e.g. "vizag stee" or "AP-EMP".
+    """
+    if request.user.role not in ('admin', 'superadmin'):
+        return Response({'error': 'Unauthorized'}, status=403)
+    if not search.available():
+        return Response({'error': 'Search is not available on this database'}, status=501)
+
+    q = request.GET.get('q', '').strip()
+    if not q:
+        return Response({'error': 'q is required'}, status=400)
+
+    kinds = [k.strip() for k in request.GET.get('kind', '').split(',') if k.strip()]
+    invalid = [k for k in kinds if k not in search.KINDS]
+    if invalid:
+        return Response({'error': f'Invalid kind: {", ".join(invalid)}'}, status=400)
+
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+        page_size = min(max(int(request.GET.get('page_size', 20)), 1), 100)
+    except ValueError:
+        return Response({'error': 'page and page_size must be integers'}, status=400)
+
+    hits = search.search(q, kinds, limit=page_size + 1, offset=(page - 1) * page_size)
+    return Response({
+        'results': search.results(hits[:page_size]),
+        'next': page + 1 if len(hits) > page_size else None,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dashboard_cache_stats(request):
+    if request.user.role not in ('admin', 'superadmin'):
+        return Response({'error': 'Unauthorized'}, status=403)
+    return Response(dashboard_cache.stats())
 
 
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def assign_task(request):
     global_id = request.data.get('global_id')
     employee_email = request.data.get('employee_email')   # 🔹 now email only
@@ -164,6 +268,11 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from admin_panel.models import Task, TaskType, SiteData, Cluster
 
+def _dry_run(request):
+    value = request.query_params.get('dry_run') or request.data.get('dry_run') or ''
+    return str(value).strip().lower() in ('1', 'true', 'yes')
+
+
 @api_view(['POST'])
 @parser_classes([MultiPartParser, FormParser])
 @permission_classes([IsAuthenticated])
@@ -172,6 +281,7 @@ def bulk_assign_task_csv(request):
     Bulk assign tasks from a CSV/TSV file.
     Expected headers (case-insensitive): 
     employee_email, task_name, task_type, global_id, planned_date
+    With dry_run=true, only validates: nothing is written.
     """
 
     if 'file' not in request.FILES:
@@ -180,177 +290,208 @@ def bulk_assign_task_csv(request):
     file = request.FILES['file']
     decoded_file = file.read().decode('utf-8-sig')  # 🔹 handles BOM too
 
-    # 🔹 Detect delimiter (comma vs tab)
-    if "\t" in decoded_file and "," not in decoded_file:
-        delimiter = "\t"
-    else:
-        delimiter = ","
+    try:
+        reader, delimiter = task_import.read_csv(decoded_file)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
 
-    reader = csv.DictReader(io.StringIO(decoded_file), delimiter=delimiter)
+    # 🔹 ?dry_run=true: report what would happen, write nothing
+    if _dry_run(request):
+        results, summary = task_import.dry_run(task_import.clean_rows(reader))
+        return Response({'dry_run': True, 'results': results, 'summary': summary, 'delimiter_used': delimiter})
 
-    # 🔹 Ensure headers exist
-    if not reader.fieldnames:
-        return Response({'error': 'CSV file has no headers'}, status=400)
+    # 🔹 Resolve references in bulk, validate in memory, insert in one transaction
+    results = task_import.assign_tasks(task_import.clean_rows(reader), request.user)
 
-    # 🔹 Clean headers (strip + lowercase)
-    reader.fieldnames = [h.strip().lower() for h in reader.fieldnames if h]
+    if not results or all('error' in r for r in results):
+        return Response({'results': results, 'message': 'No tasks created'}, status=400)
 
-    # 🔹 Validate required headers
-    required_headers = {"employee_email", "task_name", "task_type", "global_id", "planned_date"}
-    missing = required_headers - set(reader.fieldnames)
-    if missing:
-        return Response({'error': f'Missing required headers: {", ".join(missing)}'}, status=400)
+    return Response({'results': results, 'delimiter_used': delimiter}, status=200)
 
-    results = []
-    admin_user = request.user
 
-    for idx, row in enumerate(reader, start=1):
-        # 🔹 Clean each row (strip spaces)
-        row = {k.strip().lower(): (v.strip() if v else "") for k, v in row.items()}
-
-        employee_email = row.get('employee_email')
-        task_name = row.get('task_name')
-        task_type_name = row.get('task_type')
-        global_id = row.get('global_id')
-        planned_date_str = row.get('planned_date')
-
-        # Validate required fields
-        if not all([employee_email, task_name, task_type_name, global_id, planned_date_str]):
-            results.append({'row': idx, 'error': 'Missing required fields', 'data': row})
-            continue
-
-        # Parse planned_date (accept DD-MM-YY and YYYY-MM-DD)
-        planned_date = None
-        for fmt in ("%d-%m-%y", "%Y-%m-%d"):
-            try:
-                planned_date = datetime.datetime.strptime(planned_date_str, fmt).date()
-
-                break
-            except ValueError:
-                continue
-        if not planned_date:
-            results.append({'row': idx, 'error': f'Invalid planned_date format: {planned_date_str}', 'data': row})
-            continue
+def _id_list(value):
+    if isinstance(value, str):
+        value = value.split(',')
+    return [str(v).strip() for v in (value or []) if str(v).strip()]
 
-        # Validate site
-        try:
-            site = SiteData.objects.get(global_id=global_id)
-        except SiteData.DoesNotExist:
-            results.append({'row': idx, 'error': 'Invalid Global ID', 'data': row})
-            continue
 
-        # Validate employee
-        try:
-            employee = User.objects.get(email=employee_email, role='employee')
-        except User.DoesNotExist:
-            results.append({'row': idx, 'error': 'Invalid employee_email', 'data': row})
-            continue
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def auto_assign_tasks(request):
+    """
+    Assign one task per site to the nearest employees (see auto_assign).
+    Body: global_ids, task_name, task_type, planned_date (optional),
+    employee_emails (optional; default: active employees of the admin's
+    state), capacity (optional; max sites per employee), dry_run.
+    """
+    global_ids = list(dict.fromkeys(_id_list(request.data.get('global_ids'))))
+    emails = _id_list(request.data.get('employee_emails'))
+    task_name = request.data.get('task_name')
+    task_type_name = request.data.get('task_type')
+    dry_run = _dry_run(request)
 
-        # Task type
-        task_type, _ = TaskType.objects.get_or_create(
-            name=task_type_name,
-            defaults={'color_code': '#888888'}
-        )
+    if not global_ids or (not dry_run and not all([task_name, task_type_name])):
+        return Response({'error': 'Missing fields'}, status=400)
 
-        # Cluster
-        cluster, _ = Cluster.objects.get_or_create(name=site.cluster_name)
-
-        # Create task (task_id auto-generated by signal)
-        task = Task.objects.create(
-            global_id=global_id,
-            title=task_name,
-            status='pending',
-            type=task_type,
-            cluster=cluster,
-            assigned_to=employee,
-            planned_date=planned_date,
-            site=site,
-            site_name=site.site_name,
-            cluster_name=site.cluster_name,
-            assigned_by=admin_user,
-        )
+    planned_date = None
+    if request.data.get('planned_date'):
+        planned_date = task_import.parse_planned_date(str(request.data['planned_date']))
+        if not planned_date:
+            return Response({'error': f'Invalid planned_date format: {request.data["planned_date"]}'}, status=400)
 
-        results.append({
-            'row': idx,
-            'message': 'Task assigned',
-            'task_id': task.task_id,
-            'employee_email': employee.email,
-            'planned_date': str(planned_date)
-        })
+    capacity = request.data.get('capacity')
+    if capacity not in (None, ''):
+        try:
+            capacity = int(capacity)
+            if capacity < 1:
+                raise ValueError
+        except (TypeError, ValueError):
+            return Response({'error': 'capacity must be a positive integer'}, status=400)
+    else:
+        capacity = None
+
+    employees = User.objects.filter(role='employee', is_active=True)
+    if emails:
+        employees = employees.filter(email__in=emails)
+    elif request.user.state:
+        employees = employees.filter(state=request.user.state)
+    employees = list(auto_assign.with_positions(employees).order_by('id'))
+    unknown = set(emails) - {e.email for e in employees}
+    if unknown:
+        return Response({'error': f'Invalid employee_email: {", ".join(sorted(unknown))}'}, status=400)
+
+    sites = {s.global_id: s for s in SiteData.objects.filter(global_id__in=global_ids)}
+    assignments, unassigned = auto_assign.plan([sites[g] for g in global_ids if g in sites], employees, capacity)
+
+    tasks = []
+    if not dry_run and assignments:
+        tasks = task_import.write([
+            (None, {'global_id': site.global_id, 'task_name': task_name, 'task_type': task_type_name},
+             planned_date, site, employee)
+            for site, employee, _ in assignments
+        ], request.user)
 
-    if not results or all('error' in r for r in results):
-        return Response({'results': results, 'message': 'No tasks created'}, status=400)
+    return Response({
+        'dry_run': dry_run,
+        'assignments': [
+            {
+                'global_id': site.global_id,
+                'site_name': site.site_name,
+                'employee_email': employee.email,
+                'distance_km': round(km, 2),
+                **({'task_id': tasks[i].task_id} if tasks else {}),
+            }
+            for i, (site, employee, km) in enumerate(assignments)
+        ],
+        'unassigned': (
+            [{'global_id': g, 'reason': 'Invalid Global ID'} for g in global_ids if g not in sites]
+            + [{'global_id': site.global_id, 'reason': reason} for site, reason in unassigned]
+        ),
+        'employees_without_position': [e.email for e in auto_assign.without_position(employees)],
+        'total_distance_km': round(sum(km for *_, km in assignments), 2),
+    })
 
-    return Response({'results': results, 'delimiter_used': delimiter}, status=200)
 
+def _queued(job):
+    return Response({'job_id': job.id, 'status': job.status, 'status_url': f'/jobs/{job.id}/'}, status=202)
 
 
+@api_view(['POST'])
+@parser_classes([MultiPartParser, FormParser])
+@permission_classes([IsAuthenticated])
+def bulk_assign_task_csv_async(request):
+    """
+    Same as bulk_assign_task_csv, run by a background worker.
+    Returns a job id at once; the job result is the usual response body.
+    """
+    if 'file' not in request.FILES:
+        return Response({'error': 'CSV file is required'}, status=400)
+    upload = runner.save_upload(request.FILES['file'])
+    return _queued(runner.enqueue('admin_panel.bulk_assign_task_csv', request.user, upload=upload))
 
 
+def _task_list_row(t):
+    if getattr(t, 'site_name', None):
+        resolved_site_name = t.site_name
+    elif getattr(t, 'site', None):
+        resolved_site_name = t.site.site_name
+    else:
+        resolved_site_name = ''
+
+    return {
+        'task_id': t.task_id,
+        'global_id': t.global_id,
+        'task_name': t.title,
+        'task_type': t.type.name if t.type else '',
+        'status': t.status,
+        'assigned_date': t.created_at,
+        'deadline': t.deadline,
+        'planned_date': t.planned_date,   # 🔹 Added field
+        'cluster_name': t.cluster.name if t.cluster else '',
+        'site_name': resolved_site_name,
+        'employee_id': t.assigned_to.id if t.assigned_to else None,
+        'employee_name': t.assigned_to.first_name if t.assigned_to else '',
+        'employee_email': t.assigned_to.email if t.assigned_to else '',
+        'employee_global_id': getattr(t.assigned_to, 'global_id', '') if t.assigned_to else '',
+        'employee_state_user_id': getattr(t.assigned_to, 'state_user_id', '') if t.assigned_to else '',
+        'employee_state': getattr(t.assigned_to, 'state', '') if t.assigned_to else '',
+        'assigned_by_id': t.assigned_by.id if t.assigned_by else None,
+        'assigned_by_name': t.assigned_by.first_name if t.assigned_by else '',
+        'assigned_by_email': t.assigned_by.email if t.assigned_by else '',
+
+        # 🔹 Add reports here
+        'reports': [
+            {
+                'report_id': r.id,
+                'status': r.status,
+                'submitted_at': r.submitted_at,
+                'approved_at': r.approved_at,
+                'rejection_reason': r.rejection_reason,
+                'employee_name': t.assigned_to.first_name if t.assigned_to else "",
+                'employee_email': t.assigned_to.email if t.assigned_to else "",
+            }
+            for r in t.reports.all()
+        ]
+    }
 
 
+def _filtered_tasks(request):
+    queryset = Task.objects.select_related(
+        'assigned_to', 'type', 'cluster', 'assigned_by', 'site'
+    ).prefetch_related('reports')
+    return TASK_FILTERS.apply(queryset, request.GET)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_tasks(request):
-    status = request.GET.get('status')
-    queryset = Task.objects.select_related(
-        'assigned_to', 'type', 'cluster', 'assigned_by', 'site'
-    ).order_by('-created_at')
-    
-    if status:
-        queryset = queryset.filter(status=status)
+    """
+    Tasks, newest first, one page at a time: pass the returned `next` back
+    as ?cursor= for the following page (?page_size= overrides the default).
+    Filters and ?sort= are listed in filters.TASK_FILTERS.
+    """
+    try:
+        queryset, ordering = _filtered_tasks(request)
+        page, next_cursor = KeysetPaginator(ordering).paginate(queryset, request)
+    except (FilterError, InvalidCursor) as e:
+        return Response({'error': str(e)}, status=400)
     
-    data = []
-    for t in queryset:
-        if getattr(t, 'site_name', None):
-            resolved_site_name = t.site_name
-        elif getattr(t, 'site', None):
-            resolved_site_name = t.site.site_name
-        else:
-            resolved_site_name = ''
-
-        data.append({
-            'task_id': t.task_id,
-            'global_id': t.global_id,
-            'task_name': t.title,
-            'task_type': t.type.name if t.type else '',
-            'status': t.status,
-            'assigned_date': t.created_at,
-            'deadline': t.deadline,
-            'planned_date': t.planned_date,   # 🔹 Added field
-            'cluster_name': t.cluster.name if t.cluster else '',
-            'site_name': resolved_site_name,
-            'employee_id': t.assigned_to.id if t.assigned_to else None,
-            'employee_name': t.assigned_to.first_name if t.assigned_to else '',
-            'employee_email': t.assigned_to.email if t.assigned_to else '',
-            'employee_global_id': getattr(t.assigned_to, 'global_id', '') if t.assigned_to else '',
-            'employee_state_user_id': getattr(t.assigned_to, 'state_user_id', '') if t.assigned_to else '',
-            'employee_state': getattr(t.assigned_to, 'state', '') if t.assigned_to else '',
-            'assigned_by_id': t.assigned_by.id if t.assigned_by else None,
-            'assigned_by_name': t.assigned_by.first_name if t.assigned_by else '',
-            'assigned_by_email': t.assigned_by.email if t.assigned_by else '',
-
-            # 🔹 Add reports here
-            'reports': [
-                {
-                    'report_id': r.id,
-                    'status': r.status,
-                    'submitted_at': r.submitted_at,
-                    'approved_at': r.approved_at,
-                    'rejection_reason': r.rejection_reason,
-                    'employee_name': t.assigned_to.first_name if t.assigned_to else "",
-                    'employee_email': t.assigned_to.email if t.assigned_to else "",
-                }
-                for r in t.reports.all()
-            ]
+    data = [_task_list_row(t) for t in page]
+    return Response({'results': data, 'next': next_cursor})
 
 
-        
-        })
-    
-    return Response(data)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def stream_tasks(request):
+    """
+    Every task matching the list_tasks filters, in the list_tasks row layout,
+    as one streamed JSON array (for exports; memory use stays flat).
+    """
+    try:
+        queryset, ordering = _filtered_tasks(request)
+    except FilterError as e:
+        return Response({'error': str(e)}, status=400)
+    return stream_rows(request, KeysetPaginator(ordering).order(queryset), _task_list_row)
 
 
 
@@ -378,40 +519,28 @@ def import_site_data(request):
     if not file:
         return Response({'error': 'No file provided'}, status=400)
 
-    # Save file to media/site_data.csv
-    # Ensure MEDIA_ROOT exists
-    media_root = getattr(settings, 'MEDIA_ROOT', 'media')
-    os.makedirs(media_root, exist_ok=True)
-    saved_path = os.path.join(media_root, 'site_data.csv')
-    with open(saved_path, 'wb+') as destination:
-        for chunk in file.chunks():
-            destination.write(chunk)
-
-    # Parse the uploaded file
-    raw = open(saved_path, 'rb').read()
+    # Save file to media/site_data.csv and replace all site data with its rows
+    lines = site_import.decode(site_import.store(file.chunks()))
     try:
-        decoded = raw.decode('utf-8-sig').splitlines()
-    except UnicodeDecodeError:
-        try:
-            decoded = raw.decode('latin1').splitlines()
-        except UnicodeDecodeError:
-            return Response({'error': 'Unable to decode file. Please save as UTF-8 or CSV again.'}, status=400)
-
-    reader = csv.DictReader(decoded)
-
-    # Remove old data before saving new
-    SiteData.objects.all().delete()
-    for row in reader:
-        SiteData.objects.create(
-            global_id=row['global_id'],
-            cluster_name=row['cluster_name'],
-            site_name=row['site_name'],
-            latitude=row.get('latitude', ''),
-            longitude=row.get('longitude', ''),
-        )
+        site_import.replace_site_data(lines)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
     return Response({'message': 'Site data imported and stored (old data replaced)'})
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def import_site_data_async(request):
+    """
+    Same as import_site_data, run by a background worker.
+    """
+    file = request.FILES.get('file')
+    if not file:
+        return Response({'error': 'No file provided'}, status=400)
+    upload = runner.save_upload(file)
+    return _queued(runner.enqueue('admin_panel.import_site_data', request.user, upload=upload))
+
+
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -431,28 +560,57 @@ def export_site_data(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_reports(request):
-    reports = Report.objects.select_related('task', 'submitted_by')
-    data = []
-    for r in reports:
-        data.append({
-            'report_id': r.id,
-            'task_id': r.task.task_id,
-            'global_id': r.task.global_id,
-            'site_name': getattr(r.task, 'site_name', ''),
-            'cluster_name': r.task.cluster.name if r.task.cluster else '',
-            'employee_id': r.submitted_by.id,
-            'employee_name': r.submitted_by.first_name,
-            'employee_email': r.submitted_by.email,
-            'employee_global_id': getattr(r.submitted_by, 'global_id', ''),
-            'employee_state_user_id': getattr(r.submitted_by, 'state_user_id', ''),
-            'employee_state': getattr(r.submitted_by, 'state', ''),
-            'assigned_date': r.task.created_at,
-            'submitted_date': r.submitted_at,
-            'admin_name': r.task.assigned_by.first_name if r.task.assigned_by else '',
-            'admin_email': r.task.assigned_by.email if r.task.assigned_by else '',
-            'status': r.status,
-        })
-    return Response(data)
+    """
+    Reports, newest first, one page at a time like list_tasks (?cursor=,
+    ?page_size=). Filters and ?sort= are listed in filters.REPORT_FILTERS.
+    """
+    try:
+        reports, ordering = _filtered_reports(request)
+        page, next_cursor = KeysetPaginator(ordering).paginate(reports, request)
+    except (FilterError, InvalidCursor) as e:
+        return Response({'error': str(e)}, status=400)
+    return Response({'results': [_report_list_row(r) for r in page], 'next': next_cursor})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def stream_reports(request):
+    """
+    Every report matching the list_reports filters, in the list_reports row
+    layout, as one streamed JSON array (for exports; memory use stays flat).
+    """
+    try:
+        reports, ordering = _filtered_reports(request)
+    except FilterError as e:
+        return Response({'error': str(e)}, status=400)
+    return stream_rows(request, KeysetPaginator(ordering).order(reports), _report_list_row)
+
+
+def _filtered_reports(request):
+    reports = Report.objects.select_related('task', 'task__cluster', 'task__assigned_by', 'submitted_by')
+    return REPORT_FILTERS.apply(reports, request.GET)
+
+
+def _report_list_row(r):
+    return {
+        'report_id': r.id,
+        'task_id': r.task.task_id,
+        'global_id': r.task.global_id,
+        'site_name': getattr(r.task, 'site_name', ''),
+        'cluster_name': r.task.cluster.name if r.task.cluster else '',
+        'employee_id': r.submitted_by.id,
+        'employee_name': r.submitted_by.first_name,
+        'employee_email': r.submitted_by.email,
+        'employee_global_id': getattr(r.submitted_by, 'global_id', ''),
+        'employee_state_user_id': getattr(r.submitted_by, 'state_user_id', ''),
+        'employee_state': getattr(r.submitted_by, 'state', ''),
+        'assigned_date': r.task.created_at,
+        'submitted_date': r.submitted_at,
+        'admin_name': r.task.assigned_by.first_name if r.task.assigned_by else '',
+        'admin_email': r.task.assigned_by.email if r.task.assigned_by else '',
+        'status': r.status,
+    }
+
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -481,6 +639,96 @@ def review_report(request):
         return Response({'error': 'Report not found'}, status=404)
 
 
+# --- Bulk operations (see bulk_ops) ---
+def _bulk_ids(request, field):
+    """
+    Distinct ids from `field` (a list or comma-separated), and an error
+    message if there are none or too many.
+    """
+    ids = list(dict.fromkeys(_id_list(request.data.get(field))))
+    limit = getattr(settings, 'BULK_MAX_IDS', 5000)
+    if not ids:
+        return ids, f'Missing {field}'
+    if len(ids) > limit:
+        return ids, f'At most {limit} {field} per request'
+    return ids, None
+
+
+def _is_admin(user):
+    return user.role in ('admin', 'superadmin')
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_review_reports(request):
+    """
+    Approve or reject many reports at once. Body: report_ids, action
+    ('approve' or 'reject'), reason (for rejections).
+    """
+    if not _is_admin(request.user):
+        return Response({'error': 'Unauthorized'}, status=403)
+    ids, error = _bulk_ids(request, 'report_ids')
+    action = request.data.get('action')
+    if error:
+        return Response({'error': error}, status=400)
+    if action not in bulk_ops.REVIEW_ACTIONS:
+        return Response({'error': 'Invalid action'}, status=400)
+    results, summary = bulk_ops.review_reports(ids, action, request.data.get('reason', ''))
+    return Response({'results': results, 'summary': summary})
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_delete_tasks(request):
+    """
+    Delete many tasks (and their reports) at once. Body: task_ids.
+    """
+    if not _is_admin(request.user):
+        return Response({'error': 'Unauthorized'}, status=403)
+    ids, error = _bulk_ids(request, 'task_ids')
+    if error:
+        return Response({'error': error}, status=400)
+    results, summary = bulk_ops.delete_tasks(ids)
+    return Response({'results': results, 'summary': summary})
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_reassign_tasks(request):
+    """
+    Reassign many tasks to one employee. Body: task_ids, employee_email.
+    """
+    if not _is_admin(request.user):
+        return Response({'error': 'Unauthorized'}, status=403)
+    ids, error = _bulk_ids(request, 'task_ids')
+    if error:
+        return Response({'error': error}, status=400)
+    try:
+        employee = User.objects.get(email=request.data.get('employee_email'), role='employee')
+    except (User.DoesNotExist, User.MultipleObjectsReturned):
+        return Response({'error': 'Invalid employee_email'}, status=400)
+    results, summary = bulk_ops.reassign_tasks(ids, employee, assigned_by=request.user)
+    return Response({'results': results, 'summary': summary})
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_task_status(request):
+    """
+    Set the status of many tasks. Body: task_ids, status.
+    """
+    if not _is_admin(request.user):
+        return Response({'error': 'Unauthorized'}, status=403)
+    ids, error = _bulk_ids(request, 'task_ids')
+    status = request.data.get('status')
+    if error:
+        return Response({'error': error}, status=400)
+    if status not in dict(Task.STATUS_CHOICES):
+        return Response({'error': 'Invalid status'}, status=400)
+    results, summary = bulk_ops.set_task_status(ids, status)
+    return Response({'results': results, 'summary': summary})
+
+
 
 # --- 5. Employee Management ---
 
@@ -567,8 +815,7 @@ def create_employee(request):
     })
 
 
-import zipfile, tempfile, os, csv
-from django.core.files.uploadedfile import SimpleUploadedFile
+import os, csv
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
@@ -580,24 +827,6 @@ from employees.models import Employee
 User = get_user_model()
 
 
-def find_photo_anywhere(temp_dir, email, kind):
-    """
-    Search recursively for photo files by email and type (passport/signature).
-    Works with or without extensions (.jpg/.jpeg/.png) and case-insensitive.
-    """
-    base_name = f"{email.lower()}_{kind}"
-    for root, dirs, files in os.walk(temp_dir):
-        for f in files:
-            name, ext = os.path.splitext(f.lower())
-            if name == base_name:  # ✅ match even without extension
-                return os.path.join(root, f)
-            if f.lower().startswith(base_name):  # ✅ catch base + extension
-                if ext in ["", ".jpg", ".jpeg", ".png"]:
-                    return os.path.join(root, f)
-    return None
-
-
-
 @api_view(['POST'])
 @parser_classes([MultiPartParser, FormParser])
 @permission_classes([IsAuthenticated])
@@ -605,129 +834,34 @@ def bulk_create_employees_zip(request):
     """
     Bulk create employees from a ZIP file containing employees.csv + photos/.
     Photos must be named: <email>_passport(.jpg/.jpeg/.png) and <email>_signature(.jpg/.jpeg/.png)
-    or without extension.
+    or without extension. With dry_run=true, only validates: nothing is created.
     """
     if 'file' not in request.FILES:
         return Response({'error': 'ZIP file is required'}, status=400)
 
-    zip_file = request.FILES['file']
-    temp_dir = tempfile.mkdtemp()
-
-    with zipfile.ZipFile(zip_file, 'r') as z:
-        z.extractall(temp_dir)
-
-    # 🔹 Find employees.csv
-    csv_path = None
-    for root, dirs, files in os.walk(temp_dir):
-        if "employees.csv" in [f.lower() for f in files]:
-            # normalize case-insensitive
-            for f in files:
-                if f.lower() == "employees.csv":
-                    csv_path = os.path.join(root, f)
-                    break
-            break
-
-    if not csv_path:
-        return Response({'error': 'employees.csv not found in ZIP'}, status=400)
-
-    results = []
-    admin = request.user
-
-    with open(csv_path, newline='', encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f)
-        reader.fieldnames = [h.strip().lower() for h in reader.fieldnames if h]
-
-        for idx, row in enumerate(reader, start=1):
-            name = row.get('name')
-            email = row.get('email')
-            password = row.get('password')
-            confirm_password = row.get('confirm_password')
-            company_name = row.get('company_name')
-            employee_id = row.get('employee_id')
-            mobile_number = row.get('mobile_number')
-
-            # --- Validation ---
-            if not all([name, email, password, confirm_password]):
-                results.append({'row': idx, 'error': 'Missing required fields'})
-                continue
-            if password != confirm_password:
-                results.append({'row': idx, 'error': 'Passwords do not match'})
-                continue
-            if User.objects.filter(email=email).exists():
-                results.append({'row': idx, 'error': 'Email already exists'})
-                continue
-            try:
-                User.validate_password_strength(password)
-            except ValidationError as e:
-                results.append({'row': idx, 'error': str(e)})
-                continue
-
-            # --- Create User ---
-            user = User.objects.create_user(
-                username=name,
-                email=email,
-                password=password,
-                first_name=name,
-                state=admin.state,
-                role='employee',
-                is_active=True
-            )
-
-            # --- Find photos ---
-            passport_path = find_photo_anywhere(temp_dir, email, "passport")
-            signature_path = find_photo_anywhere(temp_dir, email, "signature")
-
-            passport_file = None
-            signature_file = None
-            warnings = []
-
-            if passport_path:
-                with open(passport_path, "rb") as pf:
-                    passport_file = SimpleUploadedFile(
-                        name=os.path.basename(passport_path),
-                        content=pf.read(),
-                        content_type="image/jpeg"
-                    )
-            else:
-                warnings.append("Passport photo missing")
-
-            if signature_path:
-                with open(signature_path, "rb") as sf:
-                    signature_file = SimpleUploadedFile(
-                        name=os.path.basename(signature_path),
-                        content=sf.read(),
-                        content_type="image/jpeg"
-                    )
-            else:
-                warnings.append("Signature photo missing")
-
-            # --- Create Employee profile ---
-            employee = Employee.objects.create(
-                user=user,
-                company_name=company_name,
-                employee_id=employee_id,
-                mobile_number=mobile_number,
-                passport_photo=passport_file,
-                signature_photo=signature_file,
-            )
-
-            results.append({
-                'row': idx,
-                'message': 'Employee created',
-                'email': email,
-                'user_id': user.id,
-                'employee_id': employee.employee_id,
-                'passport_photo_saved': bool(passport_file),
-                'signature_photo_saved': bool(signature_file),
-                'warnings': warnings,
-            })
+    try:
+        if _dry_run(request):
+            # 🔹 Validate only: nothing is created
+            results, summary = employee_import.import_employees(request.FILES['file'], request.user, dry_run=True)
+            return Response({'dry_run': True, 'results': results, 'summary': summary})
+        results = employee_import.import_employees(request.FILES['file'], request.user)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
 
     return Response({'results': results})
 
 
-
-
-
+@api_view(['POST'])
+@parser_classes([MultiPartParser, FormParser])
+@permission_classes([IsAuthenticated])
+def bulk_create_employees_zip_async(request):
+    """
+    Same as bulk_create_employees_zip, run by a background worker.
+    """
+    if 'file' not in request.FILES:
+        return Response({'error': 'ZIP file is required'}, status=400)
+    upload = runner.save_upload(request.FILES['file'])
+    return _queued(runner.enqueue('admin_panel.bulk_create_employees_zip', request.user, upload=upload))
 
 
 # --- 5. Employee Management ---
@@ -773,18 +907,17 @@ from django.conf import settings
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_employees(request):
-    employees = User.objects.filter(role='employee')
-    data = []
-    for e in employees:
-        profile = getattr(e, 'employee_profile', None)
+    employees = User.objects.filter(role='employee').select_related('employee_profile').order_by('id')
 
-        # Build full URLs for media files
-        def build_url(file_field):
-            if file_field and hasattr(file_field, 'url'):
-                return request.build_absolute_uri(file_field.url)
-            return None
+    # Build full URLs for media files
+    def build_url(file_field):
+        if file_field and hasattr(file_field, 'url'):
+            return request.build_absolute_uri(file_field.url)
+        return None
 
-        data.append({
+    def to_row(e):
+        profile = getattr(e, 'employee_profile', None)
+        return {
             'id': e.id,
             'name': e.first_name,
             'email': e.email,
@@ -798,8 +931,9 @@ def list_employees(request):
             'state': e.state,
             'is_active': e.is_active,
             'date_joined': e.date_joined,
-        })
-    return Response(data)
+        }
+
+    return stream_rows(request, employees, to_row)
 
 
 from django.shortcuts import get_object_or_404
@@ -840,6 +974,13 @@ def update_employee(request, id):
     employee = get_object_or_404(User, id=id, role='employee')
     profile, _ = Employee.objects.get_or_create(user=employee)
 
+    # 🔹 home_site: Global ID of the employee's base site ('' clears it)
+    home_site = None
+    if request.data.get('home_site'):
+        home_site = SiteData.objects.filter(global_id=request.data['home_site']).first()
+        if home_site is None:
+            return Response({'error': 'Invalid home_site Global ID'}, status=400)
+
     # Update user fields
     employee.first_name = request.data.get('name', employee.first_name)
     employee.email = request.data.get('email', employee.email)
@@ -853,6 +994,8 @@ def update_employee(request, id):
     profile.company_name = request.data.get('company_name', profile.company_name)
     profile.employee_id = request.data.get('employee_id', profile.employee_id)
     profile.mobile_number = request.data.get('mobile_number', profile.mobile_number)
+    if 'home_site' in request.data:
+        profile.home_site = home_site
 
     if 'passport_photo' in request.FILES:
         profile.passport_photo = request.FILES['passport_photo']
@@ -1138,19 +1281,20 @@ def change_password(request):
 # --- Site Data List ---
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_on(lambda request: [SiteData.objects.all()])
 def site_data_list(request):
     sites = SiteData.objects.all().order_by('cluster_name', 'site_name')
-    data = [
-        {
-            'global_id': s.global_id,
-            'cluster_name': s.cluster_name,
-            'site_name': s.site_name,
-            'latitude': s.latitude,
-            'longitude': s.longitude,
-        }
-        for s in sites
-    ]
-    return Response(data)
+    return stream_rows(request, sites, _site_row)
+
+
+def _site_row(s):
+    return {
+        'global_id': s.global_id,
+        'cluster_name': s.cluster_name,
+        'site_name': s.site_name,
+        'latitude': s.latitude,
+        'longitude': s.longitude,
+    }
 
 
 
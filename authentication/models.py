@@ -26,6 +26,14 @@ class User(AbstractUser):
     passport_photo = models.ImageField(upload_to='passport_photos/', blank=True, null=True)
     signature_photo = models.ImageField(upload_to='signature_photos/', blank=True, null=True)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # employee/admin lists and per-state counts: role=..., state=...
+            models.Index(fields=['role', 'state'], name='user_role_state_idx'),
+            # login, password reset and imports look users up by email
+            models.Index(fields=['email'], name='user_email_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         is_new = self._state.adding
 
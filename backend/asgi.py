@@ -5,6 +5,12 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
+
+The live dashboard stream (/panel/dashboard/stream/) is an async view that
+holds its connection open, so it should be served through this application
+by an ASGI server (e.g. `uvicorn backend.asgi:application`). Its change
+events are read from the database (admin_panel.events), so it sees writes
+made by any process, and can run next to WSGI processes and run_workers.
 """
 
 import os
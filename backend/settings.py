@@ -45,6 +45,7 @@ INSTALLED_APPS = [
     'superadmin',
     'sync',
     'forms',
+    'jobs',
 ]
 
 AUTH_USER_MODEL = 'authentication.User'
@@ -97,6 +98,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # 🔹 run_workers processes write concurrently: wait for the write lock
+        # rather than failing with "database is locked" (workers also begin
+        # their transactions IMMEDIATE, see jobs.runner.immediate_transactions)
+        'OPTIONS': {
+            'timeout': 20,
+        },
     }
 }
 
@@ -123,6 +130,60 @@ SESSION_SAVE_EVERY_REQUEST = False
 SESSION_COOKIE_AGE = 1209600  # 2 weeks
 # ----------------------------------------
 
+# ----------- CACHE SETTINGS -------------
+# File-based so every worker process shares entries and invalidations
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    }
+}
+# Dashboard responses are invalidated on Task/Report/User changes; the
+# timeout only bounds how long an entry a missed invalidation left can live
+DASHBOARD_CACHE_TIMEOUT = 60 * 60
+# Overdue figures also change as time passes, so SLA analytics expire
+SLA_CACHE_SECONDS = 300
+SLA_WINDOW_DAYS = 30  # default look-back of /panel/sla/
+# my-route keys include a fingerprint of the day's tasks, so this only bounds staleness of unused entries
+ROUTE_CACHE_SECONDS = 24 * 60 * 60
+# ----------------------------------------
+
+# ----------- PAGINATION -----------------
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 500
+STREAMING_CHUNK_SIZE = 2000  # rows per fetch for streamed JSON listings
+BULK_MAX_IDS = 5000          # ids accepted by one bulk task/report request
+# ----------------------------------------
+
+# ----------- DELTA SYNC -----------------
+SYNC_OVERLAP_SECONDS = 60   # changes re-sent from before the token, for late commits
+SYNC_TOMBSTONE_DAYS = 30    # older tokens get a full resync
+IDEMPOTENCY_KEY_HOURS = 24            # how long a stored response is replayed
+IDEMPOTENCY_WAIT_SECONDS = 10         # a duplicate waits this long for the first request
+IDEMPOTENCY_PROCESSING_SECONDS = 120  # unfinished keys older than this are freed
+# ----------------------------------------
+
+# ----------- LIVE DASHBOARD (SSE) -------
+SSE_HEARTBEAT_SECONDS = 15
+SSE_RETRY_MS = 5000
+SSE_REPLAY_BUFFER = 1000          # most events replayed on a Last-Event-ID reconnect
+SSE_POLL_SECONDS = 1.0            # how often a stream process reads new events
+SSE_POLL_OVERLAP_SECONDS = 10     # events re-read from before the last poll, for late commits
+SSE_EVENT_RETENTION_MINUTES = 60  # clients away longer resync
+# ----------------------------------------
+
+# ----------- BACKGROUND JOBS ------------
+JOB_WORKERS = 2             # run_workers pool size
+JOB_POLL_SECONDS = 1.0      # idle wait before checking the queue again
+JOB_HEARTBEAT_SECONDS = 30  # how often a running job's heartbeat is written
+JOB_STALE_SECONDS = 600     # running jobs without a heartbeat this long are requeued
+JOB_MAX_ATTEMPTS = 3
+# ----------------------------------------
+
+# ----------- RECURRING TASKS ------------
+RECURRENCE_WINDOW_DAYS = 31  # days ahead generate_recurring_tasks materializes
+# ----------------------------------------
+
 # ----------- MEDIA SETTINGS -------------
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
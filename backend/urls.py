@@ -10,6 +10,7 @@ urlpatterns = [
     path('superadmin/', include('superadmin.urls')),
     path('forms/', include('forms.urls')),
     path('employee/', include('employees.urls')),
+    path('jobs/', include('jobs.urls')),
     
     
 ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0013_sequence'),
+        ('employees', '0002_remove_employee_email_remove_employee_name_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='home_site',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='home_employees', to='admin_panel.sitedata'),
+        ),
+    ]
@@ -21,6 +21,14 @@ class Employee(models.Model):
         blank=True,
         null=True
     )  # L1 User ID reference
+    # 🔹 where the engineer starts from; auto-assignment measures distances from here
+    home_site = models.ForeignKey(
+        "admin_panel.SiteData",
+        on_delete=models.SET_NULL,
+        related_name="home_employees",
+        blank=True,
+        null=True
+    )
     is_active = models.BooleanField(default=True)
 
     def __str__(self):
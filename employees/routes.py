@@ -0,0 +1,159 @@
+"""
+Visiting order for an engineer's tasks of one day (my-route).
+
+Stops are the tasks' sites. The route is an open path that starts from the
+engineer's position (home site, else the site of their latest report; see
+admin_panel.auto_assign), built by nearest neighbour and then improved by
+2-opt until no segment reversal shortens it. Routes are cached under a
+fingerprint of the day's tasks and start position, so any change to the
+task set gives a new key.
+"""
+import hashlib
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from admin_panel import auto_assign
+from admin_panel.models import SiteData, Task
+
+CACHE_PREFIX = 'my_route'
+
+
+def cache_timeout():
+    return getattr(settings, 'ROUTE_CACHE_SECONDS', 24 * 60 * 60)
+
+
+def _length(distance, path, start):
+    legs = [distance[a, b] for a, b in zip(path, path[1:])]
+    return (distance[start, path[0]] if start is not None else 0.0) + sum(legs)
+
+
+def _nearest_neighbour(distance, stops, first):
+    path, left = [first], set(stops) - {first}
+    while left:
+        here = path[-1]
+        nearest = min(left, key=lambda s: (distance[here, s], s))
+        path.append(nearest)
+        left.remove(nearest)
+    return path
+
+
+def _two_opt(distance, path, start):
+    """
+    Reverse segments of `path` while that shortens it. With a fixed `start`
+    the first stop can change too; the route's end is free.
+    """
+    path = list(path)
+    n = len(path)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(n - 1):
+            before = path[i - 1] if i > 0 else start
+            for k in range(i + 1, n):
+                after = path[k + 1] if k + 1 < n else None
+                old = new = 0.0
+                if before is not None:
+                    old += distance[before, path[i]]
+                    new += distance[before, path[k]]
+                if after is not None:
+                    old += distance[path[k], after]
+                    new += distance[path[i], after]
+                if new < old - 1e-9:
+                    path[i:k + 1] = reversed(path[i:k + 1])
+                    improved = True
+    return path
+
+
+def order_stops(lat, lon, start=None):
+    """
+    Visiting order (indices into lat/lon) for an open route from `start`
+    ((lat, lon) or None), and the length in km of each leg.
+    """
+    n = len(lat)
+    if not n:
+        return [], []
+    points_lat, points_lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+    origin = None
+    if start is not None:
+        points_lat = np.append(points_lat, start[0])
+        points_lon = np.append(points_lon, start[1])
+        origin = n
+    distance = auto_assign.haversine_matrix(points_lat, points_lon, points_lat, points_lon)
+
+    stops = range(n)
+    if origin is not None:
+        path = _nearest_neighbour(distance, list(stops) + [origin], origin)[1:]
+    else:
+        # No known start: the best of the nearest-neighbour paths from each stop
+        path = min((_nearest_neighbour(distance, stops, s) for s in stops),
+                   key=lambda p: _length(distance, p, None))
+    path = _two_opt(distance, path, origin)
+
+    previous = [origin] + path[:-1]
+    legs = [float(distance[a, b]) if a is not None else 0.0 for a, b in zip(previous, path)]
+    return path, legs
+
+
+def _site_for(tasks):
+    missing = {t.global_id for t in tasks if t.site is None}
+    by_global_id = {s.global_id: s for s in SiteData.objects.filter(global_id__in=missing)} if missing else {}
+    return [t.site or by_global_id.get(t.global_id) for t in tasks]
+
+
+def _stop(task, site, lat, lon):
+    return {
+        'task_id': task.task_id,
+        'title': task.title,
+        'status': task.status,
+        'global_id': task.global_id,
+        'site_name': task.site_name or (site.site_name if site else ''),
+        'latitude': lat,
+        'longitude': lon,
+    }
+
+
+def my_route(user, date):
+    """
+    The user's tasks planned for `date`, in visiting order, with leg and
+    total distances (km). Tasks whose site has no coordinates are listed
+    separately under `unlocated`.
+    """
+    tasks = list(Task.objects.filter(assigned_to=user, planned_date=date).select_related('site').order_by('id'))
+    sites = _site_for(tasks)
+    lat, lon = auto_assign.site_coordinates([s or SiteData() for s in sites])
+
+    employee = auto_assign.with_positions(type(user).objects.filter(pk=user.pk)).first()
+    start_lat, start_lon = auto_assign.employee_coordinates([employee])
+    start = None if np.isnan(start_lat[0]) or np.isnan(start_lon[0]) else (start_lat[0], start_lon[0])
+
+    fingerprint = repr((
+        [(t.pk, t.task_id, t.status, t.updated_at.isoformat()) for t in tasks],
+        np.round(lat, 6).tolist(), np.round(lon, 6).tolist(), start,
+    ))
+    key = f'{CACHE_PREFIX}:{user.pk}:{date.isoformat()}:{hashlib.md5(fingerprint.encode()).hexdigest()}'
+    route = cache.get(key)
+    if route is not None:
+        return route
+
+    located = [i for i in range(len(tasks)) if not (np.isnan(lat[i]) or np.isnan(lon[i]))]
+    unlocated = sorted(set(range(len(tasks))) - set(located))
+    path, legs = order_stops(lat[located], lon[located], start)
+    stops = []
+    for position, (index, leg) in enumerate(zip(path, legs), start=1):
+        i = located[index]
+        stops.append({
+            'order': position,
+            **_stop(tasks[i], sites[i], float(lat[i]), float(lon[i])),
+            'leg_km': round(leg, 3),
+        })
+    route = {
+        'date': date.isoformat(),
+        'start': {'latitude': float(start[0]), 'longitude': float(start[1])} if start else None,
+        'stops': stops,
+        'total_km': round(sum(legs), 3),
+        'unlocated': [_stop(tasks[i], sites[i], None, None) for i in unlocated],
+    }
+    cache.set(key, route, cache_timeout())
+    return route
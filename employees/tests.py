@@ -1,14 +1,30 @@
+import datetime
+import os
+import tempfile
+from unittest import mock
+
 from rest_framework.test import APITestCase, APIClient
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from tasks.models import Task
-from reports.models import Report
-from employees.models import SiteData
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from admin_panel.models import Task, TaskType, Cluster, SiteData
+from reports.models import Report, ReportFileUpload
+from sync import tombstones
 
 User = get_user_model()
 
+# Tests must not touch the shared FileBasedCache in BASE_DIR/cache
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
 class EmployeeAPITest(APITestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.employee = User.objects.create_user(
             username="Employee",
@@ -16,7 +32,6 @@ class EmployeeAPITest(APITestCase):
             email="employee@example.com",
             role="employee",
             state="Andhra Pradesh",
-            user_type="employee"
         )
         self.client.force_authenticate(user=self.employee)
         self.site = SiteData.objects.create(
@@ -26,29 +41,199 @@ class EmployeeAPITest(APITestCase):
             latitude=17.7,
             longitude=83.3
         )
+        self.task_type = TaskType.objects.create(name="DG PM", color_code="#888888")
+        self.cluster = Cluster.objects.create(name=self.site.cluster_name)
         self.task = Task.objects.create(
-            task_id=100001,
             global_id=self.site.global_id,
+            title="DG PM",
+            type=self.task_type,
+            cluster=self.cluster,
+            site=self.site,
             cluster_name=self.site.cluster_name,
             site_name=self.site.site_name,
-            latitude=self.site.latitude,
-            longitude=self.site.longitude,
             assigned_to=self.employee,
-            task_type="DG PM",
-            state=self.employee.state,
             assigned_date=timezone.now()
         )
-        self.client = APIClient()
-        self.client.login(username="Employee", password="sanjay123")
 
     def test_dashboard(self):
         response = self.client.get('/employee/dashboard/')
         self.assertEqual(response.status_code, 200)
 
+    def test_dashboard_is_per_user(self):
+        today = timezone.localdate()
+        other = User.objects.create_user(
+            username="Other", password="sanjay123", email="other@example.com",
+            role="employee", state="Andhra Pradesh",
+        )
+        for assignee, planned_date, status in [
+            (self.employee, today, 'pending'),
+            (self.employee, today - timezone.timedelta(days=2), 'in_progress'),
+            (self.employee, today - timezone.timedelta(days=2), 'completed'),
+            (other, today, 'pending'),
+        ]:
+            Task.objects.create(global_id="TEST001", title="DG PM", type=self.task_type,
+                                cluster=self.cluster, assigned_to=assignee,
+                                planned_date=planned_date, status=status)
+
+        response = self.client.get('/employee/dashboard/')
+        self.assertEqual(response.data, {
+            'total_tasks': 4,
+            'completed_tasks': 1,
+            'pending_tasks': 2,
+            'in_progress_tasks': 1,
+            'overdue_tasks': 1,
+            'due_today_tasks': 1,
+        })
+
+        # Served from the cache until a change to one of the user's own tasks commits
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.filter(assigned_to=other).first().save()
+        with self.assertNumQueries(0):
+            self.client.get('/employee/dashboard/')
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.task.status = 'completed'
+            self.task.save()
+        self.assertEqual(self.client.get('/employee/dashboard/').data['completed_tasks'], 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.client.get('/employee/dashboard/').data['completed_tasks'], 2)
+
+    def test_dashboard_lapses_when_a_deadline_passes(self):
+        now = timezone.now()
+        self.task.deadline = now + datetime.timedelta(hours=1)
+        self.task.save()
+        self.assertEqual(self.client.get('/employee/dashboard/').data['overdue_tasks'], 0)
+        with self.assertNumQueries(0):
+            self.client.get('/employee/dashboard/')
+        later = now + datetime.timedelta(hours=1, minutes=1)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            self.assertEqual(self.client.get('/employee/dashboard/').data['overdue_tasks'], 1)
+
     def test_my_tasks(self):
         response = self.client.get('/employee/my-tasks/')
         self.assertEqual(response.status_code, 200)
-        self.assertTrue(len(response.data) >= 1)
+        self.assertTrue(len(response.data['results']) >= 1)
+        self.assertIsNone(response.data['next'])
+
+    def my_tasks_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/employee/my-tasks/', {'page_size': 100})
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_my_tasks_query_count_constant(self):
+        Report.objects.create(task=self.task, submitted_by=self.employee, status='approved')
+        response, baseline = self.my_tasks_queries()
+        self.assertEqual(response.data['results'][0]['status'], 'approved')
+
+        for _ in range(20):
+            task = Task.objects.create(global_id="TEST001", title="DG PM", type=self.task_type,
+                                       cluster=self.cluster, assigned_to=self.employee,
+                                       assigned_by=self.employee)
+            Report.objects.create(task=task, submitted_by=self.employee)
+        response, grown = self.my_tasks_queries()
+
+        self.assertEqual(len(response.data['results']), 21)
+        # The watermark for conditional GET, then the page itself
+        self.assertEqual(baseline, 2)
+        self.assertEqual(grown, baseline)
+
+    def test_my_tasks_conditional_get(self):
+        etag = self.client.get('/employee/my-tasks/')['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get('/employee/my-tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.task.status = 'in_progress'
+        self.task.save()
+        response = self.client.get('/employee/my-tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_my_tasks_etag_follows_related_rows(self):
+        admin = User.objects.create_user(username="Admin", password="sanjay123", email="admin@example.com",
+                                         role="admin", state="Andhra Pradesh", first_name="Ravi")
+        self.task.assigned_by = admin
+        self.task.save()
+
+        def etag_after(change):
+            etag = self.client.get('/employee/my-tasks/')['ETag']
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            response = self.client.get('/employee/my-tasks/', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            return response.data['results'][0]
+
+        self.task_type.name = "DG Service"
+        self.assertEqual(etag_after(self.task_type.save)['task_type'], "DG Service")
+        self.cluster.name = "Vizag North"
+        self.assertEqual(etag_after(self.cluster.save)['cluster_name'], "Vizag North")
+        admin.first_name = "Ravi Kumar"
+        self.assertEqual(etag_after(admin.save)['assigned_by'], "Ravi Kumar")
+
+    def test_my_task_changes(self):
+        res = self.client.get('/employee/my-tasks/changes/')
+        self.assertTrue(res.data['full'])
+        self.assertEqual([t['task_id'] for t in res.data['tasks']], [self.task.task_id])
+
+        # Age the synced rows past the overlap window of a token issued since
+        an_hour_ago = timezone.now() - timezone.timedelta(hours=1)
+        Task.objects.update(updated_at=an_hour_ago)
+        token = tombstones.make_token(an_hour_ago + timezone.timedelta(minutes=30))
+
+        other = User.objects.create_user(
+            username="Other", password="sanjay123", email="other@example.com",
+            role="employee", state="Andhra Pradesh",
+        )
+        moved = Task.objects.create(global_id="TEST001", title="DG PM", type=self.task_type,
+                                    cluster=self.cluster, assigned_to=self.employee)
+        moved.assigned_to = other
+        moved.save()
+        report = Report.objects.create(task=self.task, submitted_by=self.employee, status='rejected')
+
+        res = self.client.get('/employee/my-tasks/changes/', {'since': token})
+        self.assertFalse(res.data['full'])
+        self.assertEqual([t['task_id'] for t in res.data['tasks']], [self.task.task_id])
+        self.assertEqual(res.data['tasks'][0]['status'], 'rejected')
+        self.assertEqual(res.data['deleted_tasks'], [moved.task_id])
+
+        report_id = report.id
+        report.delete()
+        res = self.client.get('/employee/my-tasks/changes/', {'since': token})
+        self.assertEqual(res.data['deleted_reports'], [report_id])
+        self.assertEqual(res.data['tasks'][0]['status'], 'pending')
+
+        self.assertEqual(self.client.get('/employee/my-tasks/changes/', {'since': 'junk'}).status_code, 400)
+
+    def test_my_route(self):
+        from employees.models import Employee
+        day = datetime.date(2025, 7, 1)
+        Employee.objects.create(user=self.employee, home_site=self.site)
+        # Sites due north of the home site, created out of order
+        for n in (3, 1, 4, 2):
+            site = SiteData.objects.create(global_id=f"N{n}", cluster_name="Vizag", site_name=f"North {n}",
+                                           latitude=17.7 + n / 10, longitude=83.3)
+            Task.objects.create(global_id=site.global_id, title="DG PM", type=self.task_type, cluster=self.cluster,
+                                site=site, assigned_to=self.employee, planned_date=day)
+        Task.objects.create(global_id="NOWHERE", title="DG PM", type=self.task_type, cluster=self.cluster,
+                            assigned_to=self.employee, planned_date=day)
+
+        res = self.client.get('/employee/my-route/', {'date': '2025-07-01'})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([s['global_id'] for s in res.data['stops']], ["N1", "N2", "N3", "N4"])
+        self.assertEqual(res.data['start'], {'latitude': 17.7, 'longitude': 83.3})
+        self.assertAlmostEqual(res.data['stops'][0]['leg_km'], 11.12, places=1)
+        self.assertAlmostEqual(res.data['total_km'], sum(s['leg_km'] for s in res.data['stops']), places=2)
+        self.assertEqual([t['global_id'] for t in res.data['unlocated']], ["NOWHERE"])
+
+        # A new task for the day changes the fingerprint, so the route is rebuilt
+        site = SiteData.objects.create(global_id="N0", cluster_name="Vizag", site_name="North 0",
+                                       latitude=17.75, longitude=83.3)
+        Task.objects.create(global_id="N0", title="DG PM", type=self.task_type, cluster=self.cluster,
+                            site=site, assigned_to=self.employee, planned_date=day)
+        res = self.client.get('/employee/my-route/', {'date': '2025-07-01'})
+        self.assertEqual([s['global_id'] for s in res.data['stops']], ["N0", "N1", "N2", "N3", "N4"])
+        self.assertEqual(self.client.get('/employee/my-route/', {'date': '2025-02-30'}).status_code, 400)
 
     def test_submit_report(self):
         data = {
@@ -61,3 +246,30 @@ class EmployeeAPITest(APITestCase):
         response = self.client.post('/employee/submit-report/', data, format='json')
         self.assertEqual(response.status_code, 200)
         self.assertIn("report_id", response.data)
+
+    def test_idempotency_key_replays(self):
+        data = {"task_id": self.task.id, "form_data": {"DG Status": "Running"}}
+        first = self.client.post('/employee/submit-report/', data, format='json', HTTP_IDEMPOTENCY_KEY="k1")
+        again = self.client.post('/employee/submit-report/', data, format='json', HTTP_IDEMPOTENCY_KEY="k1")
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.data, first.data)
+        self.assertEqual(again['Idempotent-Replayed'], 'true')
+        self.assertEqual(Report.objects.filter(task=self.task).count(), 1)
+
+        changed = {**data, "form_data": {"DG Status": "Stopped"}}
+        res = self.client.post('/employee/submit-report/', changed, format='json', HTTP_IDEMPOTENCY_KEY="k1")
+        self.assertEqual(res.status_code, 422)
+
+        # Errors are not kept: the corrected retry runs
+        res = self.client.post('/employee/upload-report-file/', {'report_id': first.data['report_id']},
+                               HTTP_IDEMPOTENCY_KEY="k2")
+        self.assertEqual(res.status_code, 400)
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            for _ in range(2):
+                upload = SimpleUploadedFile("photo.jpg", b"jpeg-bytes", content_type="image/jpeg")
+                res = self.client.post('/employee/upload-report-file/', {
+                    'report_id': first.data['report_id'], 'field_label': "Photo", 'file': upload,
+                }, HTTP_IDEMPOTENCY_KEY="k2")
+                self.assertEqual(res.status_code, 200)
+            self.assertEqual(ReportFileUpload.objects.filter(report_id=first.data['report_id']).count(), 1)
+            self.assertEqual(len(os.listdir(os.path.join(media, 'report_uploads'))), 1)
@@ -1,4 +1,4 @@
-from admin_panel.models import Task
+from admin_panel.models import Cluster, Task, TaskType
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -19,6 +19,17 @@ from rest_framework.response import Response
 from admin_panel.models import Task
 from reports.models import Report, ReportFileUpload
 from admin_panel.models import SiteData   # 👈 make sure this matches your actual app name
+from admin_panel import dashboard_cache
+from admin_panel.dashboard_cache import cached_user_dashboard
+from admin_panel.conditional import conditional_on
+from admin_panel.pagination import InvalidCursor, KeysetPaginator
+from sync import tombstones
+from sync.idempotency import idempotent
+from . import routes
+from django.core import signing
+from django.db.models import Count, Min, OuterRef, Q, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 
 
 def haversine(lat1, lon1, lat2, lon2):
@@ -36,6 +47,7 @@ def haversine(lat1, lon1, lat2, lon2):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def submit_report(request):
     user = request.user
 
@@ -131,38 +143,166 @@ def submit_report(request):
 
 
 
+MY_TASKS_PAGINATOR = KeysetPaginator(('-assigned_date', '-id'))
+
+
+def _my_tasks_sources(request):
+    return [
+        Task.objects.filter(assigned_to=request.user),
+        Report.objects.filter(submitted_by=request.user),
+        TaskType.objects.filter(tasks__assigned_to=request.user),
+        Cluster.objects.filter(tasks__assigned_to=request.user),
+    ]
+
+
+def _my_reports_sources(request):
+    return [
+        Report.objects.filter(submitted_by=request.user),
+        Task.objects.filter(reports__submitted_by=request.user),
+        TaskType.objects.filter(tasks__reports__submitted_by=request.user),
+        Cluster.objects.filter(tasks__reports__submitted_by=request.user),
+    ]
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+# Rows show the names of the user and of whoever assigned each task
+@conditional_on(_my_tasks_sources, generations=(dashboard_cache.USERS_GENERATION,))
 def get_my_tasks(request):
+    """
+    The user's tasks, newest first, one page at a time: pass the returned
+    `next` back as ?cursor= for the following page (?page_size= to override).
+    """
     user = request.user
-    tasks = Task.objects.filter(assigned_to=user).order_by('-assigned_date')
+    tasks = _with_report_status(Task.objects.filter(assigned_to=user), user)
+    try:
+        page, next_cursor = MY_TASKS_PAGINATOR.paginate(tasks, request)
+    except InvalidCursor as e:
+        return Response({'error': str(e)}, status=400)
 
-    task_list = []
-    for task in tasks:
-        report = task.reports.filter(submitted_by=user).order_by('-submitted_at').first()
-        status = report.status if report else 'pending'
+    task_list = [_task_row(task, task.report_status or 'pending', user) for task in page]
+    return Response({'results': task_list, 'next': next_cursor})
 
-        task_list.append({
-            'task_id': task.task_id,
-            'task_type': task.type.name if task.type else "",
-            'global_id': task.global_id,
-            'site_name': task.site_name if hasattr(task, 'site_name') else "",
-            'cluster_name': task.cluster.name if task.cluster else "",
-            'assigned_date': task.assigned_date,
-            'planned_date': task.planned_date,       # 🔹 added
-            'deadline': task.deadline,               # 🔹 added
-            'status': status,
-            'employee_name': user.first_name,
-            'employee_email': user.email,
-            'assigned_by': task.assigned_by.first_name if task.assigned_by else '',
-            'assigned_by_email': task.assigned_by.email if task.assigned_by else '',
-        })
-    return Response(task_list)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def my_route(request):
+    """
+    The user's tasks planned for ?date= (YYYY-MM-DD, default today) in
+    visiting order, with per-leg and total distance in km.
+    """
+    value = request.query_params.get('date')
+    try:
+        date = parse_date(value) if value else timezone.localdate()
+    except ValueError:
+        date = None
+    if date is None:
+        return Response({'error': 'date must be YYYY-MM-DD'}, status=400)
+    return Response(routes.my_route(request.user, date))
+
+
+def _task_row(task, status, user):
+    return {
+        'task_id': task.task_id,
+        'task_type': task.type.name if task.type else "",
+        'global_id': task.global_id,
+        'site_name': task.site_name if hasattr(task, 'site_name') else "",
+        'cluster_name': task.cluster.name if task.cluster else "",
+        'assigned_date': task.assigned_date,
+        'planned_date': task.planned_date,       # 🔹 added
+        'deadline': task.deadline,               # 🔹 added
+        'status': status,
+        'employee_name': user.first_name,
+        'employee_email': user.email,
+        'assigned_by': task.assigned_by.first_name if task.assigned_by else '',
+        'assigned_by_email': task.assigned_by.email if task.assigned_by else '',
+    }
+
+
+def _report_row(report):
+    return {
+        'report_id': report.id,
+        'task_id': report.task.task_id,
+        'status': report.status,
+        'submitted_at': report.submitted_at,
+        'approved_at': report.approved_at,
+        'rejection_reason': report.rejection_reason if report.status == 'rejected' else None,
+    }
+
+
+def _with_report_status(tasks, user):
+    """
+    Annotate `report_status`: the status of the user's latest report on each task.
+    """
+    latest = (
+        Report.objects.filter(task=OuterRef('pk'), submitted_by=user)
+        .order_by('-submitted_at')
+        .values('status')[:1]
+    )
+    return tasks.select_related('type', 'cluster', 'assigned_by').annotate(report_status=Subquery(latest))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def my_task_changes(request):
+    """
+    Tasks and reports changed since a sync token, for incremental refresh.
+    GET /employee/my-tasks/changes/?since=<token>
+    Without a token (or with one older than the tombstone retention) the full
+    list is returned with "full": true. Clients apply deleted_* first, then
+    upsert tasks/reports by id, and keep `token` for the next call.
+    """
+    user = request.user
+    now = timezone.now()
+
+    since = None
+    token = request.GET.get('since')
+    if token:
+        try:
+            since = tombstones.read_token(token)
+        except signing.BadSignature:
+            return Response({'error': 'Invalid sync token'}, status=400)
+    full = since is None or since < now - tombstones.retention()
+
+    tasks = Task.objects.filter(assigned_to=user)
+    reports = Report.objects.filter(submitted_by=user).select_related('task')
+    deleted_tasks, deleted_reports = [], []
+
+    if not full:
+        window = since - tombstones.overlap()
+        gone_reports = list(tombstones.since(user, 'report', window).values_list('object_id', 'data'))
+        deleted_reports = [int(object_id) for object_id, _ in gone_reports]
+        # A task's status follows its latest report, so report changes resend the task
+        tasks = tasks.filter(
+            Q(updated_at__gt=window)
+            | Q(reports__submitted_by=user, reports__updated_at__gt=window)
+            | Q(pk__in=[data.get('task') for _, data in gone_reports])
+        ).distinct()
+        reports = reports.filter(updated_at__gt=window)
+        deleted_tasks = list(
+            tombstones.since(user, 'task', window).values_list('object_id', flat=True).distinct()
+        )
+
+    task_rows = [_task_row(t, t.report_status or 'pending', user) for t in _with_report_status(tasks, user)]
+    report_rows = [_report_row(r) for r in reports.order_by('-submitted_at')]
+
+    # Something can be deleted and re-added within the window; the upsert wins
+    current_tasks = {row['task_id'] for row in task_rows}
+    current_reports = {row['report_id'] for row in report_rows}
+    return Response({
+        'full': full,
+        'tasks': task_rows,
+        'reports': report_rows,
+        'deleted_tasks': [t for t in deleted_tasks if t not in current_tasks],
+        'deleted_reports': [r for r in deleted_reports if r not in current_reports],
+        'token': tombstones.make_token(now),
+    })
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 @parser_classes([MultiPartParser])
+@idempotent
 def upload_report_file(request):
     user = request.user
     report_id = request.data.get('report_id')
@@ -188,6 +328,7 @@ def upload_report_file(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_on(_my_reports_sources)
 def my_reports(request):
     user = request.user
     reports = Report.objects.filter(submitted_by=user).select_related('task').order_by('-submitted_at')
@@ -301,18 +442,42 @@ def change_password(request):
     return Response({'message': 'Password changed successfully'})
 
 
+def _next_deadline(request):
+    # Open tasks become overdue when their deadline passes, not only at midnight
+    return (
+        Task.objects.filter(assigned_to=request.user, deadline__gt=timezone.now())
+        .exclude(status='completed')
+        .aggregate(next=Min('deadline'))['next']
+    )
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_user_dashboard('employee_dashboard', expires=_next_deadline)
 def dashboard_stats(request):
-    total = Task.objects.count()
-    completed = Task.objects.filter(status='completed').count()
-    pending = Task.objects.filter(status='pending').count()
-    in_progress = Task.objects.filter(status='in_progress').count()
+    """
+    The caller's own task totals, in one aggregate query over the
+    (assigned_to, status, planned_date) index.
+    """
+    today = timezone.localdate()
+    still_open = ~Q(status='completed')
+    totals = Task.objects.filter(assigned_to=request.user).aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(status='completed')),
+        pending=Count('id', filter=Q(status='pending')),
+        in_progress=Count('id', filter=Q(status='in_progress')),
+        overdue=Count('id', filter=still_open & (
+            Q(planned_date__lt=today) | Q(deadline__lt=timezone.now())
+        )),
+        due_today=Count('id', filter=still_open & Q(planned_date=today)),
+    )
 
     data = {
-        'total_tasks': total,
-        'completed_tasks': completed,
-        'pending_tasks': pending,
-        'in_progress_tasks': in_progress,
+        'total_tasks': totals['total'],
+        'completed_tasks': totals['completed'],
+        'pending_tasks': totals['pending'],
+        'in_progress_tasks': totals['in_progress'],
+        'overdue_tasks': totals['overdue'],
+        'due_today_tasks': totals['due_today'],
     }
     return Response(data)
@@ -3,6 +3,7 @@ from rest_framework.decorators import api_view, permission_classes, parser_class
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser
+from admin_panel.conditional import conditional_on
 from .models import FormTemplate
 
 @api_view(['POST'])
@@ -40,6 +41,9 @@ def upload_form_template(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_on(lambda request: [
+    FormTemplate.objects.filter(task_group=request.GET.get('task_group', '').strip().lower())
+])
 def get_form_template(request):
     """
     Get form template by task_group (dg, ac, site_visit).
@@ -0,0 +1,64 @@
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from jobs import runner
+
+
+def _worker_main(index, poll, once, stop):
+    # Ctrl-C reaches the whole process group; let the parent decide
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    runner.work(runner.worker_name(index), poll=poll, once=once, should_stop=stop.is_set)
+
+
+class Command(BaseCommand):
+    help = (
+        'Run background jobs (imports, exports) with a pool of worker processes. '
+        'SIGINT/SIGTERM let running jobs finish before exiting.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'JOB_WORKERS', 2),
+                            help='Number of worker processes (1 runs in this process)')
+        parser.add_argument('--poll', type=float, default=getattr(settings, 'JOB_POLL_SECONDS', 1.0),
+                            help='Seconds to wait before checking an empty queue again')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when the queue is empty instead of waiting for more jobs')
+
+    def handle(self, *args, **options):
+        workers, poll, once = options['workers'], options['poll'], options['once']
+        if workers < 1:
+            raise CommandError('--workers must be at least 1')
+
+        requeued, failed = runner.requeue_stale()
+        if requeued or failed:
+            self.stdout.write(f'{requeued} stale job(s) requeued, {failed} failed.')
+
+        if workers == 1:
+            processed = runner.work(runner.worker_name(), poll=poll, once=once)
+            self.stdout.write(self.style.SUCCESS(f'{processed} job(s) run.'))
+            return
+
+        stop = multiprocessing.Event()
+        # Children must open their own database connections
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=_worker_main, args=(i, poll, once, stop), daemon=False)
+            for i in range(workers)
+        ]
+        for p in processes:
+            p.start()
+
+        def shutdown(*args):
+            self.stdout.write('Stopping after the current jobs...')
+            stop.set()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+        for p in processes:
+            p.join()
+        self.stdout.write(self.style.SUCCESS(f'{workers} worker(s) stopped.'))
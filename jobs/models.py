@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.db import models, router, transaction
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    A unit of background work, run by `manage.py run_workers`.
+    `kind` names a handler registered with jobs.runner.handler.
+    """
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    )
+
+    kind = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='jobs'
+    )
+    worker = models.CharField(max_length=100, blank=True, default='')
+    attempts = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # workers claim the oldest queued job; stale running jobs are requeued
+            models.Index(fields=['status', 'id'], name='job_status_idx'),
+            models.Index(fields=['created_by', 'created_at'], name='job_creator_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
+
+    @property
+    def percent(self):
+        if self.status == 'succeeded':
+            return 100
+        if not self.total:
+            return 0
+        return min(100, self.progress * 100 // self.total)
+
+    def set_progress(self, done, total=None):
+        """
+        Record progress. Outside a transaction it is written straight away
+        (with the heartbeat); inside one, a write would only show at commit
+        and hold the job row locked until then, so it is left to the
+        runner's heartbeat thread to publish.
+        """
+        self.progress = done
+        if total is not None:
+            self.total = total
+        if not transaction.get_connection(router.db_for_write(Job)).in_atomic_block:
+            self.beat()
+
+    def beat(self):
+        """
+        Write the heartbeat and current progress, as long as this worker still
+        owns the job. Returns False once the job was requeued or failed.
+        """
+        self.heartbeat_at = timezone.now()
+        return bool(Job.objects.filter(pk=self.pk, worker=self.worker, status='running').update(
+            progress=self.progress, total=self.total, heartbeat_at=self.heartbeat_at
+        ))
@@ -0,0 +1,245 @@
+"""
+Queueing, claiming and running background jobs.
+
+Handlers are registered per job kind, normally in an app's background.py
+(autodiscovered by JobsConfig.ready):
+
+    @handler('admin_panel.import_site_data')
+    def import_site_data(job, upload):
+        ...
+        return {'message': ...}    # stored as job.result
+
+A handler reports progress with job.set_progress(done, total) and fails the
+job by raising JobFailed (or any other exception). While it runs, a
+heartbeat thread writes the job's heartbeat and latest progress every
+JOB_HEARTBEAT_SECONDS on its own connection, so a handler that spends a long
+time in one call or one transaction is not requeued as dead. Uploaded files are kept in
+default_storage until the job has run.
+
+Workers claim the oldest queued job under a row lock: SELECT ... FOR UPDATE
+SKIP LOCKED where the database has it, otherwise (SQLite) a single
+conditional UPDATE. Two workers never run the same job; a worker whose job
+was requeued meanwhile cannot overwrite it either, as every write is
+conditional on the job still running on that worker. Worker transactions
+on SQLite begin IMMEDIATE (see immediate_transactions).
+"""
+import contextlib
+import datetime
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import DatabaseError, close_old_connections, connections, router, transaction
+from django.db.models import F, Subquery
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+class JobFailed(Exception):
+    def __init__(self, message, result=None):
+        super().__init__(message)
+        self.result = result
+
+
+def handler(kind):
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, user=None, **payload):
+    if kind not in HANDLERS:
+        raise KeyError(f'No handler registered for job kind {kind!r}')
+    return Job.objects.create(kind=kind, payload=payload, created_by=user)
+
+
+def save_upload(file):
+    """
+    Store an uploaded file for a job; returns the storage name to pass in the payload.
+    """
+    return default_storage.save(f'jobs/{uuid.uuid4().hex}-{os.path.basename(file.name)}', file)
+
+
+@contextlib.contextmanager
+def open_upload(name):
+    """
+    Open a file stored by save_upload, and delete it once the job is done with it.
+    """
+    try:
+        with default_storage.open(name, 'rb') as f:
+            yield f
+    finally:
+        default_storage.delete(name)
+
+
+def worker_name(index=0):
+    return f'{socket.gethostname()}:{os.getpid()}:{index}'
+
+
+def stale_after():
+    return datetime.timedelta(seconds=getattr(settings, 'JOB_STALE_SECONDS', 600))
+
+
+def heartbeat_seconds():
+    return getattr(settings, 'JOB_HEARTBEAT_SECONDS', 30)
+
+
+def max_attempts():
+    return getattr(settings, 'JOB_MAX_ATTEMPTS', 3)
+
+
+def requeue_stale():
+    """
+    Put back running jobs whose worker stopped sending heartbeats (it died
+    mid-job), or fail them once they have used up their attempts.
+    """
+    stale = Job.objects.filter(status='running', heartbeat_at__lt=timezone.now() - stale_after())
+    failed = stale.filter(attempts__gte=max_attempts()).update(
+        status='failed', error='Worker stopped responding', finished_at=timezone.now()
+    )
+    requeued = stale.update(status='queued', worker='')
+    return requeued, failed
+
+
+def claim(worker):
+    """
+    Mark the oldest queued job as running on `worker` and return it, or None.
+    """
+    connection = connections[router.db_for_write(Job)]
+    while True:
+        now = timezone.now()
+        running = dict(status='running', worker=worker, started_at=now, heartbeat_at=now,
+                       attempts=F('attempts') + 1)
+        if connection.features.has_select_for_update_skip_locked:
+            with transaction.atomic(using=connection.alias):
+                job = (
+                    Job.objects.select_for_update(skip_locked=True)
+                    .filter(status='queued').order_by('id').first()
+                )
+                if job is None:
+                    return None
+                Job.objects.filter(pk=job.pk).update(**running)
+        else:
+            # One UPDATE statement: SQLite takes its write lock up front
+            # instead of failing to upgrade a read lock mid-transaction
+            oldest = Job.objects.filter(status='queued').order_by('id').values('pk')[:1]
+            if not Job.objects.filter(pk__in=Subquery(oldest), status='queued').update(**running):
+                if not Job.objects.filter(status='queued').exists():
+                    return None
+                continue  # Taken by another worker; try the next one
+            job = Job.objects.filter(status='running', worker=worker).order_by('-started_at', '-id').first()
+        job.refresh_from_db()
+        return job
+
+
+class Heartbeat(threading.Thread):
+    """
+    Calls job.beat() every JOB_HEARTBEAT_SECONDS until stopped. Runs on its
+    own database connection, so its writes commit even while the handler is
+    inside a transaction. Stops early if the job was taken from this worker.
+    """
+    def __init__(self, job):
+        super().__init__(name=f'job-{job.pk}-heartbeat', daemon=True)
+        self.job = job
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(heartbeat_seconds()):
+                try:
+                    if not self.job.beat():
+                        logger.warning('Job %s is no longer running on %s', self.job.pk, self.job.worker)
+                        return
+                except DatabaseError:
+                    logger.warning('Heartbeat for job %s failed', self.job.pk, exc_info=True)
+        finally:
+            connections.close_all()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def _finish(job, status, result=None, error=''):
+    job.status, job.result, job.error, job.finished_at = status, result, error, timezone.now()
+    finished = Job.objects.filter(pk=job.pk, worker=job.worker, status='running').update(
+        status=status, result=result, error=error, finished_at=job.finished_at,
+        progress=job.progress, total=job.total,
+    )
+    if not finished:
+        # requeue_stale gave the job up while this worker was still on it
+        logger.warning('Job %s was taken from %s before it finished; %s result dropped',
+                       job.pk, job.worker, status)
+    return bool(finished)
+
+
+def run(job):
+    func = HANDLERS.get(job.kind)
+    try:
+        if func is None:
+            raise JobFailed(f'No handler registered for job kind {job.kind!r}')
+        heartbeat = Heartbeat(job)
+        heartbeat.start()
+        try:
+            result = func(job, **job.payload)
+        finally:
+            heartbeat.stop()
+    except JobFailed as e:
+        _finish(job, 'failed', e.result, str(e))
+    except Exception as e:
+        logger.exception('Job %s (%s) failed', job.pk, job.kind)
+        _finish(job, 'failed', error=f'{type(e).__name__}: {e}')
+    else:
+        _finish(job, 'succeeded', result)
+    return job
+
+
+@contextlib.contextmanager
+def immediate_transactions():
+    """
+    Start this thread's SQLite transactions with BEGIN IMMEDIATE. Handlers
+    read and then write inside one transaction, and under a concurrent writer
+    SQLite fails such a transaction at once ("database is locked") instead of
+    waiting out the busy timeout; taking the write lock up front makes it wait.
+    Other databases, and other threads and processes (requests), are unaffected.
+    """
+    sqlite = [c for c in connections.all() if c.vendor == 'sqlite' and c.transaction_mode is None]
+    for connection in sqlite:
+        connection.transaction_mode = 'IMMEDIATE'
+    try:
+        yield
+    finally:
+        for connection in sqlite:
+            connection.transaction_mode = None
+
+
+def work(worker, poll=1.0, once=False, should_stop=lambda: False):
+    """
+    Claim and run jobs until `should_stop()`, or until the queue is empty
+    when `once`. Returns the number of jobs run.
+    """
+    processed = 0
+    with immediate_transactions():
+        while not should_stop():
+            close_old_connections()
+            job = claim(worker)
+            if job is None:
+                if once:
+                    break
+                requeue_stale()
+                time.sleep(poll)
+                continue
+            run(job)
+            processed += 1
+    return processed
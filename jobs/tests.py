@@ -0,0 +1,112 @@
+import datetime
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+
+from admin_panel.models import Task, SiteData
+from . import runner
+from .models import Job
+
+User = get_user_model()
+
+
+class JobTests(APITestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.admin = User.objects.create_user(
+            username="admin", email="admin@example.com", password="admin123",
+            role="admin", state="Andhra Pradesh"
+        )
+        User.objects.create_user(
+            username="emp1", email="emp1@example.com", password="emp123",
+            role="employee", state="Andhra Pradesh"
+        )
+        SiteData.objects.create(global_id="G1", cluster_name="Vizag", site_name="Site 1")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def upload(self, url, body, name="plan.csv"):
+        return self.client.post(url, {'file': SimpleUploadedFile(name, body.encode())}, format='multipart')
+
+    def test_async_csv_import_runs_in_worker(self):
+        res = self.upload('/panel/bulk-assign-csv/async/',
+                          "employee_email,task_name,task_type,global_id,planned_date\n"
+                          "emp1@example.com,DG PM,DG PM,G1,2025-07-01\n"
+                          "emp1@example.com,DG PM,DG PM,NOPE,2025-07-01\n")
+        self.assertEqual(res.status_code, 202)
+        job_url = res.data['status_url']
+        self.assertEqual(self.client.get(job_url).data['status'], 'queued')
+        self.assertFalse(Task.objects.exists())
+
+        call_command('run_workers', workers=1, once=True, stdout=io.StringIO())
+
+        job = self.client.get(job_url).data
+        self.assertEqual((job['status'], job['percent'], job['progress'], job['total']), ('succeeded', 100, 2, 2))
+        self.assertEqual([r.get('error') for r in job['result']['results']], [None, 'Invalid Global ID'])
+        self.assertEqual(Task.objects.get().task_id, job['result']['results'][0]['task_id'])
+
+        other = User.objects.create_user(username="admin2", email="admin2@example.com", password="admin123", role="admin")
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(job_url).status_code, 403)
+
+    def test_failures_are_recorded(self):
+        self.upload('/panel/import-site-data/async/', "id,name\n1,x\n", name="sites.csv")
+        self.upload('/panel/bulk-create-employees-zip/async/', "not a zip", name="employees.zip")
+        call_command('run_workers', workers=1, once=True, stdout=io.StringIO())
+
+        self.assertEqual(
+            list(Job.objects.order_by('id').values_list('status', 'error')),
+            [('failed', 'Missing required headers: cluster_name, global_id, site_name'),
+             ('failed', 'Invalid ZIP file')],
+        )
+        # Old site data kept
+        self.assertTrue(SiteData.objects.filter(global_id="G1").exists())
+
+    def test_only_workers_begin_immediate(self):
+        modes = []
+        with mock.patch.dict(runner.HANDLERS, {'test.mode': lambda job: modes.append(connection.transaction_mode)}):
+            runner.enqueue('test.mode', self.admin)
+            runner.work('w1', once=True)
+        self.assertEqual(modes, ['IMMEDIATE'])
+        self.assertIsNone(connection.transaction_mode)
+
+    def test_stale_running_jobs_are_requeued(self):
+        job = runner.enqueue('admin_panel.import_site_data', self.admin, upload='missing.csv')
+        self.assertEqual(runner.claim('w1').pk, job.pk)
+        self.assertIsNone(runner.claim('w2'))
+
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - datetime.timedelta(hours=1))
+        self.assertEqual(runner.requeue_stale(), (1, 0))
+        self.assertEqual(runner.claim('w2').attempts, 2)
+
+    def test_worker_that_lost_its_job_cannot_overwrite_it(self):
+        runner.enqueue('admin_panel.import_site_data', self.admin, upload='missing.csv')
+        lost = runner.claim('w1')
+        Job.objects.filter(pk=lost.pk).update(heartbeat_at=timezone.now() - datetime.timedelta(hours=1))
+        runner.requeue_stale()
+        current = runner.claim('w2')
+        current.set_progress(1, 4)
+        current.beat()
+
+        lost.set_progress(3, 3)
+        self.assertFalse(lost.beat())
+        self.assertFalse(runner._finish(lost, 'failed', error='boom'))
+        job = Job.objects.get(pk=lost.pk)
+        self.assertEqual((job.status, job.worker, job.progress, job.total, job.error), ('running', 'w2', 1, 4, ''))
+
+        self.assertTrue(runner._finish(current, 'succeeded', {'message': 'ok'}))
+        self.assertEqual(Job.objects.get(pk=lost.pk).status, 'succeeded')
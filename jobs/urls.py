@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.my_jobs, name='my-jobs'),
+    path('<int:id>/', views.job_status, name='job-status'),
+]
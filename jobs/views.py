@@ -0,0 +1,45 @@
+from django.shortcuts import get_object_or_404
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .models import Job
+
+
+def job_row(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'total': job.total,
+        'percent': job.percent,
+        'result': job.result,
+        'error': job.error,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def my_jobs(request):
+    """
+    The user's 50 most recent jobs, newest first (results omitted).
+    """
+    jobs = Job.objects.filter(created_by=request.user).order_by('-created_at', '-id')[:50]
+    return Response([{k: v for k, v in job_row(job).items() if k != 'result'} for job in jobs])
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_status(request, id):
+    """
+    Status, progress and (once finished) result or error of a job. Poll
+    until status is succeeded or failed.
+    """
+    job = get_object_or_404(Job, id=id)
+    if job.created_by_id != request.user.id and request.user.role != 'superadmin':
+        return Response({'error': 'Unauthorized'}, status=403)
+    return Response(job_row(job))
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:07
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_alter_report_status_alter_report_submitted_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
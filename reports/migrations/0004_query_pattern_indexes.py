@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0010_query_pattern_indexes'),
+        ('reports', '0003_report_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['task', 'submitted_at'], name='report_task_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['submitted_by', 'submitted_at'], name='report_submitter_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['status', 'submitted_at'], name='report_status_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['submitted_at'], name='report_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['updated_at'], name='report_updated_idx'),
+        ),
+    ]
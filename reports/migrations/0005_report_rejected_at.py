@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:32
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_rejected_at(apps, schema_editor):
+    # Best guess for reports rejected before the field existed; the rollups
+    # dated them by updated_at until now
+    Report = apps.get_model('reports', 'Report')
+    Report.objects.filter(status='rejected').update(rejected_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0004_query_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='rejected_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_rejected_at, migrations.RunPython.noop),
+    ]
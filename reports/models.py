@@ -91,6 +91,38 @@ class Report(models.Model):
     rejection_reason = models.TextField(blank=True, null=True)
     submitted_at = models.DateTimeField(default=timezone.now)
     approved_at = models.DateTimeField(blank=True, null=True)
+    rejected_at = models.DateTimeField(blank=True, null=True)   # last move to 'rejected'
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # a task's latest report (get_my_tasks, list_tasks)
+            models.Index(fields=['task', 'submitted_at'], name='report_task_submitted_idx'),
+            # employees my_reports and dashboard, newest first
+            models.Index(fields=['submitted_by', 'submitted_at'], name='report_submitter_time_idx'),
+            # report lists filtered by status, and all reports by date
+            models.Index(fields=['status', 'submitted_at'], name='report_status_time_idx'),
+            models.Index(fields=['submitted_at'], name='report_submitted_idx'),
+            # rollups.touched_days
+            models.Index(fields=['updated_at'], name='report_updated_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_status = instance.__dict__.get('status')
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self.status == 'rejected' and getattr(self, '_saved_status', None) != 'rejected':
+            # 🔹 rollups count rejections on the day they happen; kept after the
+            # report moves on, so that day is recomputed then too
+            self.rejected_at = timezone.now()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'rejected_at' not in update_fields:
+                kwargs['update_fields'] = [*update_fields, 'rejected_at']
+        super().save(*args, **kwargs)
+        self._saved_status = self.status
 
     def __str__(self):
         return f"Report #{self.id} for Task {self.task.task_id}"
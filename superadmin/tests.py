@@ -1,7 +1,14 @@
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from authentication.models import User
+from django.test import override_settings
+from admin_panel.models import Task, TaskType, Cluster
 
+# Tests must not touch the shared FileBasedCache in BASE_DIR/cache
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
 class SuperAdminAPITests(APITestCase):
     def setUp(self):
         self.superadmin = User.objects.create_user(
@@ -68,3 +75,26 @@ class SuperAdminAPITests(APITestCase):
     def test_list_all_tasks_empty(self):
         res = self.client.get('/superadmin/api/tasks/')
         self.assertEqual(res.status_code, 200)
+
+    def test_state_task_summary(self):
+        task_type = TaskType.objects.create(name="DG PM", color_code="#888888")
+        cluster = Cluster.objects.create(name="Vizag")
+        for email, state, task_status in [
+            ("e1@example.com", "Telangana", "pending"),
+            ("e2@example.com", "Telangana", "completed"),
+            ("e3@example.com", "Odisha", "pending"),
+        ]:
+            employee = User.objects.create_user(
+                username=email, email=email, password="emp123", role="employee", state=state
+            )
+            Task.objects.create(global_id="G1", title="DG PM", status=task_status, type=task_type,
+                                cluster=cluster, assigned_to=employee)
+
+        with self.assertNumQueries(2):
+            res = self.client.get('/superadmin/state-dashboard-summary/')
+        self.assertEqual(res.json(), [
+            {"state": "Odisha", "completed": 0, "pending": 1, "in_progress": 0,
+             "admin_count": 0, "employee_count": 1},
+            {"state": "Telangana", "completed": 1, "pending": 1, "in_progress": 0,
+             "admin_count": 0, "employee_count": 2},
+        ])
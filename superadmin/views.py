@@ -6,6 +6,8 @@ from django.db.models import Count
 
 from authentication.models import User
 from admin_panel.models import Task
+from admin_panel.dashboard import global_totals
+from admin_panel.dashboard_cache import cached_dashboard
 from django.http import JsonResponse
 from reports.models import Report
 from sync.models import SyncConflict
@@ -23,6 +25,7 @@ from .serializers import (
 # ✅ DASHBOARD
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_dashboard('superadmin_dashboard')
 def superadmin_dashboard_api(request):
     if request.user.role != 'superadmin':
         return Response({'error': 'Unauthorized'}, status=403)
@@ -30,7 +33,7 @@ def superadmin_dashboard_api(request):
     data = {
         'admins_count': User.objects.filter(role='admin').count(),
         'employees_count': User.objects.filter(role='employee').count(),
-        'tasks_count': Task.objects.count(),
+        'tasks_count': global_totals()['total'],
         'reports_count': Report.objects.count()
     }
     return Response(data)
@@ -298,6 +301,7 @@ def list_all_tasks(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_dashboard('statewise_summary')
 def statewise_summary(request):
     if request.user.role != 'superadmin':
         return Response({'error': 'Unauthorized'}, status=403)
@@ -313,33 +317,40 @@ def statewise_summary(request):
     })
 
 
-def state_task_summary(request):
-    states = Task.objects.values_list('state', flat=True).distinct()
-    summary = []
+def _state_status_crosstab():
+    """
+    Task counts per state and status as {state: {status: count}},
+    from a single GROUP BY over the (state, status) index.
+    """
+    crosstab = {}
+    rows = Task.objects.order_by().values_list('state', 'status').annotate(count=Count('id'))
+    for state, task_status, count in rows:
+        counts = crosstab.setdefault(state, {"completed": 0, "pending": 0, "in_progress": 0})
+        counts[task_status] = count
+    return crosstab
 
-    for state in states:
-        summary.append({
-            "state": state,
-            "completed": Task.objects.filter(state=state, status='completed').count(),
-            "pending": Task.objects.filter(state=state, status='pending').count(),
-            "in_progress": Task.objects.filter(state=state, status='in_progress').count(),
-        })
 
+def state_task_summary(request):
+    summary = [
+        {"state": state, **counts}
+        for state, counts in sorted(_state_status_crosstab().items())
+    ]
     return JsonResponse(summary, safe=False)
 
 
 def state_dashboard_summary(request):
-    states = Task.objects.values_list('state', flat=True).distinct()
-    summary = []
-
-    for state in states:
-        summary.append({
+    users = {
+        (state, role): count
+        for state, role, count in User.objects.filter(role__in=['admin', 'employee'])
+        .order_by().values_list('state', 'role').annotate(count=Count('id'))
+    }
+    summary = [
+        {
             "state": state,
-            "completed": Task.objects.filter(state=state, status='completed').count(),
-            "pending": Task.objects.filter(state=state, status='pending').count(),
-            "in_progress": Task.objects.filter(state=state, status='in_progress').count(),
-            "admin_count": User.objects.filter(state=state, role='admin').count(),
-            "employee_count": User.objects.filter(state=state, role='employee').count()
-        })
-
-    return JsonResponse(summary, safe=False)
\ No newline at end of file
+            **counts,
+            "admin_count": users.get((state, 'admin'), 0),
+            "employee_count": users.get((state, 'employee'), 0),
+        }
+        for state, counts in sorted(_state_status_crosstab().items())
+    ]
+    return JsonResponse(summary, safe=False)
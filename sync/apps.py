@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SyncConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sync'
+
+    def ready(self):
+        # connect the signal receivers
+        from . import tombstones  # noqa: F401
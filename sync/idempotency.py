@@ -0,0 +1,159 @@
+"""
+Idempotency-Key support for mutating endpoints the mobile app retries.
+
+A request carrying an `Idempotency-Key` header claims that key for the user
+by inserting an IdempotencyKey row (the unique constraint on user and key
+decides who wins a race). The view then runs in a transaction together with
+storing its response, so either both commit or neither does. A retry with
+the same key:
+
+- gets the stored response back (with `Idempotent-Replayed: true`), without
+  running the view or writing any files again;
+- while the first request is still running, waits for it to finish (up to
+  IDEMPOTENCY_WAIT_SECONDS), then replays; past that it gets 409;
+- with a different payload or endpoint, gets 422.
+
+Only successful (2xx) responses are kept. Errors release the key, so a
+corrected retry runs normally. Keys expire after IDEMPOTENCY_KEY_HOURS.
+Requests without the header are not affected.
+"""
+import datetime
+import functools
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def ttl():
+    return datetime.timedelta(hours=getattr(settings, 'IDEMPOTENCY_KEY_HOURS', 24))
+
+
+def wait_seconds():
+    return getattr(settings, 'IDEMPOTENCY_WAIT_SECONDS', 10)
+
+
+def abandoned_after():
+    # A key still 'processing' this long belongs to a request that died mid-way
+    return datetime.timedelta(seconds=getattr(settings, 'IDEMPOTENCY_PROCESSING_SECONDS', 120))
+
+
+def _value(value):
+    if isinstance(value, UploadedFile):
+        return {'file': value.name, 'size': value.size}
+    return value
+
+
+def fingerprint(request):
+    """
+    Hash of the method, path and payload (uploaded files by name and size).
+    """
+    data = request.data
+    items = data.lists() if hasattr(data, 'lists') else data.items()
+    payload = sorted((str(k), _value(v) if not isinstance(v, list) else [_value(x) for x in v])
+                     for k, v in items)
+    raw = json.dumps([request.method, request.path, payload], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _claim(user, key, print_):
+    """
+    Insert the key for this request. Returns (record, True) when claimed, or
+    (existing record, False) when another request holds it.
+    """
+    now = timezone.now()
+    # Expired keys, and keys of requests that never finished, are free again
+    IdempotencyKey.objects.filter(user=user, key=key, expires_at__lt=now).delete()
+    IdempotencyKey.objects.filter(
+        user=user, key=key, status='processing', created_at__lt=now - abandoned_after()
+    ).delete()
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                user=user, key=key, fingerprint=print_, created_at=now, expires_at=now + ttl()
+            ), True
+    except IntegrityError:
+        record = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if record is None:
+            return _claim(user, key, print_)   # Released in the meantime
+        return record, False
+
+
+def _replay(record):
+    return Response(record.response_body, status=record.response_status,
+                    headers={'Idempotent-Replayed': 'true'})
+
+
+def _wait_for(record):
+    deadline = time.monotonic() + wait_seconds()
+    while record is not None and record.status == 'processing' and time.monotonic() < deadline:
+        time.sleep(0.1)
+        record = IdempotencyKey.objects.filter(pk=record.pk).first()
+    return record
+
+
+def idempotent(view):
+    """
+    Honour the Idempotency-Key header on a view. Goes directly above the view
+    function, below @api_view/@permission_classes, so request.user is
+    already authenticated.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'}, status=400)
+
+        print_ = fingerprint(request)
+        while True:
+            record, claimed = _claim(request.user, key, print_)
+            if claimed:
+                break
+            if record.fingerprint != print_:
+                return Response({'error': f'{HEADER} was already used for a different request'}, status=422)
+            record = _wait_for(record)
+            if record is None:
+                continue   # The first request failed; run this one instead
+            if record.status == 'completed':
+                return _replay(record)
+            response = Response({'error': 'A request with this Idempotency-Key is still in progress'},
+                                status=409)
+            response['Retry-After'] = '1'
+            return response
+
+        stored = False
+        try:
+            with transaction.atomic():
+                response = view(request, *args, **kwargs)
+                keep = isinstance(response, Response) and 200 <= response.status_code < 300
+                if keep:
+                    record.status = 'completed'
+                    record.response_status = response.status_code
+                    record.response_body = response.data
+                    record.save(update_fields=['status', 'response_status', 'response_body'])
+            stored = keep
+        finally:
+            if not stored:
+                IdempotencyKey.objects.filter(pk=record.pk).delete()
+        return response
+    return wrapper
+
+
+def purge(before=None):
+    """
+    Drop expired keys.
+    """
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lt=before or timezone.now()).delete()
+    return deleted
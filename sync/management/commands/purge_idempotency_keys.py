@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from sync import idempotency
+
+
+class Command(BaseCommand):
+    help = 'Delete expired Idempotency-Key responses'
+
+    def handle(self, *args, **kwargs):
+        deleted = idempotency.purge()
+        self.stdout.write(self.style.SUCCESS(f'{deleted} idempotency key(s) purged.'))
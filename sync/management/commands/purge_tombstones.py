@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from sync import tombstones
+
+
+class Command(BaseCommand):
+    help = 'Delete sync tombstones older than SYNC_TOMBSTONE_DAYS'
+
+    def handle(self, *args, **kwargs):
+        deleted = tombstones.purge()
+        self.stdout.write(self.style.SUCCESS(f'{deleted} tombstone(s) purged.'))
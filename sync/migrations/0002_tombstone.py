@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=100)),
+                ('object_id', models.CharField(max_length=100)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tombstones', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'model_name', 'deleted_at'], name='tombstone_owner_time_idx'), models.Index(fields=['deleted_at'], name='tombstone_deleted_idx')],
+            },
+        ),
+    ]
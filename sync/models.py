@@ -1,5 +1,7 @@
 from django.db import models
+from django.utils import timezone
 from authentication.models import User
+from rest_framework.utils.encoders import JSONEncoder
 
 class SyncConflict(models.Model):
     reported_by = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -12,3 +14,55 @@ class SyncConflict(models.Model):
 
     def __str__(self):
         return f"Conflict on {self.model_name} by {self.reported_by.username}"
+
+
+class Tombstone(models.Model):
+    """
+    Record of an object that disappeared from a user's synced data (deleted,
+    or a task reassigned away), so delta syncs can tell clients to drop it.
+    """
+    model_name = models.CharField(max_length=100)
+    object_id = models.CharField(max_length=100)   # key the client knows the object by
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tombstones')
+    data = models.JSONField(default=dict, blank=True)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'model_name', 'deleted_at'], name='tombstone_owner_time_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model_name} {self.object_id} gone for {self.owner_id}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Response stored under a client's Idempotency-Key, so a retried request
+    gets the original answer instead of running again. See sync.idempotency.
+    """
+    STATUS_CHOICES = (
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)   # hash of method, path and payload
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='processing')
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=JSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotency_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.status}) for {self.user_id}"
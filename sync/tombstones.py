@@ -0,0 +1,97 @@
+"""
+Tombstones and sync tokens for delta syncs of employees' task lists.
+
+Tasks are identified to clients by `task_id`, reports by their id. A task
+leaves an employee's list when it is deleted or reassigned to someone else;
+both leave a tombstone for that employee. Set-based updates and deletes send
+no per-object signals, so code doing those should call `bury()` itself.
+"""
+import datetime
+
+from django.conf import settings
+from django.core import signing
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from admin_panel.models import Task
+from admin_panel.rollups import REPORT_DATE_FIELDS, report_days
+from reports.models import Report
+from .models import Tombstone
+
+TOKEN_SALT = 'sync.changes'
+
+
+def make_token(moment):
+    return signing.dumps({'since': moment.isoformat()}, salt=TOKEN_SALT)
+
+
+def read_token(token):
+    """
+    The moment a sync token was issued. Raises signing.BadSignature for
+    tokens that were not issued by us.
+    """
+    payload = signing.loads(token, salt=TOKEN_SALT)
+    moment = parse_datetime(payload.get('since', '')) if isinstance(payload, dict) else None
+    if moment is None:
+        raise signing.BadSignature('Malformed sync token')
+    return moment
+
+
+def overlap():
+    # Rows committed by transactions still open when the last token was
+    # issued can carry an earlier updated_at; look back this far to catch them
+    return datetime.timedelta(seconds=getattr(settings, 'SYNC_OVERLAP_SECONDS', 60))
+
+
+def retention():
+    return datetime.timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_DAYS', 30))
+
+
+def bury(model_name, rows):
+    """
+    Record tombstones for (object_id, owner_id, data) rows in one INSERT.
+    """
+    Tombstone.objects.bulk_create([
+        Tombstone(model_name=model_name, object_id=str(object_id), owner_id=owner_id, data=data or {})
+        for object_id, owner_id, data in rows if owner_id
+    ])
+
+
+def since(owner, model_name, moment):
+    return Tombstone.objects.filter(owner=owner, model_name=model_name, deleted_at__gt=moment)
+
+
+def purge(before=None):
+    """
+    Drop tombstones older than the retention period; clients with older
+    tokens get a full resync instead.
+    """
+    before = before or timezone.now() - retention()
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=before).delete()
+    return deleted
+
+
+@receiver(post_init, sender=Task)
+def remember_assignee(sender, instance, **kwargs):
+    instance._synced_assignee = instance.__dict__.get('assigned_to_id')
+
+
+@receiver(post_save, sender=Task)
+def bury_reassigned_task(sender, instance, created, **kwargs):
+    previous = instance._synced_assignee
+    instance._synced_assignee = instance.assigned_to_id
+    if not created and previous and previous != instance.assigned_to_id:
+        bury('task', [(instance.task_id, previous, None)])
+
+
+@receiver(post_delete, sender=Task)
+def bury_deleted_task(sender, instance, **kwargs):
+    bury('task', [(instance.task_id, instance.assigned_to_id, None)])
+
+
+@receiver(post_delete, sender=Report)
+def bury_deleted_report(sender, instance, **kwargs):
+    days = report_days(*(getattr(instance, field) for field in REPORT_DATE_FIELDS))
+    bury('report', [(instance.id, instance.submitted_by_id, {'task': instance.task_id, 'days': days})])